@@ -15,15 +15,19 @@ def greeting_node(state: AgentState) -> AgentState:
 
     return state 
 
-graph = StateGraph(AgentState)
+def build_graph():
+    """Builds and compiles the graph, nothing runs when this file is only imported"""
+    graph = StateGraph(AgentState)
 
-graph.add_node("greeter", greeting_node)
+    graph.add_node("greeter", greeting_node)
 
-graph.set_entry_point("greeter")
-graph.set_finish_point("greeter")
+    graph.set_entry_point("greeter")
+    graph.set_finish_point("greeter")
 
-app = graph.compile()
+    return graph.compile()
 
 
-result = app.invoke({"message": "Bob"})
-print(result["message"])
\ No newline at end of file
+if __name__ == "__main__":
+    app = build_graph()
+    result = app.invoke({"message": "Bob"})
+    print(result["message"])
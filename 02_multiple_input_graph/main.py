@@ -10,16 +10,19 @@ class AgentState(TypedDict):
 def process_values(state: AgentState) -> AgentState:
     """This function handles multiple different inputs"""
     # print(state)
-    state["result"] = f"Hi there {state["name"]}! Your sum = {sum(state["values"])}"
+    state["result"] = f"Hi there {state['name']}! Your sum = {sum(state['values'])}"
     # print(state)
     return state
 
-graph = StateGraph(AgentState)
-graph.add_node("processor", process_values)
-graph.set_entry_point("processor") # Set the starting node
-graph.set_finish_point("processor") # Set the ending node
-app = graph.compile() # Compiling the graph
+def build_graph():
+    graph = StateGraph(AgentState)
+    graph.add_node("processor", process_values)
+    graph.set_entry_point("processor") # Set the starting node
+    graph.set_finish_point("processor") # Set the ending node
+    return graph.compile() # Compiling the graph
 
 
-answers = app.invoke({"values": [1,2,3,4], "name": "Steve"})
-print(answers["result"])
\ No newline at end of file
+if __name__ == "__main__":
+    app = build_graph()
+    answers = app.invoke({"values": [1,2,3,4], "name": "Steve"})
+    print(answers["result"])
@@ -9,25 +9,29 @@ class AgentState(TypedDict):
 def first_node(state:AgentState) -> AgentState:
     """This is the first node of our sequence"""
 
-    state["final"] = f"Hi {state["name"]}!"
+    state["final"] = f"Hi {state['name']}!"
     return state
 
 def second_node(state:AgentState) -> AgentState:
     """This is the second node of our sequence"""
 
-    state["final"] = state["final"] + f" You are {state["age"]} years old!"
+    state["final"] = state["final"] + f" You are {state['age']} years old!"
 
     return state
 
-graph = StateGraph(AgentState)
+def build_graph():
+    graph = StateGraph(AgentState)
 
-graph.add_node("first_node", first_node)
-graph.add_node("second_node", second_node)
+    graph.add_node("first_node", first_node)
+    graph.add_node("second_node", second_node)
 
-graph.set_entry_point("first_node")
-graph.add_edge("first_node", "second_node")
-graph.set_finish_point("second_node")
-app = graph.compile()
+    graph.set_entry_point("first_node")
+    graph.add_edge("first_node", "second_node")
+    graph.set_finish_point("second_node")
+    return graph.compile()
 
-result = app.invoke({"name": "Charlie", "age": 20})
-print(result)
\ No newline at end of file
+
+if __name__ == "__main__":
+    app = build_graph()
+    result = app.invoke({"name": "Charlie", "age": 20})
+    print(result)
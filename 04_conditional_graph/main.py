@@ -28,33 +28,37 @@ def decide_next_node(state:AgentState) -> AgentState:
     elif state["operation"] == "-":
         return "subtraction_operation" 
     
-graph = StateGraph(AgentState)
+def build_graph():
+    graph = StateGraph(AgentState)
 
-graph.add_node("add_node", adder)
-graph.add_node("subtract_node", subtractor)
-graph.add_node("router", lambda state:state) # passthrough function
+    graph.add_node("add_node", adder)
+    graph.add_node("subtract_node", subtractor)
+    graph.add_node("router", lambda state:state) # passthrough function
 
-graph.add_edge(START, "router") 
+    graph.add_edge(START, "router") 
 
-graph.add_conditional_edges(
-    "router",
-    decide_next_node, 
-    {
-        # Edge: Node
-        "addition_operation": "add_node",
-        "subtraction_operation": "subtract_node"
-    }
+    graph.add_conditional_edges(
+        "router",
+        decide_next_node, 
+        {
+            # Edge: Node
+            "addition_operation": "add_node",
+            "subtraction_operation": "subtract_node"
+        }
 
-)
+    )
 
-graph.add_edge("add_node", END)
-graph.add_edge("subtract_node", END)
+    graph.add_edge("add_node", END)
+    graph.add_edge("subtract_node", END)
 
-app = graph.compile()
+    return graph.compile()
 
 
-initial_state_1 = AgentState(number1 = 10, operation="-", number2 = 5)
-print(app.invoke(initial_state_1))
+if __name__ == "__main__":
+    app = build_graph()
 
-result = app.invoke({"number1": 10, "operation": "-", "number2": 5})
-print(result)
\ No newline at end of file
+    initial_state_1 = AgentState(number1 = 10, operation="-", number2 = 5)
+    print(app.invoke(initial_state_1))
+
+    result = app.invoke({"number1": 10, "operation": "-", "number2": 5})
+    print(result)
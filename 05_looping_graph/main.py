@@ -1,25 +1,20 @@
 from langgraph.graph import StateGraph, END
+import operator
 import random
-from typing import Dict, List, TypedDict
+from typing import Annotated, Dict, List, TypedDict
 
 class AgentState(TypedDict):
     name: str
-    number: List[int]
+    number: Annotated[List[int], operator.add] # nodes return only the new numbers, operator.add appends them
     counter: int
     
 def greeting_node(state: AgentState) -> AgentState:
     """Greeting Node which says hi to the person"""
-    state["name"] = f"Hi there, {state["name"]}"
-    state["counter"] = 0 
-
-    return state
+    return {"name": f"Hi there, {state['name']}", "counter": 0} # only the keys that change
 
 def random_node(state: AgentState) -> AgentState:
     """Generates a random number from 0 to 10"""
-    state["number"].append(random.randint(0, 10))
-    state["counter"] += 1
-
-    return state
+    return {"number": [random.randint(0, 10)], "counter": state["counter"] + 1}
 
 
 def should_continue(state: AgentState) -> AgentState:
@@ -31,25 +26,29 @@ def should_continue(state: AgentState) -> AgentState:
         return "exit"  # Exit the loop
     
     
-graph = StateGraph(AgentState)
+def build_graph():
+    graph = StateGraph(AgentState)
+
+    graph.add_node("greeting", greeting_node)
+    graph.add_node("random", random_node)
+    graph.add_edge("greeting", "random")
 
-graph.add_node("greeting", greeting_node)
-graph.add_node("random", random_node)
-graph.add_edge("greeting", "random")
 
+    graph.add_conditional_edges(
+        "random",     # Source node
+        should_continue, # Action
+        {
+            "loop": "random",  
+            "exit": END          
+        }
+    )
 
-graph.add_conditional_edges(
-    "random",     # Source node
-    should_continue, # Action
-    {
-        "loop": "random",  
-        "exit": END          
-    }
-)
+    graph.set_entry_point("greeting")
 
-graph.set_entry_point("greeting")
+    return graph.compile()
 
-app = graph.compile()
 
-result = app.invoke({"name":"Lakshya", "number":[], "counter":-100})
-print(result)
\ No newline at end of file
+if __name__ == "__main__":
+    app = build_graph()
+    result = app.invoke({"name":"Lakshya", "number":[], "counter":-100})
+    print(result)
@@ -1,38 +1,63 @@
+import asyncio
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # lets us import the shared helpers in common/
+from functools import lru_cache
 from typing import TypedDict, List
 from langchain_core.messages import HumanMessage
-from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, START, END
 from dotenv import load_dotenv # used to store secret stuff like API keys or configuration values
-from colorama import Fore 
+from colorama import Fore, Style
+from common.llm_cache import CachedChatModel, default_llm_cache
+from common.streaming import astream_answer
 
 load_dotenv()
 
 class AgentState(TypedDict):
     messages: List[HumanMessage]
 
-llm = ChatOpenAI(model="gpt-4o")
+
+@lru_cache(maxsize=None)
+def build_model():
+    """Built on first use, so importing this file does not pay for langchain_openai"""
+    from langchain_openai import ChatOpenAI
+    # LLM_CACHE_MODE=record stores the answers, LLM_CACHE_MODE=replay then runs the bot offline
+    return CachedChatModel(model=ChatOpenAI(model="gpt-4o"), store=default_llm_cache())
+
 
 def process(state: AgentState) -> AgentState:
-    response = llm.invoke(state["messages"])
-    print("\nAI:" + Fore.YELLOW + f" {response.content}" + Fore.RESET)
+    build_model().invoke(state["messages"]) # the tokens are printed by the chat loop as they stream in
     return state
 
-graph = StateGraph(AgentState)
-graph.add_node("process", process)
-graph.add_edge(START, "process")
-graph.add_edge("process", END) 
-agent = graph.compile()
+
+@lru_cache(maxsize=None)
+def build_graph():
+    graph = StateGraph(AgentState)
+    graph.add_node("process", process)
+    graph.add_edge(START, "process")
+    graph.add_edge("process", END) 
+    return graph.compile()
 
 
-try:
-    user_input = input("Enter: " + Fore.GREEN)
+async def chat():
+    agent = build_graph()
+    user_input = await asyncio.to_thread(input, "Enter: " + Fore.GREEN)
     while user_input != "exit":
         print(Fore.RESET)
-        result = agent.invoke({"messages": [HumanMessage(content=user_input)]})
-        user_input = input("Enter: " + Fore.GREEN)
-except KeyboardInterrupt:
-    print(Fore.RED + "\nExecution interrupted by user (Ctrl+C)." + Fore.RESET)
-except Exception as e:
-    print(Fore.RED + f"\nAn error occurred: {e}" + Fore.RESET)
-finally:
-    print(Fore.BLUE + "Exiting the program. Goodbye!" + Fore.RESET)
\ No newline at end of file
+        print("\nAI:" + Fore.YELLOW + " ", end="")
+        _, stats = await astream_answer(agent, {"messages": [HumanMessage(content=user_input)]}, nodes=["process"])
+        print(Fore.RESET)
+        print(Style.DIM + str(stats) + Style.RESET_ALL)
+        user_input = await asyncio.to_thread(input, "Enter: " + Fore.GREEN)
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(chat())
+    except KeyboardInterrupt:
+        print(Fore.RED + "\nExecution interrupted by user (Ctrl+C)." + Fore.RESET)
+    except Exception as e:
+        print(Fore.RED + f"\nAn error occurred: {e}" + Fore.RESET)
+    finally:
+        print(default_llm_cache().stats)
+        print(Fore.BLUE + "Exiting the program. Goodbye!" + Fore.RESET)
@@ -0,0 +1,100 @@
+"""The memory agent graph, on a SQLite checkpointer with one conversation per thread_id.
+
+The checkpointer keeps the state of every conversation (recent messages, summary), so
+one process can serve any number of sessions and a session picks up where it left off
+after a restart. Nodes only return what changed (the new reply, the folded messages to
+remove), and the context window keeps the state itself bounded, so every turn writes
+about the same amount no matter how long the conversation is.
+
+BatchedSqliteSaver is the stock SqliteSaver in WAL mode that groups commits: writes are
+committed every `commit_every` writes or `commit_interval` seconds, whichever comes
+first, and on flush().
+"""
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Annotated, List, TypedDict
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.graph import StateGraph, START, END
+from langgraph.graph.message import add_messages
+
+from context_window import ContextWindow
+
+
+class AgentState(TypedDict):
+    messages: Annotated[List[BaseMessage], add_messages]  # the recent messages that fit in the token budget
+    summary: str  # everything older, folded into a running summary
+    summarized: int  # how many messages of the conversation the summary covers
+
+
+class BatchedSqliteSaver(SqliteSaver):
+    def __init__(self, conn: sqlite3.Connection, commit_every: int = 64, commit_interval: float = 0.05,
+                 synchronous: str = "NORMAL", **kwargs):
+        super().__init__(conn, **kwargs)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # NORMAL: the WAL is fsync'd at checkpoints instead of on every commit, still crash safe
+        conn.execute(f"PRAGMA synchronous={synchronous}")
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self.writes = 0
+        self.commits = 0
+        self._pending = 0
+        self._last_commit = time.monotonic()
+
+    def _commit(self):
+        self.conn.commit()
+        self.commits += 1
+        self._pending = 0
+        self._last_commit = time.monotonic()
+
+    @contextmanager
+    def cursor(self, transaction: bool = True):
+        with self.lock:
+            self.setup()
+            cur = self.conn.cursor()
+            try:
+                yield cur
+            finally:
+                cur.close()
+                if transaction:
+                    self.writes += 1
+                    self._pending += 1
+                    if (self._pending >= self.commit_every
+                            or time.monotonic() - self._last_commit >= self.commit_interval):
+                        self._commit()
+
+    def flush(self):
+        with self.lock:
+            if self._pending:
+                self._commit()
+
+
+def open_checkpointer(path: str, **kwargs) -> BatchedSqliteSaver:
+    return BatchedSqliteSaver(sqlite3.connect(path, check_same_thread=False), **kwargs)
+
+
+def build_agent(llm, checkpointer, context_window: ContextWindow):
+    def process(state: AgentState) -> AgentState:
+        """This node will solve the request you input"""
+        response = llm.invoke(context_window.prompt(state))
+        return {"messages": [AIMessage(content=response.content)]}
+
+    graph = StateGraph(AgentState)
+    graph.add_node("manage_context", context_window.manage_context)
+    graph.add_node("process", process)
+    graph.add_edge(START, "manage_context")
+    graph.add_edge("manage_context", "process")
+    graph.add_edge("process", END)
+    return graph.compile(checkpointer=checkpointer)
+
+
+def session(thread_id: str) -> dict:
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def chat(agent, thread_id: str, text: str) -> AIMessage:
+    """One turn of one conversation, only the new message goes in"""
+    result = agent.invoke({"messages": [HumanMessage(content=text)]}, session(thread_id))
+    return result["messages"][-1]
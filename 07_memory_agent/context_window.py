@@ -0,0 +1,89 @@
+"""Token budgeted context window for the memory agent.
+
+Instead of sending the whole history on every turn, the `manage_context` node keeps the
+most recent messages that fit in a token budget and folds older ones into a running
+summary. The summary is updated incrementally, a batch of at least `summarize_every`
+messages at a time (one LLM call per batch), never recomputed from the full history.
+Token counts are cached per message text, so the history is not re-tokenized every turn.
+"""
+from functools import lru_cache
+from typing import List
+
+from langchain_core.messages import BaseMessage, HumanMessage, RemoveMessage, SystemMessage
+
+SUMMARY_PROMPT = """You keep a running summary of a conversation between a user and an AI assistant.
+Update the summary with the new messages below. Keep every fact about the user (name, preferences,
+plans) and anything the assistant promised. Answer with the updated summary only, at most 200 words."""
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("o200k_base")  # gpt-4o / gpt-4o-mini
+    except Exception:  # tiktoken missing or no way to download its vocabulary
+        return None
+
+
+@lru_cache(maxsize=50_000)
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        return len(text) // 4 + 1  # ~4 characters per token
+    return len(encoding.encode(text))
+
+
+def message_tokens(message: BaseMessage) -> int:
+    return count_tokens(str(message.content)) + 4  # role and separators
+
+
+class ContextWindow:
+    """Graph node that trims `messages` to the token budget and grows `summary` instead.
+
+    `messages` has to use the add_messages reducer, folded messages are removed with RemoveMessage.
+    """
+
+    def __init__(self, llm, max_tokens: int = 3_000, summarize_every: int = 10):
+        self.llm = llm
+        self.max_tokens = max_tokens
+        self.summarize_every = summarize_every  # fold at least this many messages per summary update
+        self.summaries = 0
+
+    def tokens(self, messages: List[BaseMessage]) -> int:
+        return sum(message_tokens(m) for m in messages)
+
+    def prompt(self, state) -> List[BaseMessage]:
+        """What `process` sends to the model: the summary, then the recent messages"""
+        summary = state.get("summary") or ""
+        context = [SystemMessage(content=f"Summary of the conversation so far:\n{summary}")] if summary else []
+        return context + list(state["messages"])
+
+    def summarize(self, summary: str, messages: List[BaseMessage]) -> str:
+        transcript = "\n".join(f"{m.type}: {m.content}" for m in messages)
+        self.summaries += 1
+        response = self.llm.invoke([
+            SystemMessage(content=SUMMARY_PROMPT),
+            HumanMessage(content=f"Current summary:\n{summary or '(empty)'}\n\nNew messages:\n{transcript}"),
+        ])
+        return response.content
+
+    def manage_context(self, state):
+        messages = list(state["messages"])
+        summary = state.get("summary") or ""
+        budget = self.max_tokens - (count_tokens(summary) if summary else 0)
+        total = self.tokens(messages)
+        if total <= budget:
+            return {}
+
+        # Fold the oldest messages until the rest fits, in batches so the summary is not updated every turn
+        # and so the window starts with a user message
+        fold = 0
+        while fold < len(messages) - 1 and (total > budget or fold < self.summarize_every
+                                            or messages[fold].type != "human"):
+            total -= message_tokens(messages[fold])
+            fold += 1
+        return {
+            "messages": [RemoveMessage(id=m.id) for m in messages[:fold]],
+            "summary": self.summarize(summary, messages[:fold]),
+            "summarized": state.get("summarized", 0) + fold,
+        }
@@ -1,84 +1,100 @@
 import os
-from typing import TypedDict, List, Union
-from langchain_core.messages import HumanMessage, AIMessage
-from langchain_openai import ChatOpenAI
-from langgraph.graph import StateGraph, START, END
+import re
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # lets us import the shared helpers in common/
+from functools import lru_cache
+from langchain_core.messages import HumanMessage
 from dotenv import load_dotenv
 from colorama import Fore, Style
+from common.llm_cache import CachedChatModel, default_llm_cache
+from common.streaming import stream_answer
+from session_log import SessionLog
+from context_window import ContextWindow
+from agent import build_agent, open_checkpointer, session
 
 load_dotenv()
 
-class AgentState(TypedDict):
-    messages: List[Union[HumanMessage, AIMessage]]
-
-llm = ChatOpenAI(model="gpt-4o-mini")
-
-log_file_path = "./07_memory_agent/logging.txt"
-
-def process(state: AgentState) -> AgentState:
-    """This node will solve the request you input"""
-    response = llm.invoke(state["messages"])
-
-    state["messages"].append(AIMessage(content=response.content)) 
-    print("CURRENT STATE: ", Fore.MAGENTA ,  state["messages"] , Fore.RESET)
-
-    return state
-
-graph = StateGraph(AgentState)
-graph.add_node("process", process)
-graph.add_edge(START, "process")
-graph.add_edge("process", END) 
-agent = graph.compile()
-
-conversation_history = []
-
-# Load conversation history from logging.txt if it exists
-if os.path.exists(log_file_path):
-    with open(log_file_path, "r") as file:
-        lines = file.readlines()
-        for line in lines:
-            if line.startswith("You:"):
-                conversation_history.append(HumanMessage(content=line[4:].strip()))
-            elif line.startswith("AI:"):
-                conversation_history.append(AIMessage(content=line[3:].strip()))
-
-try:
-    user_input = input( "Enter: " + Fore.GREEN )
-    while user_input != "exit":
-        print(Fore.RESET)
-        conversation_history.append(HumanMessage(content=user_input))
-        result = agent.invoke({"messages": conversation_history})
-        conversation_history = result["messages"]
-
-        # Display AI response in yellow
-        for message in conversation_history[-1:]:
-            if isinstance(message, AIMessage):
-                print(Fore.YELLOW + f"AI: {message.content}" + Fore.RESET)
-
-        user_input = input( "Enter: " + Fore.GREEN)
-
-except KeyboardInterrupt:
-    print(Fore.RED + "\nExecution interrupted by user (Ctrl+C)." + Fore.RESET)
-except Exception as e:
-    print(Fore.RED + f"\nAn error occurred: {e}" + Fore.RESET)
-finally:
-    # Save conversation to a log file
-    with open(log_file_path, "w") as file:
-        file.write("Your Conversation Log:\n")
-        for message in conversation_history:
-            if isinstance(message, HumanMessage):
-                file.write(f"You: {message.content}\n")
-            elif isinstance(message, AIMessage):
-                file.write(f"AI: {message.content}\n\n")
-        file.write("End of Conversation")
-
-    print(Fore.BLUE + "Conversation saved to logging.txt. Goodbye!" + Fore.RESET)
-    
-    for message in conversation_history:
-        if isinstance(message, HumanMessage):
-            file.write(f"You: {message.content}\n")
-        elif isinstance(message, AIMessage):
-            file.write(f"AI: {message.content}\n\n")
-    file.write("End of Conversation")
-
-print("Conversation saved to logging.txt")
\ No newline at end of file
+log_file_path = "./07_memory_agent/logging.txt" # old format, imported once into the default thread
+transcripts_dir = "./07_memory_agent/transcripts" # the full conversation of every thread
+checkpoint_path = "./07_memory_agent/memory.sqlite"
+history_window = 200 # most messages we carry over from the old log
+
+
+@lru_cache(maxsize=None)
+def build_model():
+    from langchain_openai import ChatOpenAI # only imported once the agent is actually built
+    # LLM_CACHE_MODE=record stores the answers, LLM_CACHE_MODE=replay then runs the agent offline
+    return CachedChatModel(model=ChatOpenAI(model="gpt-4o-mini"), store=default_llm_cache())
+
+
+@lru_cache(maxsize=None)
+def build_checkpointer():
+    # Every conversation lives in SQLite under its own thread_id, so one process can serve many users
+    return open_checkpointer(checkpoint_path)
+
+
+@lru_cache(maxsize=None)
+def build_graph():
+    # Keeps the prompt under max_tokens by summarizing the oldest messages, summarize_every at a time
+    context_window = ContextWindow(build_model(), max_tokens=3000, summarize_every=10)
+    return build_agent(build_model(), build_checkpointer(), context_window)
+
+
+@lru_cache(maxsize=None)
+def transcript(thread_id: str) -> SessionLog:
+    # The checkpointer drops what the context window folded into the summary, the transcript keeps everything
+    os.makedirs(transcripts_dir, exist_ok=True)
+    return SessionLog(os.path.join(transcripts_dir, re.sub(r"[^\w.-]", "_", thread_id) + ".jsonl"))
+
+
+def import_old_history(thread_id: str):
+    """Moves the conversation of the old logging.txt into a new, empty thread and its transcript"""
+    agent = build_graph()
+    if agent.get_state(session(thread_id)).values.get("messages") or not os.path.exists(log_file_path):
+        return
+    log = transcript(thread_id)
+    if not len(log):
+        log.import_legacy(log_file_path)
+    messages = log.tail(history_window)
+    if messages:
+        agent.update_state(session(thread_id), {"messages": messages, "summary": "",
+                                                "summarized": len(log) - len(messages)}, as_node="process")
+        build_checkpointer().flush()
+        print(f"Imported {len(messages)} messages from the old conversation log")
+
+
+if __name__ == "__main__":
+    agent = build_graph()
+    checkpointer = build_checkpointer()
+
+    thread_id = input("Session name (enter for 'default'): ").strip() or "default"
+    if thread_id == "default":
+        import_old_history(thread_id)
+
+    try:
+        user_input = input( "Enter: " + Fore.GREEN )
+        while user_input != "exit":
+            print(Fore.RESET)
+            # Display AI response in yellow, token by token as it arrives
+            # (SqliteSaver only has a sync API, so this is graph.stream rather than astream)
+            print(Fore.YELLOW + "AI: ", end="")
+            user_message = HumanMessage(content=user_input)
+            transcript(thread_id).append(user_message)
+            state, stats = stream_answer(agent, {"messages": [user_message]}, session(thread_id), nodes=["process"])
+            transcript(thread_id).append(state["messages"][-1])
+            print(Fore.RESET)
+            print(Style.DIM + str(stats) + Style.RESET_ALL)
+            checkpointer.flush() # the turn is on disk before we ask for the next one
+
+            user_input = input( "Enter: " + Fore.GREEN)
+
+    except KeyboardInterrupt:
+        print(Fore.RED + "\nExecution interrupted by user (Ctrl+C)." + Fore.RESET)
+    except Exception as e:
+        print(Fore.RED + f"\nAn error occurred: {e}" + Fore.RESET)
+    finally:
+        checkpointer.flush()
+        checkpointer.conn.close()
+        transcript(thread_id).close()
+        print(default_llm_cache().stats)
+        print(Fore.BLUE + f"Conversation '{thread_id}' saved to {checkpoint_path}. Goodbye!" + Fore.RESET)
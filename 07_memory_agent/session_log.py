@@ -0,0 +1,109 @@
+"""Append-only conversation transcript for the memory agent.
+
+The checkpointer only keeps what the model still needs (the recent messages and a summary
+of the rest), so the full conversation of every thread is written here as well. Every
+message is one JSON line in `<name>.jsonl` and is fsync'd as soon as it is written, so
+nothing is lost on a crash and a turn costs the same no matter how long the conversation
+is. `<name>.idx` holds the byte offset of every line as a fixed-size 8 byte integer, which
+lets us jump straight to the last N messages instead of parsing the whole history.
+"""
+import json
+import os
+import struct
+from typing import List
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+OFFSET = struct.Struct("<Q")
+ROLES = {"human": HumanMessage, "ai": AIMessage}
+
+
+class SessionLog:
+    def __init__(self, path: str):
+        self.path = path
+        self.index_path = os.path.splitext(path)[0] + ".idx"
+        self._log = open(path, "ab+")
+        self._index = open(self.index_path, "ab+")
+        self._repair_index()
+
+    def __len__(self):
+        return self._index.seek(0, os.SEEK_END) // OFFSET.size
+
+    def _repair_index(self):
+        """Brings the index in line with the log after a crash between the two writes"""
+        entries = len(self)
+        self._index.truncate(entries * OFFSET.size)  # drop a half written offset
+        log_size = self._log.seek(0, os.SEEK_END)
+
+        # Offsets that point past the end of the log belong to lines that never made it
+        while entries and self._offset(entries - 1) >= log_size:
+            entries -= 1
+        self._index.truncate(entries * OFFSET.size)
+
+        # Lines the index does not know about yet
+        position = self._offset(entries - 1) if entries else 0
+        self._log.seek(position)
+        if entries:
+            self._log.readline()
+        missing = []
+        while True:
+            start = self._log.tell()
+            line = self._log.readline()
+            if not line.endswith(b"\n"):  # a torn last line is cut off
+                self._log.truncate(start)
+                break
+            missing.append(start)
+        if missing:
+            self._index.seek(0, os.SEEK_END)
+            self._index.write(b"".join(OFFSET.pack(o) for o in missing))
+            self._sync(self._index)
+
+    def _offset(self, i: int) -> int:
+        self._index.seek(i * OFFSET.size)
+        return OFFSET.unpack(self._index.read(OFFSET.size))[0]
+
+    @staticmethod
+    def _sync(file):
+        file.flush()
+        os.fsync(file.fileno())
+
+    def append(self, message: BaseMessage):
+        line = json.dumps({"role": message.type, "content": message.content}, ensure_ascii=False) + "\n"
+        offset = self._log.seek(0, os.SEEK_END)
+        self._log.write(line.encode("utf-8"))
+        self._sync(self._log)  # the message itself is safe from here on
+        self._index.seek(0, os.SEEK_END)
+        self._index.write(OFFSET.pack(offset))
+        self._sync(self._index)
+
+    def tail(self, n: int) -> List[BaseMessage]:
+        """The last n messages, read without touching the rest of the log"""
+        entries = len(self)
+        if not entries or n <= 0:
+            return []
+        self._log.seek(self._offset(max(0, entries - n)))
+        messages = []
+        for line in self._log.read().splitlines():
+            record = json.loads(line)
+            messages.append(ROLES[record["role"]](content=record["content"]))
+        return messages
+
+    def import_legacy(self, path: str):
+        """One time import of the old logging.txt format ("You: ..." / "AI: ...")"""
+        messages = []
+        with open(path, "r", encoding="utf-8", errors="replace") as file:
+            for line in file:
+                if line.startswith("You:"):
+                    messages.append(HumanMessage(content=line[4:].strip()))
+                elif line.startswith("AI:"):
+                    messages.append(AIMessage(content=line[3:].strip()))
+                elif messages and line.strip() != "End of Conversation":
+                    messages[-1].content += "\n" + line.rstrip("\n")  # rest of a multi-line reply
+        for message in messages:
+            message.content = message.content.strip()
+            self.append(message)
+        return len(messages)
+
+    def close(self):
+        self._log.close()
+        self._index.close()
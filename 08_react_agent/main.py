@@ -1,30 +1,38 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # lets us import the shared helpers in common/
+from functools import lru_cache
 from typing import Annotated, Sequence, TypedDict
 from dotenv import load_dotenv  
 from langchain_core.messages import BaseMessage # The foundational class for all message types in LangGraph
 from langchain_core.messages import ToolMessage # Passes data back to LLM after it calls a tool such as the content and the tool_call_id
 from langchain_core.messages import SystemMessage # Message for providing instructions to the LLM
-from langchain_openai import ChatOpenAI
 from langchain_core.tools import tool
-from langgraph.graph.message import add_messages
 from langgraph.graph import StateGraph, END
 from langgraph.prebuilt import ToolNode
+from common.llm_cache import CachedChatModel, default_llm_cache
+from common.reducers import append_messages
+from common.tool_cache import ToolCache, pure, DEFAULT_PATH as TOOL_CACHE_PATH
 
 load_dotenv()
 
 class AgentState(TypedDict):
-    messages: Annotated[Sequence[BaseMessage], add_messages]
+    messages: Annotated[Sequence[BaseMessage], append_messages] # add_messages that only touches the new messages
 
+@pure # same arguments, same result, so the ToolNode only runs it once
 @tool
 def add(a: int, b:int):
     """This is an addition function that adds 2 numbers together"""
 
     return a + b 
 
+@pure
 @tool
 def subtract(a: int, b: int):
     """Subtraction function"""
     return a - b
 
+@pure
 @tool
 def multiply(a: int, b: int):
     """Multiplication function"""
@@ -32,14 +40,29 @@ def multiply(a: int, b: int):
 
 tools = [add, subtract, multiply]
 
-model = ChatOpenAI(model = "gpt-4o").bind_tools(tools)
+
+@lru_cache(maxsize=None)
+def build_tool_cache():
+    # pure results never go stale, so they are kept on disk across runs too
+    return ToolCache(tools, path=TOOL_CACHE_PATH)
+
+
+@lru_cache(maxsize=None)
+def build_model():
+    """Built on the first model call, importing this file stays cheap"""
+    from langchain_openai import ChatOpenAI
+    from common.http_clients import openai_http_client, openai_async_http_client
+    # the pooled HTTP clients are shared with every other graph served from the same process
+    llm = ChatOpenAI(model = "gpt-4o", http_client=openai_http_client(), http_async_client=openai_async_http_client())
+    # LLM_CACHE_MODE=record records the run, LLM_CACHE_MODE=replay replays it offline
+    return CachedChatModel(model=llm, store=default_llm_cache()).bind_tools(tools)
 
 
 def model_call(state:AgentState) -> AgentState:
     system_prompt = SystemMessage(content=
         "You are my AI assistant, please answer my query to the best of your ability."
     )
-    response = model.invoke([system_prompt] + state["messages"])
+    response = build_model().invoke([system_prompt] + state["messages"])
     return {"messages": [response]}
 
 
@@ -52,27 +75,30 @@ def should_continue(state: AgentState):
         return "continue"
     
 
-graph = StateGraph(AgentState)
-graph.add_node("our_agent", model_call)
+@lru_cache(maxsize=None)
+def build_graph():
+    graph = StateGraph(AgentState)
+    graph.add_node("our_agent", model_call)
 
 
-tool_node = ToolNode(tools=tools)
-graph.add_node("tools", tool_node)
+    tool_cache = build_tool_cache()
+    tool_node = ToolNode(tools=tools, wrap_tool_call=tool_cache.wrap_tool_call, awrap_tool_call=tool_cache.awrap_tool_call)
+    graph.add_node("tools", tool_node)
 
-graph.set_entry_point("our_agent")
+    graph.set_entry_point("our_agent")
 
-graph.add_conditional_edges(
-    "our_agent",
-    should_continue,
-    {
-        "continue": "tools",
-        "end": END,
-    },
-)
+    graph.add_conditional_edges(
+        "our_agent",
+        should_continue,
+        {
+            "continue": "tools",
+            "end": END,
+        },
+    )
 
-graph.add_edge("tools", "our_agent")
+    graph.add_edge("tools", "our_agent")
 
-app = graph.compile()
+    return graph.compile()
 
 def print_stream(stream):
     for s in stream:
@@ -82,5 +108,8 @@ def print_stream(stream):
         else:
             message.pretty_print()
 
-inputs = {"messages": [("user", "Add 40 + 12 and then multiply the result by 6. Also tell me a joke please.")]}
-print_stream(app.stream(inputs, stream_mode="values"))
\ No newline at end of file
+if __name__ == "__main__": # importing this file (e.g. from 16_agent_server) does not run the demo
+    inputs = {"messages": [("user", "Add 40 + 12 and then multiply the result by 6. Also tell me a joke please.")]}
+    print_stream(build_graph().stream(inputs, stream_mode="values"))
+    print(default_llm_cache().stats)
+    print(build_tool_cache().stats)
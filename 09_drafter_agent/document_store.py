@@ -0,0 +1,211 @@
+"""Piece table document for the Drafter, with line edits, versions and compact diffs.
+
+The Drafter used to keep the document in one string: every `update` sent the whole text in
+the tool call, echoed it back in the ToolMessage and pasted it into the system prompt again,
+so a one word fix on a long document cost three copies of it per turn.
+
+DocumentStore keeps the lines in an append-only buffer and the document as a tuple of pieces
+(start, count) pointing into it. An edit only splits the pieces around the edited range and
+appends the new lines, so it costs O(pieces + edit) instead of O(document). Every edit makes
+a new version; old versions are just the old piece tuples, so snapshots are cheap and any
+version can be restored. Every version also remembers its hunks, which is what the tools
+send back to the model instead of the full text.
+"""
+import difflib
+import threading
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+Piece = Tuple[int, int]  # (start, count) in the line buffer
+
+
+def split_lines(text: str) -> List[str]:
+    """The lines of the text, a trailing newline ends the last line instead of starting a new one"""
+    if not text:
+        return []
+    lines = text.split("\n")
+    return lines[:-1] if text.endswith("\n") else lines
+
+
+@dataclass
+class Hunk:
+    old_start: int  # 0-based line the edit starts at in the previous version
+    new_start: int  # and in this one
+    old: List[str]
+    new: List[str]
+
+    def format(self, max_lines: int = 20) -> str:
+        """Unified diff hunk, long sides cut to max_lines (the model wrote the new lines itself)"""
+        def side(sign, lines):
+            shown = [f"{sign}{line}" for line in lines[:max_lines]]
+            if len(lines) > max_lines:
+                shown.append(f"{sign}... ({len(lines) - max_lines} more lines)")
+            return shown
+        header = f"@@ -{self.old_start + 1},{len(self.old)} +{self.new_start + 1},{len(self.new)} @@"
+        return "\n".join([header] + side("-", self.old) + side("+", self.new))
+
+
+@dataclass
+class Version:
+    number: int
+    pieces: Tuple[Piece, ...]
+    line_count: int
+    chars: int
+    hunks: List[Hunk]
+    note: str = ""
+    newline: bool = False  # the text ends with a newline, kept so text() gives back what was written
+
+
+class DocumentStore:
+    """A line based piece table, 1-based line numbers in the public methods like in the tools"""
+
+    def __init__(self, text: str = "", max_pieces: int = 1024, first_version: int = 0):
+        self.max_pieces = max_pieces  # above this the pieces are compacted into one
+        self._lines: List[str] = []  # append-only, so old versions stay valid
+        self._lock = threading.RLock()  # ToolNode runs the tool calls of one turn in threads
+        lines = split_lines(text)
+        self._lines.extend(lines)
+        self._first = first_version  # a document reloaded from a snapshot keeps counting from there
+        self._versions = [Version(first_version, ((0, len(lines)),) if lines else (), len(lines),
+                                  sum(map(len, lines)), [], "opened", text.endswith("\n"))]
+
+    @property
+    def version(self) -> int:
+        return self._versions[-1].number
+
+    @property
+    def line_count(self) -> int:
+        return self._versions[-1].line_count
+
+    def _iter_lines(self, pieces, start: int = 0, end: Optional[int] = None):
+        """Lines start..end (0-based, end exclusive) of the given pieces"""
+        offset = 0
+        for piece_start, count in pieces:
+            if end is not None and offset >= end:
+                return
+            if offset + count > start:
+                lo = max(start - offset, 0)
+                hi = count if end is None else min(end - offset, count)
+                yield from self._lines[piece_start + lo:piece_start + hi]
+            offset += count
+
+    def version_info(self, number: Optional[int] = None) -> Version:
+        """The latest or the given version, its piece table, size and hunks"""
+        if number is None:
+            return self._versions[-1]
+        if not self._first <= number <= self.version:
+            raise ValueError(f"there is no version {number}, the versions are {self._first}-{self.version}")
+        return self._versions[number - self._first]
+
+    def lines(self, start: int = 1, end: Optional[int] = None, version: Optional[int] = None) -> List[str]:
+        """Lines start..end (1-based, inclusive) of the current or an older version"""
+        pieces = self.version_info(version).pieces
+        return list(self._iter_lines(pieces, start - 1, end))
+
+    def text(self, version: Optional[int] = None) -> str:
+        info = self.version_info(version)
+        text = "\n".join(self.lines(version=version))
+        return text + "\n" if info.newline and info.line_count else text
+
+    def view(self, start: int = 1, end: Optional[int] = None) -> str:
+        """Line numbered, for the model"""
+        return "\n".join(f"{i:>5}| {line}" for i, line in enumerate(self.lines(start, end), start=max(start, 1)))
+
+    def _splice(self, pieces, start: int, end: int, new_lines: List[str]):
+        """Pieces with lines start..end (0-based, end exclusive) replaced by new_lines"""
+        before, after, offset = [], [], 0
+        for piece_start, count in pieces:
+            piece_end = offset + count
+            if piece_end <= start:
+                before.append((piece_start, count))
+            elif offset >= end:
+                after.append((piece_start, count))
+            else:  # the edit cuts through this piece, keep what is outside of it
+                if offset < start:
+                    before.append((piece_start, start - offset))
+                if piece_end > end:
+                    after.append((piece_start + end - offset, piece_end - end))
+            offset = piece_end
+        middle = []
+        if new_lines:
+            middle = [(len(self._lines), len(new_lines))]
+            self._lines.extend(new_lines)
+        return tuple(before + middle + after)
+
+    def _commit(self, edits: List[Tuple[int, int, List[str]]], note: str, newline: Optional[bool] = None) -> Version:
+        """Applies (start, end, new lines) edits, 0-based, sorted and not overlapping, as one version.
+        Line edits keep the trailing newline of the document, newline=True/False sets it"""
+        with self._lock:
+            current = self._versions[-1]
+            pieces, hunks, shift, chars = current.pieces, [], 0, current.chars
+            for start, end, new_lines in edits:
+                old = list(self._iter_lines(current.pieces, start, end))
+                pieces = self._splice(pieces, start + shift, end + shift, new_lines)
+                hunks.append(Hunk(start, start + shift, old, new_lines))
+                shift += len(new_lines) - (end - start)
+                chars += sum(map(len, new_lines)) - sum(map(len, old))
+            line_count = current.line_count + shift
+            if len(pieces) > self.max_pieces:
+                compacted = list(self._iter_lines(pieces))
+                pieces = ((len(self._lines), len(compacted)),)
+                self._lines.extend(compacted)
+            newline = current.newline if newline is None else newline
+            version = Version(current.number + 1, pieces, line_count, chars, hunks, note, newline)
+            self._versions.append(version)
+            return version
+
+    def _check(self, start: int, end: int):
+        if not 1 <= start <= self.line_count + 1 or end < start - 1 or end > self.line_count:
+            raise ValueError(f"lines {start}-{end} are outside the document (1-{self.line_count})")
+
+    def insert(self, line: int, text: str) -> Version:
+        """Inserts text before the given line, line_count + 1 appends"""
+        with self._lock:
+            self._check(line, line - 1)
+            return self._commit([(line - 1, line - 1, split_lines(text))], f"inserted at line {line}")
+
+    def replace(self, start: int, end: int, text: str) -> Version:
+        with self._lock:
+            self._check(start, end)
+            return self._commit([(start - 1, end, split_lines(text))], f"replaced lines {start}-{end}")
+
+    def delete(self, start: int, end: int) -> Version:
+        with self._lock:
+            self._check(start, end)
+            return self._commit([(start - 1, end, [])], f"deleted lines {start}-{end}")
+
+    def set_text(self, text: str, note: str = "rewrote the document") -> Version:
+        """Rewrites the whole document, but only the lines that actually changed become hunks"""
+        with self._lock:
+            old, new = self.lines(), split_lines(text)
+            matcher = difflib.SequenceMatcher(a=old, b=new, autojunk=False)
+            edits = [(i1, i2, new[j1:j2]) for op, i1, i2, j1, j2 in matcher.get_opcodes() if op != "equal"]
+            return self._commit(edits, note, newline=text.endswith("\n"))
+
+    def restore(self, version: int) -> Version:
+        """A new version with the content of an older one"""
+        with self._lock:
+            return self.set_text(self.text(version), f"restored version {version}")
+
+    def apply(self, edits: List[Tuple[int, int, List[str]]], note: str, newline: Optional[bool] = None) -> Version:
+        """Replays the hunks of a version recorded elsewhere, as (old start, old end, new lines), 0-based"""
+        with self._lock:
+            return self._commit(edits, note, newline)
+
+    def changes_since(self, version: int) -> List[Version]:
+        """The versions after the given one, oldest first"""
+        return self._versions[max(version - self._first + 1, 0):]
+
+    def diff(self, version: Optional[int] = None) -> str:
+        """The hunks of a version, what the tools send back instead of the document"""
+        v = self.version_info(version)
+        body = "\n".join(h.format() for h in v.hunks) or "(no changes)"
+        return f"version {v.number}: {v.note}, {v.line_count} lines\n{body}"
+
+    def summary(self) -> str:
+        """What the system prompt says about the document"""
+        if not self.line_count:
+            return "The document is empty."
+        return (f"The document is at version {self.version} and has {self.line_count} lines "
+                f"(~{self._versions[-1].chars // 4} tokens). Use the view tool to read line "
+                f"numbered ranges of it before editing lines you have not seen in this conversation.")
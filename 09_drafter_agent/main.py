@@ -1,68 +1,157 @@
+import asyncio
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # lets us import the shared helpers in common/
+from functools import lru_cache
 from typing import Annotated, Sequence, TypedDict
 from dotenv import load_dotenv  
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, ToolMessage, SystemMessage
-from langchain_openai import ChatOpenAI
-from langchain_core.tools import tool
-from langgraph.graph.message import add_messages
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import StructuredTool, tool
 from langgraph.graph import StateGraph, END
 from langgraph.prebuilt import ToolNode
+from common.llm_cache import CachedChatModel, default_llm_cache
+from common.reducers import append_messages
+from session_store import DraftSession
 
 load_dotenv()
 
-# This is the global variable to store document content
-document_content = ""
+
+# One document per session (the thread_id), a piece table with versions (see document_store.py)
+# that autosaves to its own folder (see session_store.py)
+@lru_cache(maxsize=None)
+def get_session(session_id: str) -> DraftSession:
+    return DraftSession(session_id)
+
+
+def session_for(config: RunnableConfig) -> DraftSession:
+    return get_session((config or {}).get("configurable", {}).get("thread_id", "default"))
+
+
+def edited(session: DraftSession, version) -> str:
+    session.autosave()  # only queued, the journal is written in the background
+    return session.document.diff(version.number)  # this edit's hunks, not whatever version is the latest now
 
 class AgentState(TypedDict):
-    messages: Annotated[Sequence[BaseMessage], add_messages]
+    messages: Annotated[Sequence[BaseMessage], append_messages] # add_messages that only touches the new messages
+
+
+# The edit tools answer with a compact diff of what changed, not with the whole document
+
+@tool
+def view(config: RunnableConfig, start: int = 1, end: int = 0) -> str:
+    """Shows lines start to end (1-based, inclusive, 0 means the last line) of the document, with line numbers."""
+    return session_for(config).document.view(start, end or None) or "The document is empty."
+
+
+@tool
+def insert(line: int, text: str, config: RunnableConfig) -> str:
+    """Inserts text before the given line number. Use the number of lines + 1 to append at the end."""
+    session = session_for(config)
+    try:
+        return edited(session, session.document.insert(line, text))
+    except ValueError as e:
+        return f"Error: {e}"
+
+
+@tool
+def replace(start: int, end: int, text: str, config: RunnableConfig) -> str:
+    """Replaces lines start to end (1-based, inclusive) with the text."""
+    session = session_for(config)
+    try:
+        return edited(session, session.document.replace(start, end, text))
+    except ValueError as e:
+        return f"Error: {e}"
+
+
+@tool
+def delete(start: int, end: int, config: RunnableConfig) -> str:
+    """Deletes lines start to end (1-based, inclusive)."""
+    session = session_for(config)
+    try:
+        return edited(session, session.document.delete(start, end))
+    except ValueError as e:
+        return f"Error: {e}"
 
 
 @tool
-def update(content: str) -> str:
-    """Updates the document with the provided content."""
-    global document_content
-    document_content = content
-    return f"Document has been updated successfully! The current content is:\n{document_content}"
+def update(content: str, config: RunnableConfig) -> str:
+    """Replaces the whole document with the provided content. Only use it for a new document or a full rewrite."""
+    session = session_for(config)
+    return edited(session, session.document.set_text(content))
 
 
 @tool
-def save(filename: str) -> str:
+def restore(version: int, config: RunnableConfig) -> str:
+    """Brings back the content of an earlier version of the document, as a new version."""
+    session = session_for(config)
+    try:
+        return edited(session, session.document.restore(version))
+    except ValueError as e:
+        return f"Error: {e}"
+
+
+def saved(path: str) -> str:
+    print(f"\n💾 Document has been saved to: {path}")
+    return f"Document has been saved successfully to '{path}'."
+
+
+def save_document(filename: str, config: RunnableConfig) -> str:
     """Save the current document to a text file and finish the process.
     
     Args:
         filename: Name for the text file.
     """
-
-    global document_content
-
-    if not filename.endswith('.txt'):
-        filename = f"{filename}.txt"
+    try:
+        # temp file + os.replace in the session folder, on the session's writer thread
+        return saved(session_for(config).save(filename).result())
+    except Exception as e:
+        return f"Error saving document: {str(e)}"
 
 
+async def asave_document(filename: str, config: RunnableConfig) -> str:
     try:
-        with open(filename, 'w') as file:
-            file.write(document_content)
-        print(f"\n💾 Document has been saved to: {filename}")
-        return f"Document has been saved successfully to '{filename}'."
-    
+        # same write, awaited so the event loop keeps running while it happens
+        return saved(await session_for(config).asave(filename))
     except Exception as e:
         return f"Error saving document: {str(e)}"
-    
 
-tools = [update, save]
 
-model = ChatOpenAI(model="gpt-4o").bind_tools(tools)
+# invoke/stream of the graph call the sync version, ainvoke/astream (run_document_agent) the async one
+save = StructuredTool.from_function(func=save_document, coroutine=asave_document, name="save")
+
+
+tools = [view, insert, replace, delete, update, restore, save]
 
-def our_agent(state: AgentState) -> AgentState:
-    system_prompt = SystemMessage(content=f"""
+
+@lru_cache(maxsize=None)
+def build_model():
+    from langchain_openai import ChatOpenAI # deferred, the drafter only needs it once it runs
+    # LLM_CACHE_MODE=record records a session, LLM_CACHE_MODE=replay replays it offline
+    # one tool call per message: the line numbers of an edit are only right after the edit before it
+    return CachedChatModel(model=ChatOpenAI(model="gpt-4o"), store=default_llm_cache()).bind_tools(
+        tools, parallel_tool_calls=False)
+
+
+def build_system_prompt(document) -> SystemMessage:
+    # only a summary of the document, the model reads line ranges with the view tool when it needs them
+    return SystemMessage(content=f"""
     You are Drafter, a helpful writing assistant. You are going to help the user update and modify documents.
     
-    - If the user wants to update or modify content, use the 'update' tool with the complete updated content.
+    - To create a document or rewrite all of it, use the 'update' tool with the complete content.
+    - For smaller changes use the 'insert', 'replace' and 'delete' tools with line numbers, one edit per message,
+      the line numbers after an edit are in its diff.
+    - 'restore' brings back an earlier version.
     - If the user wants to save and finish, you need to use the 'save' tool.
-    - Make sure to always show the current document state after modifications.
+    - Tell the user what changed after modifications.
     
-    The current document content is:{document_content}
+    {document.summary()}
     """)
 
+
+def our_agent(state: AgentState, config: RunnableConfig) -> AgentState:
+    system_prompt = build_system_prompt(session_for(config).document)
+
     if not state["messages"]:
         user_input = "I'm ready to help you update a document. What would you like to create?"
         user_message = HumanMessage(content=user_input)
@@ -74,13 +163,14 @@ def our_agent(state: AgentState) -> AgentState:
 
     all_messages = [system_prompt] + list(state["messages"]) + [user_message]
 
-    response = model.invoke(all_messages)
+    response = build_model().invoke(all_messages)
 
     print(f"\n🤖 AI: {response.content}")
     if hasattr(response, "tool_calls") and response.tool_calls:
         print(f"🔧 USING TOOLS: {[tc['name'] for tc in response.tool_calls]}")
 
-    return {"messages": list(state["messages"]) + [user_message, response]}
+    # only the new messages, the reducer appends them (returning the whole history re-merged all of it every turn)
+    return {"messages": [user_message, response]}
 
 
 def should_continue(state: AgentState) -> str:
@@ -111,37 +201,47 @@ def print_messages(messages):
             print(f"\n🛠️ TOOL RESULT: {message.content}")
 
 
-graph = StateGraph(AgentState)
+@lru_cache(maxsize=None)
+def build_graph():
+    graph = StateGraph(AgentState)
 
-graph.add_node("agent", our_agent)
-graph.add_node("tools", ToolNode(tools))
+    graph.add_node("agent", our_agent)
+    graph.add_node("tools", ToolNode(tools))
 
-graph.set_entry_point("agent")
+    graph.set_entry_point("agent")
 
-graph.add_edge("agent", "tools")
+    graph.add_edge("agent", "tools")
 
 
-graph.add_conditional_edges(
-    "tools",
-    should_continue,
-    {
-        "continue": "agent",
-        "end": END,
-    },
-)
+    graph.add_conditional_edges(
+        "tools",
+        should_continue,
+        {
+            "continue": "agent",
+            "end": END,
+        },
+    )
 
-app = graph.compile()
+    return graph.compile()
 
-def run_document_agent():
+async def run_document_agent(session_id: str = "default"):
     print("\n ===== DRAFTER =====")
     
     state = {"messages": []}
+    config = {"configurable": {"thread_id": session_id}}
+    session = get_session(session_id)
+    if session.document.line_count:
+        print(f"\n📄 Recovered the autosaved document of session '{session_id}': {session.document.summary()}")
     
-    for step in app.stream(state, stream_mode="values"):
+    # async, so the save tool waits for its write without blocking the loop (the agent node runs in a thread)
+    async for step in build_graph().astream(state, config, stream_mode="values"):
         if "messages" in step:
             print_messages(step["messages"])
     
+    session.flush()  # the last autosave
     print("\n ===== DRAFTER FINISHED =====")
+    print(session.stats)
+    print(default_llm_cache().stats)
 
 if __name__ == "__main__":
-    run_document_agent()
\ No newline at end of file
+    asyncio.run(run_document_agent(sys.argv[1] if len(sys.argv) > 1 else "default"))
\ No newline at end of file
@@ -0,0 +1,189 @@
+"""Per-session, crash safe persistence of the Drafter's document.
+
+The save tool used to open(filename, 'w') in the current directory, inside the agent turn:
+two sessions saving "report.txt" overwrote each other, a crash in the middle of the write
+left a truncated file, and a long document held the turn (and an event loop running the
+graph) for the whole write.
+
+Every session (the thread_id of the run) now gets its own folder, `<sessions>/<thread_id>/`:
+
+  - `<filename>.txt` is written to a temp file in the same folder, fsync'd and moved over
+    the old one with os.replace, so a crash leaves either the old or the new file.
+  - `autosave.jsonl` is the incremental autosave: after every edit only the hunks of the new
+    versions are appended (one JSON line per version), not the document. The first line is
+    a snapshot of the document; once the journal grows past `compact_ratio` times the
+    document it is rewritten as a single new snapshot, again through a temp file. A session
+    reopened after a crash replays it, a torn last line is cut off.
+
+Both writes run on one background writer thread per session, in order, so an edit turn
+only queues its autosave, and asave() waits for a save without blocking the event loop.
+flush() waits for everything queued.
+"""
+import asyncio
+import json
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+
+from document_store import DocumentStore
+
+SESSIONS_DIR = os.environ.get("DRAFTER_SESSIONS_DIR", "./09_drafter_agent/sessions")
+
+
+def safe_name(name: str) -> str:
+    """A file name that stays inside the session folder"""
+    name = re.sub(r"[^\w.\- ]", "_", os.path.basename(name.strip())).strip(". ")
+    return name or "document"
+
+
+def _sync(file):
+    file.flush()
+    os.fsync(file.fileno())
+
+
+def atomic_write(path: str, chunks) -> int:
+    """Writes the text (or its chunks) to path through a temp file, returns the bytes written"""
+    folder = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=".", suffix=".tmp")  # same folder, so os.replace is atomic
+    written = 0
+    try:
+        with os.fdopen(fd, "wb") as file:
+            for chunk in [chunks] if isinstance(chunks, str) else chunks:
+                written += file.write(chunk.encode("utf-8"))
+            _sync(file)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return written
+
+
+@dataclass
+class SaveStats:
+    saves: int = 0
+    autosaves: int = 0  # journal appends
+    compactions: int = 0  # snapshots rewritten
+    bytes_written: int = 0
+
+    def __str__(self):
+        return (f"{self.saves} saves, {self.autosaves} autosaves, {self.compactions} snapshots, "
+                f"{self.bytes_written / 1024:.1f}KiB written")
+
+
+class DraftSession:
+    def __init__(self, session_id: str, root: str = SESSIONS_DIR, compact_ratio: float = 2.0):
+        self.session_id = session_id
+        self.folder = os.path.join(root, safe_name(session_id))
+        os.makedirs(self.folder, exist_ok=True)
+        self.journal_path = os.path.join(self.folder, "autosave.jsonl")
+        self.compact_ratio = compact_ratio
+        self.stats = SaveStats()
+        self.document = self._recover()
+        self._journaled = self.document.version  # last version in the journal
+        self._journal_bytes = os.path.getsize(self.journal_path) if os.path.exists(self.journal_path) else 0
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"drafter-{self.session_id}")
+        self._lock = threading.Lock()
+        self._autosave_queued = False
+
+    def _recover(self) -> DocumentStore:
+        """The document as the journal left it, or an empty one"""
+        if not os.path.exists(self.journal_path):
+            return DocumentStore()
+        records = []
+        with open(self.journal_path, "rb+") as file:
+            for line in iter(file.readline, b""):
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("no newline")
+                    records.append(json.loads(line))
+                except ValueError:  # torn last line, the edit it held is lost
+                    file.truncate(file.tell() - len(line))  # so the next appends do not land behind it
+                    break
+        if not records or "snapshot" not in records[0]:
+            return DocumentStore()
+        snapshot = records[0]
+        text = "\n".join(snapshot["lines"]) + ("\n" if snapshot.get("newline") else "")
+        document = DocumentStore(text, first_version=snapshot["snapshot"])
+        for record in records[1:]:
+            document.apply([tuple(edit) for edit in record["edits"]], record["note"], record.get("newline"))
+        return document
+
+    # --- autosave ---
+
+    def autosave(self):
+        """Queues the journal append of the versions made since the last one, does not wait for it"""
+        with self._lock:
+            if self._autosave_queued:  # the queued append will pick up this version too
+                return
+            self._autosave_queued = True
+        self._writer.submit(self._append_journal)
+
+    def _append_journal(self):
+        with self._lock:
+            self._autosave_queued = False
+        changes = self.document.changes_since(self._journaled)
+        if not changes:
+            return
+        size = changes[-1].chars + changes[-1].line_count  # about the bytes of the document
+        if not self._journal_bytes or self._journal_bytes > self.compact_ratio * size + 64 * 1024:
+            return self._compact()
+        data = "".join(json.dumps({"version": v.number, "note": v.note, "newline": v.newline,
+                                   "edits": [[h.old_start, h.old_start + len(h.old), h.new] for h in v.hunks]},
+                                  ensure_ascii=False) + "\n" for v in changes).encode("utf-8")
+        with open(self.journal_path, "ab") as file:
+            file.write(data)
+            _sync(file)
+        self._journaled = changes[-1].number
+        self._journal_bytes += len(data)
+        self.stats.autosaves += 1
+        self.stats.bytes_written += len(data)
+
+    def _compact(self):
+        """Rewrites the journal as one snapshot of the current version"""
+        version = self.document.version
+        line = json.dumps({"snapshot": version, "newline": self.document.version_info(version).newline,
+                           "lines": self.document.lines(version=version)}, ensure_ascii=False) + "\n"
+        self._journal_bytes = atomic_write(self.journal_path, line)
+        self._journaled = version
+        self.stats.compactions += 1
+        self.stats.bytes_written += self._journal_bytes
+
+    # --- save ---
+
+    def path(self, filename: str) -> str:
+        filename = safe_name(filename)
+        if not filename.endswith(".txt"):
+            filename = f"{filename}.txt"
+        return os.path.join(self.folder, filename)
+
+    def save(self, filename: str) -> Future:
+        """Queues an atomic write of the current version, the future resolves to the path"""
+        path, version = self.path(filename), self.document.version  # old versions never change, safe to write later
+        return self._writer.submit(self._save, path, version)
+
+    def _chunks(self, version: int, lines: int = 4096):
+        # a few thousand lines at a time, one huge join and encode would hold the GIL (and the event loop) for long
+        info = self.document.version_info(version)
+        for start in range(1, info.line_count + 1, lines):
+            yield ("\n" if start > 1 else "") + "\n".join(self.document.lines(start, start + lines - 1, version))
+        if info.newline and info.line_count:
+            yield "\n"
+
+    def _save(self, path: str, version: int) -> str:
+        self.stats.bytes_written += atomic_write(path, self._chunks(version))
+        self.stats.saves += 1
+        return path
+
+    async def asave(self, filename: str) -> str:
+        return await asyncio.wrap_future(self.save(filename))
+
+    def flush(self):
+        """Waits for the queued saves and autosaves"""
+        self._writer.submit(lambda: None).result()
+
+    def close(self):
+        self.flush()
+        self._writer.shutdown()
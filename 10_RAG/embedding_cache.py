@@ -0,0 +1,210 @@
+"""Disk backed embedding cache for the RAG agent.
+
+Wraps any LangChain embeddings object. Vectors are keyed by (model, dimension, sha256 of
+the text) and stored as float32 blobs in SQLite, with a small LRU dictionary in front so
+repeated queries never touch the disk. Both layers are bounded and evict the least
+recently used vectors first.
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0          # served from memory or disk
+    memory_hits: int = 0
+    misses: int = 0        # had to call the real embedding model
+    api_calls: int = 0
+    bytes_saved: int = 0   # text bytes we did not have to send to the API
+    miss_seconds: float = 0.0
+    seconds_per_miss: float = 0.0  # averaged over every run that used this cache file
+
+    @property
+    def seconds_saved(self) -> float:
+        """Rough estimate: every hit saves what an average miss costs"""
+        return self.hits * self.seconds_per_miss
+
+    def __str__(self):
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return (f"embedding cache: {self.hits} hits ({self.memory_hits} from memory), "
+                f"{self.misses} misses, hit rate {rate:.0%}, {self.api_calls} API calls, "
+                f"{self.bytes_saved} bytes saved, ~{self.seconds_saved:.2f}s saved")
+
+
+def _to_blob(vector: List[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def _from_blob(blob: bytes) -> List[float]:
+    vector = array("f")
+    vector.frombytes(blob)
+    return vector.tolist()
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only calls the wrapped model for texts it has never seen"""
+
+    def __init__(self, embeddings: Embeddings, path: str, max_entries: int = 100_000,
+                 memory_entries: int = 2_048, model: Optional[str] = None,
+                 dimensions: Optional[int] = None):
+        self.embeddings = embeddings
+        self.model = model or getattr(embeddings, "model", None) or type(embeddings).__name__
+        self.dimensions = dimensions or getattr(embeddings, "dimensions", None) or getattr(embeddings, "size", None)
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.stats = CacheStats()
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings(last_used)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS misses (texts INTEGER NOT NULL, seconds REAL NOT NULL)")
+        self._db.execute("INSERT INTO misses SELECT 0, 0 WHERE NOT EXISTS (SELECT 1 FROM misses)")
+        self._db.commit()
+        self._update_seconds_per_miss()
+
+    def _update_seconds_per_miss(self):
+        texts, seconds = self._db.execute("SELECT texts, seconds FROM misses").fetchone()
+        self.stats.seconds_per_miss = seconds / texts if texts else 0.0
+
+    def key(self, text: str) -> str:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{self.model}:{self.dimensions}:{digest}"
+
+    def _remember(self, key: str, vector: List[float]):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, texts: List[str]):
+        """Returns the cached vectors (None where missing) and the keys for every text"""
+        keys = [self.key(t) for t in texts]
+        vectors = [None] * len(texts)
+        with self._lock:
+            on_disk = []
+            for i, key in enumerate(keys):
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    vectors[i] = self._memory[key]
+                    self.stats.memory_hits += 1
+                else:
+                    on_disk.append(key)
+
+            if on_disk:
+                found = {}
+                for start in range(0, len(on_disk), 500):  # stay below SQLite's variable limit
+                    batch = on_disk[start:start + 500]
+                    rows = self._db.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                        batch,
+                    ).fetchall()
+                    found.update((key, _from_blob(blob)) for key, blob in rows)
+                if found:
+                    now = time.time()
+                    self._db.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?",
+                                         [(now, key) for key in found])
+                    self._db.commit()
+                for i, key in enumerate(keys):
+                    if vectors[i] is None and key in found:
+                        vectors[i] = found[key]
+                        self._remember(key, found[key])
+
+            for text, vector in zip(texts, vectors):
+                if vector is not None:
+                    self.stats.hits += 1
+                    self.stats.bytes_saved += len(text.encode("utf-8"))
+        return vectors, keys
+
+    def _store(self, keys: List[str], vectors: List[List[float]], seconds: float):
+        now = time.time()
+        with self._lock:
+            self.stats.api_calls += 1
+            self.stats.misses += len(keys)
+            self.stats.miss_seconds += seconds
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, _to_blob(vector), now) for key, vector in zip(keys, vectors)],
+            )
+            self._db.execute("UPDATE misses SET texts = texts + ?, seconds = seconds + ?", (len(keys), seconds))
+            self._update_seconds_per_miss()
+            for key, vector in zip(keys, vectors):
+                self._remember(key, vector)
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        (count,) = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        if count > self.max_entries:
+            self._db.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def _missing(self, texts, vectors, keys):
+        """Unique texts that still need embedding, with their keys"""
+        missing = {}
+        for text, vector, key in zip(texts, vectors, keys):
+            if vector is None and key not in missing:
+                missing[key] = text
+        return list(missing.keys()), list(missing.values())
+
+    def _fill(self, vectors, keys, missing_keys, new_vectors):
+        by_key = dict(zip(missing_keys, new_vectors))
+        return [v if v is not None else by_key[k] for v, k in zip(vectors, keys)]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors, keys = self._lookup(texts)
+        missing_keys, missing_texts = self._missing(texts, vectors, keys)
+        if not missing_texts:
+            return vectors
+        start = time.perf_counter()
+        new_vectors = self.embeddings.embed_documents(missing_texts)
+        self._store(missing_keys, new_vectors, time.perf_counter() - start)
+        return self._fill(vectors, keys, missing_keys, new_vectors)
+
+    def embed_query(self, text: str) -> List[float]:
+        vectors, keys = self._lookup([text])
+        if vectors[0] is not None:
+            return vectors[0]
+        start = time.perf_counter()
+        vector = self.embeddings.embed_query(text)
+        self._store(keys, [vector], time.perf_counter() - start)
+        return vector
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors, keys = self._lookup(texts)
+        missing_keys, missing_texts = self._missing(texts, vectors, keys)
+        if not missing_texts:
+            return vectors
+        start = time.perf_counter()
+        new_vectors = await self.embeddings.aembed_documents(missing_texts)
+        self._store(missing_keys, new_vectors, time.perf_counter() - start)
+        return self._fill(vectors, keys, missing_keys, new_vectors)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        vectors, keys = self._lookup([text])
+        if vectors[0] is not None:
+            return vectors[0]
+        start = time.perf_counter()
+        vector = await self.embeddings.aembed_query(text)
+        self._store(keys, [vector], time.perf_counter() - start)
+        return vector
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,491 @@
+"""Incremental ingestion for the RAG agent.
+
+Every page and every chunk is hashed, so a restart only embeds what actually changed.
+A small JSON manifest next to the Chroma files remembers which chunk ids belong to which
+PDF, and the collection itself is asked which of those ids it still holds.
+
+Pages are loaded and split one at a time (the unfinished last chunk of a page is carried
+into the next one, so overlap works across page boundaries) and new chunks are streamed
+into token budgeted batches embedded by a bounded pool of asyncio workers. Every batch is written to the
+vector store as soon as it is embedded, and rate limit errors slow all workers down
+together instead of failing the whole ingest.
+"""
+import asyncio
+import glob
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import queue as queue_module
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from langchain_core.documents import Document
+from langchain_community.document_loaders import PyPDFLoader
+
+MANIFEST_NAME = "ingest_manifest.json"
+VERSION_NAME = "collection_version"
+
+
+@dataclass
+class IngestStats:
+    source: str
+    files: int = 0
+    pages: int = 0
+    chunks: int = 0
+    embedded: int = 0
+    skipped: int = 0
+    deleted: int = 0
+    batches: int = 0
+    retries: int = 0
+    first_indexed_seconds: float = 0.0  # time until the first batch was searchable
+    seconds: float = 0.0
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.embedded / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (f"{self.source}: {self.files} files, {self.pages} pages, {self.chunks} chunks, "
+                f"{self.embedded} embedded in {self.batches} batches, {self.skipped} skipped, "
+                f"{self.deleted} deleted, {self.retries} retries "
+                f"in {self.seconds:.2f}s ({self.chunks_per_second:.1f} chunks/s)")
+
+
+def sha256_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_id(source: str, page: int, text: str) -> str:
+    """Stable id for a chunk - the same text on the same page always maps to the same id"""
+    return sha256_text(f"{source}|{page}|{text}")
+
+
+def load_manifest(persist_directory: str) -> dict:
+    path = os.path.join(persist_directory, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as file:
+        return json.load(file)
+
+
+def save_manifest(persist_directory: str, manifest: dict):
+    path = os.path.join(persist_directory, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(manifest, file)
+    os.replace(tmp_path, path)  # never leave a half written manifest behind
+
+
+def collection_version(persist_directory: str):
+    """Changes every time an ingest adds or deletes chunks, so caches know when to drop their entries"""
+    path = os.path.join(persist_directory, VERSION_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as file:
+        return int(file.read() or 0)
+
+
+def bump_collection_version(persist_directory: str, stats: "IngestStats"):
+    """A restart that only skipped chunks keeps the version, and with it every cached answer"""
+    if not stats.embedded and not stats.deleted:
+        return
+    path = os.path.join(persist_directory, VERSION_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as file:
+        file.write(str((collection_version(persist_directory) or 0) + 1))
+    os.replace(tmp_path, path)
+
+
+def existing_ids(vectorstore, ids) -> set:
+    """Asks the collection which of the given ids it already holds"""
+    if not ids:
+        return set()
+    return set(vectorstore.get(ids=list(ids), include=[])["ids"])
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token), good enough for batching"""
+    return len(text) // 4 + 1
+
+
+def is_rate_limit(error: Exception) -> bool:
+    """True for 429 style errors, whatever client raised them"""
+    if getattr(error, "status_code", None) == 429:
+        return True
+    return "ratelimit" in type(error).__name__.lower() or "rate limit" in str(error).lower()
+
+
+class AdaptiveBackoff:
+    """Shared by all workers: one rate limit error pauses everybody, successes speed back up"""
+
+    def __init__(self, initial: float = 1.0, maximum: float = 60.0, max_retries: int = 8):
+        self.initial = initial
+        self.maximum = maximum
+        self.max_retries = max_retries
+        self.delay = 0.0
+        self.resume_at = 0.0
+
+    async def wait(self):
+        pause = self.resume_at - time.monotonic()
+        if pause > 0:
+            await asyncio.sleep(pause)
+
+    def failed(self):
+        self.delay = min(self.maximum, self.delay * 2 if self.delay else self.initial)
+        # A bit of jitter so the workers do not all retry at the same instant
+        self.resume_at = max(self.resume_at, time.monotonic() + self.delay * random.uniform(1.0, 1.5))
+
+    def succeeded(self):
+        self.delay = self.delay / 2 if self.delay > self.initial else 0.0
+
+
+def store_embedded(vectorstore, chunks, vectors):
+    """Writes already embedded chunks straight into the Chroma collection"""
+    vectorstore._collection.upsert(
+        ids=[c.metadata["chunk_id"] for c in chunks],
+        embeddings=vectors,
+        documents=[c.page_content for c in chunks],
+        metadatas=[c.metadata for c in chunks],
+    )
+
+
+def stream_chunks(pages, text_splitter):
+    """Splits pages one at a time, yielding chunks as soon as they are final.
+
+    The last chunk of every page is held back and split again together with the next
+    page, so chunks (and their overlap) run across page boundaries while only one page
+    and one chunk are ever kept in memory. Every chunk carries the metadata of the page
+    it starts on.
+    """
+    carry, carry_metadata = "", None
+    for page in pages:
+        prefix = carry + "\n" if carry else ""
+        text = prefix + page.page_content
+        pieces = text_splitter.split_text(text)
+        if not pieces:
+            continue
+
+        offset = -1
+        metadata = []
+        for piece in pieces:
+            offset = text.find(piece, offset + 1)
+            starts_in_carry = carry and 0 <= offset < len(prefix)
+            metadata.append(carry_metadata if starts_in_carry else page.metadata)
+
+        for piece, piece_metadata in zip(pieces[:-1], metadata[:-1]):
+            yield Document(page_content=piece, metadata=dict(piece_metadata))
+        carry, carry_metadata = pieces[-1], metadata[-1]
+
+    if carry:
+        yield Document(page_content=carry, metadata=dict(carry_metadata))
+
+
+async def embed_with_backoff(embeddings, texts, backoff: AdaptiveBackoff, stats: IngestStats):
+    for attempt in range(backoff.max_retries + 1):
+        await backoff.wait()
+        try:
+            vectors = await embeddings.aembed_documents(texts)
+            backoff.succeeded()
+            return vectors
+        except Exception as e:
+            if not is_rate_limit(e) or attempt == backoff.max_retries:
+                raise
+            stats.retries += 1
+            backoff.failed()
+
+
+async def embed_and_store(chunks, vectorstore, embeddings, stats: IngestStats, workers: int = 4,
+                          max_tokens: int = 32_000, max_batch: int = 256, backoff: AdaptiveBackoff = None):
+    """Embeds an async stream of chunks with a bounded worker pool, storing each batch when done"""
+    backoff = backoff or AdaptiveBackoff()
+    start = time.perf_counter()
+    queue = asyncio.Queue(maxsize=workers)  # a full queue makes the producer wait (backpressure)
+    write_lock = asyncio.Lock()  # a single writer for the collection
+
+    async def produce():
+        batch, tokens = [], 0
+        async for chunk in chunks:
+            chunk_tokens = estimate_tokens(chunk.page_content)
+            if batch and (tokens + chunk_tokens > max_tokens or len(batch) >= max_batch):
+                await queue.put(batch)
+                batch, tokens = [], 0
+            batch.append(chunk)
+            tokens += chunk_tokens
+        if batch:
+            await queue.put(batch)
+        for _ in range(workers):
+            await queue.put(None)
+
+    async def work():
+        while (batch := await queue.get()) is not None:
+            vectors = await embed_with_backoff(embeddings, [c.page_content for c in batch], backoff, stats)
+            async with write_lock:
+                await asyncio.to_thread(store_embedded, vectorstore, batch, vectors)
+            if not stats.batches:
+                stats.first_indexed_seconds = time.perf_counter() - start
+            stats.embedded += len(batch)
+            stats.batches += 1
+
+    async with asyncio.TaskGroup() as group:
+        group.create_task(produce())
+        for _ in range(workers):
+            group.create_task(work())
+
+
+def chunk_pdf(pdf_path: str, text_splitter, pages_entry: dict):
+    """Streams the chunks of a PDF with their ids, recording page hashes and chunk ids in pages_entry"""
+    source = os.path.abspath(pdf_path)
+
+    def pages():
+        for page in PyPDFLoader(pdf_path).lazy_load():
+            page_number = str(page.metadata.setdefault("page", len(pages_entry)))
+            pages_entry[page_number] = {"sha256": sha256_text(page.page_content), "chunk_ids": []}
+            yield page
+
+    for chunk in stream_chunks(pages(), text_splitter):
+        page_number = str(chunk.metadata.get("page", 0))
+        cid = chunk_id(source, page_number, chunk.page_content)
+        chunk_ids = pages_entry[page_number]["chunk_ids"]
+        if cid in chunk_ids:  # identical text twice on one page carries nothing new
+            continue
+        chunk_ids.append(cid)
+        chunk.metadata["chunk_id"] = cid
+        yield chunk
+
+
+def lookahead(chunks, size=32):
+    """Small groups of chunks, so the collection is asked about many ids at once"""
+    group = []
+    for chunk in chunks:
+        group.append(chunk)
+        if len(group) >= size:
+            yield group
+            group = []
+    if group:
+        yield group
+
+
+def send(queue, stop, item) -> bool:
+    """Puts item on the bounded queue, False once stop is set (the ingest failed and stopped reading)"""
+    while not stop.is_set():
+        try:
+            queue.put(item, timeout=0.5)
+            return True
+        except queue_module.Full:
+            pass
+    return False
+
+
+def split_pdf(pdf_path: str, text_splitter, queue=None, stop=None):
+    """Parses and splits a whole PDF. Runs in a worker process, so it returns plain data.
+
+    With a queue the chunks are sent back in small groups while the PDF is being parsed,
+    followed by ("done", pdf_path, pages_entry), instead of one list of every chunk. The
+    queue is bounded, so a worker that is ahead of the embedding waits instead of piling up,
+    and gives up on the PDF once the stop event is set.
+    """
+    pages_entry = {}
+    chunks = chunk_pdf(pdf_path, text_splitter, pages_entry)
+    if queue is None:
+        return pdf_path, pages_entry, list(chunks)
+    for group in lookahead(chunks):
+        if not send(queue, stop, ("chunks", pdf_path, group)):
+            return
+    send(queue, stop, ("done", pdf_path, pages_entry))
+
+
+def previous_ids(entry: dict) -> set:
+    return {i for page in entry.get("pages", {}).values() for i in page["chunk_ids"]}
+
+
+def unchanged(entry: dict, file_hash: str, present: set) -> bool:
+    """Same file as last time and every one of its chunks is still stored"""
+    return entry.get("file_sha256") == file_hash and present >= previous_ids(entry)
+
+
+def not_stored(vectorstore, chunks, present: set, stats: IngestStats):
+    """Filters out the chunks the collection already holds, counting them as skipped"""
+    # The manifest may be missing or out of date, so the collection has the final say
+    present.update(existing_ids(vectorstore, {c.metadata["chunk_id"] for c in chunks} - present))
+    stats.chunks += len(chunks)
+    fresh = [c for c in chunks if c.metadata["chunk_id"] not in present]
+    stats.skipped += len(chunks) - len(fresh)
+    return fresh
+
+
+def delete_stale(vectorstore, present: set, pages_entry: dict, stats: IngestStats):
+    wanted = {i for page in pages_entry.values() for i in page["chunk_ids"]}
+    stale = sorted(present - wanted)
+    if stale:
+        vectorstore.delete(ids=stale)
+        stats.deleted += len(stale)
+
+
+async def aingest_pdf(pdf_path: str, vectorstore, text_splitter, persist_directory: str,
+                      workers: int = 4, max_tokens: int = 32_000) -> IngestStats:
+    """Embeds and upserts only the chunks of the PDF that are not in the collection yet."""
+    start = time.perf_counter()
+    source = os.path.abspath(pdf_path)
+    stats = IngestStats(source=pdf_path)
+
+    manifest = load_manifest(persist_directory)
+    previous = manifest.get(source, {})
+    present = existing_ids(vectorstore, previous_ids(previous))
+    file_hash = file_sha256(pdf_path)
+
+    # Fast path: nothing to load or embed
+    if unchanged(previous, file_hash, present):
+        stats.files = 1
+        stats.pages = len(previous["pages"])
+        stats.chunks = stats.skipped = len(present)
+        stats.seconds = time.perf_counter() - start
+        return stats
+
+    pages_entry = {}
+
+    async def new_chunks():
+        groups = lookahead(chunk_pdf(pdf_path, text_splitter, pages_entry))
+        # Parsing the PDF is blocking work, keep it off the event loop
+        while (group := await asyncio.to_thread(next, groups, None)) is not None:
+            for chunk in not_stored(vectorstore, group, present, stats):
+                yield chunk
+
+    try:
+        await embed_and_store(new_chunks(), vectorstore, vectorstore.embeddings, stats,
+                              workers=workers, max_tokens=max_tokens)
+        stats.files = 1
+        stats.pages = len(pages_entry)
+        delete_stale(vectorstore, present, pages_entry, stats)
+    finally:  # batches stored before a failure count too
+        bump_collection_version(persist_directory, stats)
+
+    manifest[source] = {"file_sha256": file_hash, "pages": pages_entry}
+    save_manifest(persist_directory, manifest)
+
+    stats.seconds = time.perf_counter() - start
+    return stats
+
+
+def ingest_pdf(pdf_path: str, vectorstore, text_splitter, persist_directory: str,
+               workers: int = 4, max_tokens: int = 32_000) -> IngestStats:
+    """Blocking version of aingest_pdf for scripts"""
+    return asyncio.run(aingest_pdf(pdf_path, vectorstore, text_splitter, persist_directory,
+                                   workers=workers, max_tokens=max_tokens))
+
+
+async def aingest_corpus(directory: str, vectorstore, text_splitter, persist_directory: str,
+                         processes: int = None, workers: int = 4, max_tokens: int = 32_000) -> IngestStats:
+    """Ingests every PDF below a directory.
+
+    Parsing and splitting is fanned out over a process pool (one PDF per task), while the
+    embedding and the writes to the collection all happen here, from a single writer.
+    Only as many PDFs as there are processes are parsed at a time and their chunks come
+    back through a bounded queue, so memory does not grow with the size of the corpus.
+    PDFs that disappeared from the directory have their chunks removed.
+    """
+    start = time.perf_counter()
+    stats = IngestStats(source=directory)
+    root = os.path.abspath(directory)
+    pdf_paths = sorted(glob.glob(os.path.join(root, "**", "*.pdf"), recursive=True))
+
+    manifest = load_manifest(persist_directory)
+    original = dict(manifest)  # entries are replaced, never changed in place
+    present = {}
+    file_hashes = {}
+    todo = []
+    for pdf_path in pdf_paths:
+        previous = manifest.get(pdf_path, {})
+        present[pdf_path] = existing_ids(vectorstore, previous_ids(previous))
+        file_hashes[pdf_path] = file_sha256(pdf_path)
+        if unchanged(previous, file_hashes[pdf_path], present[pdf_path]):
+            stats.pages += len(previous["pages"])
+            stats.chunks += len(present[pdf_path])
+            stats.skipped += len(present[pdf_path])
+        else:
+            todo.append(pdf_path)
+    stats.files = len(pdf_paths)
+
+    removed = [source for source in manifest
+               if source.startswith(root + os.sep) and source not in file_hashes]
+
+    async def new_chunks():
+        if not todo:
+            return
+        loop = asyncio.get_running_loop()
+        in_flight = min(len(todo), processes or os.cpu_count() or 1)
+        waiting = iter(todo)
+        with multiprocessing.Manager() as manager:
+            queue = manager.Queue(maxsize=2 * in_flight)  # groups of 32 chunks
+            stop = manager.Event()
+            pool = ProcessPoolExecutor(max_workers=in_flight)
+            tasks = [loop.run_in_executor(pool, split_pdf, pdf_path, text_splitter, queue, stop)
+                     for pdf_path in itertools.islice(waiting, in_flight)]
+            try:
+                pending = len(tasks)
+                while pending:
+                    try:
+                        kind, pdf_path, data = await asyncio.to_thread(queue.get, True, 1.0)
+                    except queue_module.Empty:
+                        for task in tasks:
+                            if task.done():
+                                task.result()  # a worker that failed never sends "done"
+                        continue
+                    if kind == "chunks":
+                        for chunk in not_stored(vectorstore, data, present[pdf_path], stats):
+                            yield chunk
+                        continue
+                    pending -= 1
+                    stats.pages += len(data)
+                    delete_stale(vectorstore, present[pdf_path], data, stats)
+                    manifest[pdf_path] = {"file_sha256": file_hashes[pdf_path], "pages": data}
+                    for next_path in itertools.islice(waiting, 1):
+                        tasks.append(loop.run_in_executor(pool, split_pdf, next_path, text_splitter, queue, stop))
+                        pending += 1
+            finally:
+                # After a failure (e.g. in the embedding) workers may be blocked on the full queue:
+                # tell them to stop, unblock them, and do not wait for them on the event loop
+                stop.set()
+                try:
+                    while True:
+                        queue.get_nowait()
+                except queue_module.Empty:
+                    pass
+                pool.shutdown(wait=False, cancel_futures=True)
+                for task in tasks:
+                    task.cancel()
+
+    try:
+        for source in removed:
+            delete_stale(vectorstore, existing_ids(vectorstore, previous_ids(manifest.pop(source))), {}, stats)
+        chunks = new_chunks()
+        try:
+            await embed_and_store(chunks, vectorstore, vectorstore.embeddings, stats,
+                                  workers=workers, max_tokens=max_tokens)
+        finally:
+            await chunks.aclose()  # stops the parsing processes now, not when the generator is collected
+    finally:  # batches stored before a failure count too
+        bump_collection_version(persist_directory, stats)
+    if manifest != original:  # a restart with nothing new leaves the manifest alone
+        save_manifest(persist_directory, manifest)
+
+    stats.seconds = time.perf_counter() - start
+    return stats
+
+
+def ingest_corpus(directory: str, vectorstore, text_splitter, persist_directory: str,
+                  processes: int = None, workers: int = 4, max_tokens: int = 32_000) -> IngestStats:
+    """Blocking version of aingest_corpus for scripts"""
+    return asyncio.run(aingest_corpus(directory, vectorstore, text_splitter, persist_directory,
+                                      processes=processes, workers=workers, max_tokens=max_tokens))
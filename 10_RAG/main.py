@@ -1,99 +1,134 @@
 from dotenv import load_dotenv
+import asyncio
 import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # lets us import the shared helpers in common/
+from functools import lru_cache
 from langgraph.graph import StateGraph, END
 from typing import TypedDict, Annotated, Sequence
-from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage, ToolMessage
+from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage
 from operator import add as add_messages
-from langchain_openai import ChatOpenAI
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.document_loaders import PyPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_chroma import Chroma
 from langchain_core.tools import tool
+from common.tool_executor import ToolExecutor
+from common.llm_cache import CachedChatModel, default_llm_cache
+from common.streaming import astream_answer
 
 
 load_dotenv()
 
-pdf_path = "./10_RAG/Stock_Market_Performance_2024.pdf"
+# Every PDF in this folder (and its subfolders) ends up in the knowledge base
+pdf_directory = "./10_RAG"
 
-llm = ChatOpenAI(
-    model="gpt-4o", temperature = 0) # I want to minimize hallucination - temperature = 0 makes the model output more deterministic 
+persist_directory = r"C:\Vaibhav\LangGraph_Book\LangGraphCourse\Agents"
+collection_name = "stock_market"
 
-# Our Embedding Model - has to also be compatible with the LLM
-embeddings = OpenAIEmbeddings(
-    model="text-embedding-3-small",
-)
+# The model, the embeddings, the vector store and the retriever are all built on first use,
+# so importing this file (16_agent_server, the ingestion process pool) touches no files and
+# does not pay for langchain_openai / langchain_chroma
 
-# Safety measure I have put for debugging purposes :)
-if not os.path.exists(pdf_path):
-    raise FileNotFoundError(f"PDF file not found: {pdf_path}")
 
-pdf_loader = PyPDFLoader(pdf_path) # This loads the PDF
+@lru_cache(maxsize=None)
+def build_embeddings():
+    from langchain_openai import OpenAIEmbeddings
+    from common.http_clients import openai_http_client, openai_async_http_client
+    from embedding_cache import CachedEmbeddings
 
-try:
-    pages = pdf_loader.load()
-    print(f"PDF has been loaded and has {len(pages)} pages")
-except Exception as e:
-    print(f"Error loading PDF: {e}")
-    raise
+    # Our Embedding Model - has to also be compatible with the LLM
+    # Wrapped in a disk cache so the same text is never sent to the API twice, even across restarts
+    return CachedEmbeddings(
+        OpenAIEmbeddings(model="text-embedding-3-small",
+                         http_client=openai_http_client(), http_async_client=openai_async_http_client()),
+        path="./10_RAG/embedding_cache.sqlite",
+    )
 
-# Chunking Process
-text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size=1000,
-    chunk_overlap=200
-)
 
-pages_split = text_splitter.split_documents(pages) # We now apply this to our pages
+@lru_cache(maxsize=None)
+def build_vectorstore():
+    from langchain_chroma import Chroma
 
-persist_directory = r"C:\Vaibhav\LangGraph_Book\LangGraphCourse\Agents"
-collection_name = "stock_market"
+    # Safety measure I have put for debugging purposes :)
+    if not os.path.isdir(pdf_directory):
+        raise FileNotFoundError(f"PDF folder not found: {pdf_directory}")
 
-# If our collection does not exist in the directory, we create using the os command
-if not os.path.exists(persist_directory):
-    os.makedirs(persist_directory)
-    
-try:
-    # Here, we actually create the chroma database using our embeddigns model
-    vectorstore = Chroma.from_documents(
-        documents=pages_split,
-        embedding=embeddings,
-        persist_directory=persist_directory,
-        collection_name=collection_name
+    # If our collection does not exist in the directory, we create using the os command
+    if not os.path.exists(persist_directory):
+        os.makedirs(persist_directory)
+
+    try:
+        # Here, we open (or create) the chroma database using our embeddings model
+        return Chroma(
+            embedding_function=build_embeddings(),
+            persist_directory=persist_directory,
+            collection_name=collection_name
+        )
+
+    except Exception as e:
+        print(f"Error setting up ChromaDB: {str(e)}")
+        raise
+
+
+@lru_cache(maxsize=None)
+def build_retriever():
+    from ingestion import collection_version
+    from query_cache import SemanticQueryCache
+
+    # Now we create our retriever, with a semantic cache in front so near duplicate questions skip the similarity search
+    return SemanticQueryCache(
+        build_vectorstore(),
+        k=5, # K is the amount of chunks to return
+        threshold=0.95, # cosine similarity a new query needs to a cached one to count as the same question
+        ttl=3600,
+        version=lambda: collection_version(persist_directory), # an ingest that added or deleted chunks drops the cache
     )
-    print(f"Created ChromaDB vector store!")
-    
-except Exception as e:
-    print(f"Error setting up ChromaDB: {str(e)}")
-    raise
 
 
-# Now we create our retriever 
-retriever = vectorstore.as_retriever(
-    search_type="similarity",
-    search_kwargs={"k": 5} # K is the amount of chunks to return
-)
+def build_text_splitter():
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    # Chunking Process
+    return RecursiveCharacterTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=200
+    )
+
 
+# not in a ToolCache: the semantic cache in build_retriever() already answers repeated queries,
+# and unlike an exact argument cache it is dropped when another process re-ingests
 @tool
 def retriever_tool(query: str) -> str:
     """
-    This tool searches and returns the information from the Stock Market Performance 2024 document.
+    This tool searches and returns the information from the PDF documents, such as the Stock Market Performance 2024 document.
     """
 
-    docs = retriever.invoke(query)
+    docs, _ = build_retriever().search(query)
 
     if not docs:
-        return "I found no relevant information in the Stock Market Performance 2024 document."
+        return "I found no relevant information in the PDF documents."
     
     results = []
     for i, doc in enumerate(docs):
-        results.append(f"Document {i+1}:\n{doc.page_content}")
+        source = os.path.basename(doc.metadata.get("source", "unknown"))
+        page = doc.metadata.get("page", 0) + 1
+        results.append(f"Document {i+1} ({source}, page {page}):\n{doc.page_content}")
     
     return "\n\n".join(results)
 
 
 tools = [retriever_tool]
 
-llm = llm.bind_tools(tools)
+
+@lru_cache(maxsize=None)
+def build_model():
+    from langchain_openai import ChatOpenAI
+    from common.http_clients import openai_http_client, openai_async_http_client
+
+    llm = ChatOpenAI(
+        model="gpt-4o", temperature = 0, # I want to minimize hallucination - temperature = 0 makes the model output more deterministic 
+        http_client=openai_http_client(), http_async_client=openai_async_http_client()) # one connection pool per upstream
+
+    # temperature = 0 also means the same conversation gets the same answer, so answers are cached on disk
+    return CachedChatModel(model=llm, store=default_llm_cache()).bind_tools(tools)
+
 
 class AgentState(TypedDict):
     messages: Annotated[Sequence[BaseMessage], add_messages]
@@ -106,78 +141,96 @@ def should_continue(state: AgentState):
 
 
 system_prompt = """
-You are an intelligent AI assistant who answers questions about Stock Market Performance in 2024 based on the PDF document loaded into your knowledge base.
+You are an intelligent AI assistant who answers questions based on the PDF documents loaded into your knowledge base, such as the Stock Market Performance 2024 report.
 Use the retriever tool available to answer questions about the stock market performance data. You can make multiple calls if needed.
 If you need to look up some information before asking a follow up question, you are allowed to do that!
-Please always cite the specific parts of the documents you use in your answers.
+Please always cite the specific parts of the documents you use in your answers, with the document name and page.
 """
 
 
 tools_dict = {our_tool.name: our_tool for our_tool in tools} # Creating a dictionary of our tools
+tool_executor = ToolExecutor(max_concurrency=8, timeout=60)
 
 # LLM Agent
 def call_llm(state: AgentState) -> AgentState:
     """Function to call the LLM with the current state."""
     messages = list(state['messages'])
     messages = [SystemMessage(content=system_prompt)] + messages
-    message = llm.invoke(messages)
+    message = build_model().invoke(messages)
     return {'messages': [message]}
 
 
 # Retriever Agent
+def call_tool(t: dict):
+    """Runs a single tool call, called from the tool executor's threads"""
+    print(f"Calling Tool: {t['name']} with query: {t['args'].get('query', 'No query provided')}")
+
+    if not t['name'] in tools_dict: # Checks if a valid tool is present
+        print(f"\nTool: {t['name']} does not exist.")
+        return "Incorrect Tool Name, Please Retry and Select tool from List of Available tools."
+
+    result = tools_dict[t['name']].invoke(t['args'].get('query', ''))
+    print(f"Result length: {len(str(result))}")
+    return result
+
+
 def take_action(state: AgentState) -> AgentState:
     """Execute tool calls from the LLM's response."""
 
     tool_calls = state['messages'][-1].tool_calls
-    results = []
-    for t in tool_calls:
-        print(f"Calling Tool: {t['name']} with query: {t['args'].get('query', 'No query provided')}")
-        
-        if not t['name'] in tools_dict: # Checks if a valid tool is present
-            print(f"\nTool: {t['name']} does not exist.")
-            result = "Incorrect Tool Name, Please Retry and Select tool from List of Available tools."
-        
-        else:
-            result = tools_dict[t['name']].invoke(t['args'].get('query', ''))
-            print(f"Result length: {len(str(result))}")
-            
-
-        # Appends the Tool Message
-        results.append(ToolMessage(tool_call_id=t['id'], name=t['name'], content=str(result)))
+    # All tool calls of this turn run at the same time, the Tool Messages come back in tool call order
+    results = tool_executor.run(tool_calls, call_tool)
 
     print("Tools Execution Complete. Back to the model!")
     return {'messages': results}
 
 
-graph = StateGraph(AgentState)
-graph.add_node("llm", call_llm)
-graph.add_node("retriever_agent", take_action)
+@lru_cache(maxsize=None)
+def build_graph():
+    graph = StateGraph(AgentState)
+    graph.add_node("llm", call_llm)
+    graph.add_node("retriever_agent", take_action)
 
-graph.add_conditional_edges(
-    "llm",
-    should_continue,
-    {True: "retriever_agent", False: END}
-)
-graph.add_edge("retriever_agent", "llm")
-graph.set_entry_point("llm")
+    graph.add_conditional_edges(
+        "llm",
+        should_continue,
+        {True: "retriever_agent", False: END}
+    )
+    graph.add_edge("retriever_agent", "llm")
+    graph.set_entry_point("llm")
 
-rag_agent = graph.compile()
+    return graph.compile()
 
 
-def running_agent():
+async def running_agent():
     print("\n=== RAG AGENT===")
+    rag_agent = build_graph()
     
     while True:
-        user_input = input("\nWhat is your question: ")
+        user_input = await asyncio.to_thread(input, "\nWhat is your question: ")
         if user_input.lower() in ['exit', 'quit']:
+            print(build_embeddings().stats)
+            print(build_retriever().stats)
+            print(default_llm_cache().stats)
             break
             
         messages = [HumanMessage(content=user_input)] # converts back to a HumanMessage type
 
-        result = rag_agent.invoke({"messages": messages})
-        
+        # The answer is printed token by token while the LLM node is still running
         print("\n=== ANSWER ===")
-        print(result['messages'][-1].content)
-
-
-running_agent()
\ No newline at end of file
+        _, stats = await astream_answer(rag_agent, {"messages": messages}, nodes=["llm"])
+        print(f"\n({stats})")
+
+
+if __name__ == "__main__":
+    # Guarded, because the ingestion process pool re-imports this file on Windows and macOS
+    try:
+        # Parsing runs on all CPU cores, only chunks that are new or changed since the last run get embedded
+        from ingestion import ingest_corpus
+        stats = ingest_corpus(pdf_directory, build_vectorstore(), build_text_splitter(), persist_directory)
+        print(f"ChromaDB vector store is ready! {stats}")
+    except Exception as e:
+        print(f"Error ingesting PDFs: {str(e)}")
+        raise
+
+    asyncio.run(running_agent())
\ No newline at end of file
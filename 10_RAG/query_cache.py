@@ -0,0 +1,135 @@
+"""Semantic query cache in front of the RAG retriever.
+
+Near duplicate questions ("How did the S&P 500 do in 2024?" / "How did the S&P 500 perform
+in 2024?") get the same top-k chunks back without another similarity search. A new query
+is a hit when its embedding is within a cosine similarity threshold of a cached query.
+Entries expire after a TTL, the least recently used ones are evicted first, and the whole
+cache is dropped as soon as the collection is re-ingested.
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+import numpy as np
+
+
+@dataclass
+class CacheResult:
+    query: str
+    hit: bool
+    similarity: float  # to the closest cached query, 0.0 when the cache was empty
+    matched_query: Optional[str]
+    seconds: float
+
+    def __str__(self):
+        status = "HIT" if self.hit else "MISS"
+        match = f" (closest: {self.matched_query!r})" if self.matched_query else ""
+        return f"query cache {status}: similarity {self.similarity:.3f}{match} in {self.seconds * 1000:.1f}ms"
+
+
+@dataclass
+class QueryCacheStats:
+    hits: int = 0
+    misses: int = 0
+    expired: int = 0
+    evicted: int = 0
+    invalidations: int = 0
+    hit_seconds: float = 0.0
+    miss_seconds: float = 0.0
+    history: deque = field(default_factory=lambda: deque(maxlen=1_000))  # recent CacheResults, for tuning
+
+    def __str__(self):
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        hit_ms = self.hit_seconds / self.hits * 1000 if self.hits else 0.0
+        miss_ms = self.miss_seconds / self.misses * 1000 if self.misses else 0.0
+        return (f"query cache: {self.hits} hits, {self.misses} misses, hit rate {rate:.0%}, "
+                f"avg hit {hit_ms:.1f}ms vs avg miss {miss_ms:.1f}ms, {self.expired} expired, "
+                f"{self.evicted} evicted, {self.invalidations} invalidations")
+
+
+class SemanticQueryCache:
+    """Returns stored top-k chunks for queries that are close enough to one asked before"""
+
+    def __init__(self, vectorstore, k: int = 5, threshold: float = 0.95, ttl: float = 3_600,
+                 max_entries: int = 256, version: Optional[Callable[[], object]] = None):
+        self.vectorstore = vectorstore
+        self.embeddings = vectorstore.embeddings
+        self.k = k
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version = version  # changes whenever the collection is re-ingested
+        self.stats = QueryCacheStats()
+        self._entries = OrderedDict()  # query -> (unit vector, docs, created_at)
+        self._current_version = version() if version else None
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _check_version(self):
+        if self.version is None:
+            return
+        current = self.version()
+        if current != self._current_version:
+            self._entries.clear()
+            self._current_version = current
+            self.stats.invalidations += 1
+
+    def _drop_expired(self, now: float):
+        expired = [q for q, (_, _, created_at) in self._entries.items() if now - created_at > self.ttl]
+        for q in expired:
+            del self._entries[q]
+        self.stats.expired += len(expired)
+
+    def _closest(self, vector: np.ndarray):
+        if not self._entries:
+            return None, 0.0
+        queries = list(self._entries)
+        matrix = np.stack([self._entries[q][0] for q in queries])
+        similarities = matrix @ vector
+        best = int(np.argmax(similarities))
+        return queries[best], float(similarities[best])
+
+    def search(self, query: str):
+        """Returns the top-k documents for the query and a CacheResult describing the lookup"""
+        start = time.perf_counter()
+        embedding = self.embeddings.embed_query(query)
+        vector = np.asarray(embedding, dtype=np.float32)
+        vector /= np.linalg.norm(vector) or 1.0
+
+        with self._lock:
+            self._check_version()
+            now = time.time()
+            self._drop_expired(now)
+            matched_query, similarity = self._closest(vector)
+            if matched_query is not None and similarity >= self.threshold:
+                self._entries.move_to_end(matched_query)
+                docs = self._entries[matched_query][1]
+                result = CacheResult(query, True, similarity, matched_query, time.perf_counter() - start)
+                self.stats.hits += 1
+                self.stats.hit_seconds += result.seconds
+                self.stats.history.append(result)
+                return docs, result
+
+        docs = self.vectorstore.similarity_search_by_vector(embedding, k=self.k)
+
+        with self._lock:
+            self._entries[query] = (vector, docs, time.time())
+            self._entries.move_to_end(query)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evicted += 1
+            result = CacheResult(query, False, similarity, matched_query, time.perf_counter() - start)
+            self.stats.misses += 1
+            self.stats.miss_seconds += result.seconds
+            self.stats.history.append(result)
+        return docs, result
+
+    def invoke(self, query: str) -> List:
+        """Drop-in for retriever.invoke(query)"""
+        return self.search(query)[0]
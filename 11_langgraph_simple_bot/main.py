@@ -1,24 +1,32 @@
 from dotenv import load_dotenv
 load_dotenv()
 
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # lets us import the shared helpers in common/
+
+from functools import lru_cache
 from langgraph.graph import StateGraph, END
 from typing import TypedDict, Annotated
 import operator
-from langchain_core.messages import AnyMessage, SystemMessage, HumanMessage, ToolMessage
-from langchain_openai import ChatOpenAI
-from langchain_community.tools.tavily_search import TavilySearchResults
+from langchain_core.messages import AnyMessage, SystemMessage, HumanMessage
 from colorama import Fore
+from common.tool_executor import ToolExecutor
+from common.llm_cache import CachedChatModel, default_llm_cache
+
 
-tool = TavilySearchResults(max_results=4) #increased number of results
-print(type(tool))
-print(tool.name)
+@lru_cache(maxsize=None)
+def build_search_tool():
+    # langchain_community is slow to import, so it is only loaded once a graph is built
+    from langchain_community.tools.tavily_search import TavilySearchResults
+    return TavilySearchResults(max_results=4) #increased number of results
 
 class AgentState(TypedDict):
     messages: Annotated[list[AnyMessage], operator.add]
     
 class Agent:
 
-    def __init__(self, model, tools, system=""):
+    def __init__(self, model, tools, system="", max_concurrency=8, tool_timeout=60):
         self.system = system
         graph = StateGraph(AgentState)
         graph.add_node("llm", self.call_openai)
@@ -33,6 +41,7 @@ class Agent:
         self.graph = graph.compile()
         self.tools = {t.name: t for t in tools}
         self.model = model.bind_tools(tools)
+        self.tool_executor = ToolExecutor(max_concurrency=max_concurrency, timeout=tool_timeout)
 
     def exists_action(self, state: AgentState):
         result = state['messages'][-1]
@@ -45,17 +54,17 @@ class Agent:
         message = self.model.invoke(messages)
         return {'messages': [message]}
 
+    def call_tool(self, t):
+        print(f"Calling: {t}")
+        if not t['name'] in self.tools:      # check for bad tool name from LLM
+            print("\n ....bad tool name....")
+            return "bad tool name, retry"  # instruct LLM to retry if bad
+        return self.tools[t['name']].invoke(t['args'])
+
     def take_action(self, state: AgentState):
         tool_calls = state['messages'][-1].tool_calls
-        results = []
-        for t in tool_calls:
-            print(f"Calling: {t}")
-            if not t['name'] in self.tools:      # check for bad tool name from LLM
-                print("\n ....bad tool name....")
-                result = "bad tool name, retry"  # instruct LLM to retry if bad
-            else:
-                result = self.tools[t['name']].invoke(t['args'])
-            results.append(ToolMessage(tool_call_id=t['id'], name=t['name'], content=str(result)))
+        # the parallel tool calls of a turn run concurrently, results keep the tool call order
+        results = self.tool_executor.run(tool_calls, self.call_tool)
         print("Back to the model!")
         return {'messages': results}
     
@@ -65,29 +74,41 @@ Only look up information when you are sure of what you want. \
 If you need to look up some information before asking a follow up question, you are allowed to do that!
 """
 
-model = ChatOpenAI(model="gpt-3.5-turbo")  #reduce inference cost
-abot = Agent(model, [tool], system=prompt)
 
-query = "What is the weather in sf?"
-print("Query: " , Fore.YELLOW, query, Fore.RESET)
-messages = [HumanMessage(content=query)]
-result = abot.graph.invoke({"messages": messages})
+@lru_cache(maxsize=None)
+def build_graph(model_name: str = "gpt-3.5-turbo"):  #reduce inference cost
+    """One compiled agent per model name, built on first use"""
+    from langchain_openai import ChatOpenAI
+    # LLM_CACHE_MODE=record records both runs, LLM_CACHE_MODE=replay replays them offline
+    model = CachedChatModel(model=ChatOpenAI(model=model_name), store=default_llm_cache())
+    return Agent(model, [build_search_tool()], system=prompt).graph
+
 
+if __name__ == "__main__":
+    tool = build_search_tool()
+    print(type(tool))
+    print(tool.name)
 
+    query = "What is the weather in sf?"
+    print("Query: " , Fore.YELLOW, query, Fore.RESET)
+    messages = [HumanMessage(content=query)]
+    result = build_graph().invoke({"messages": messages})
 
-print("Result: " , Fore.MAGENTA, result, Fore.RESET)
-print("message: ", Fore.GREEN, result["messages"][-1].content, Fore.RESET)
 
-# Note, the query was modified to produce more consistent results. 
-# Results may vary per run and over time as search information and models change.
 
-query = "Who won the super bowl in 2024? In what state is the winning team headquarters located? \
+    print("Result: " , Fore.MAGENTA, result, Fore.RESET)
+    print("message: ", Fore.GREEN, result["messages"][-1].content, Fore.RESET)
+
+    # Note, the query was modified to produce more consistent results. 
+    # Results may vary per run and over time as search information and models change.
+
+    query = "Who won the super bowl in 2024? In what state is the winning team headquarters located? \
 What is the GDP of that state? Answer each question." 
-messages = [HumanMessage(content=query)]
-print("Query: " , Fore.YELLOW, query, Fore.RESET)
-model = ChatOpenAI(model="gpt-4o")  # requires more advanced model
-abot = Agent(model, [tool], system=prompt)
-result = abot.graph.invoke({"messages": messages})
+    messages = [HumanMessage(content=query)]
+    print("Query: " , Fore.YELLOW, query, Fore.RESET)
+    result = build_graph("gpt-4o").invoke({"messages": messages})  # requires more advanced model
+
 
+    print("response: ", Fore.GREEN, result['messages'][-1].content, Fore.RESET)
+    print(default_llm_cache().stats)
 
-print("response: ", Fore.GREEN, result['messages'][-1].content, Fore.RESET)
\ No newline at end of file
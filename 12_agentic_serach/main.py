@@ -1,20 +1,33 @@
 # libraries
 from dotenv import load_dotenv
 import os
-from tavily import TavilyClient
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # lets us import the shared helpers in common/
+from functools import lru_cache
 from colorama import Fore
+from common.search_cache import CachedTavilyClient
 
 # load environment variables from .env file
 _ = load_dotenv()
 
-# connect
-client = TavilyClient(api_key=os.environ.get("TAVILY_API_KEY"))
-print("Search using Tavily API")
 
-query = "What is in Nvidia's new Blackwell GPU?"
-print("query : ", Fore.YELLOW + query + Fore.RESET)
-result = client.search(query=query,
-                       include_answer=True)
+@lru_cache(maxsize=None)
+def build_client():
+    from tavily import TavilyClient
+    from common.http_clients import tavily_session
+    # connect, searches we already ran in the last 24h are answered from the local cache
+    return CachedTavilyClient(TavilyClient(api_key=os.environ.get("TAVILY_API_KEY"), session=tavily_session()))
 
-# print the answer
-print("results : ", Fore.GREEN+result["answer"]+Fore.RESET)
\ No newline at end of file
+
+if __name__ == "__main__":
+    client = build_client()
+    print("Search using Tavily API")
+
+    query = "What is in Nvidia's new Blackwell GPU?"
+    print("query : ", Fore.YELLOW + query + Fore.RESET)
+    result = client.search(query=query,
+                           include_answer=True)
+
+    # print the answer
+    print("results : ", Fore.GREEN+result["answer"]+Fore.RESET)
+    print(client.stats)
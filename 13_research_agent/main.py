@@ -2,19 +2,42 @@ from dotenv import load_dotenv
 
 _ = load_dotenv()
 
-from langgraph.graph import StateGraph, END
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # lets us import the shared helpers in common/
+
+from functools import lru_cache
+from langgraph.graph import StateGraph, START, END
+from langgraph.types import Send
 from typing import TypedDict, Annotated, List
 import operator
 from langchain_core.messages import AnyMessage, SystemMessage, HumanMessage, AIMessage, ChatMessage
-from langchain_openai import ChatOpenAI
 from pydantic import BaseModel
-from tavily import TavilyClient
-import os
 from colorama import Fore
+from common.search import ParallelSearch
+from common.content_store import ContentStore
+from common.search_cache import CachedTavilyClient
+from common.llm_cache import CachedChatModel, default_llm_cache
+from common.profiler import profile_from_env
+
+
+content_store = ContentStore(max_tokens=4000) # dedupes the research snippets and keeps the writer prompt bounded
+
 
+# The search client and the model are built the first time a node needs them
+@lru_cache(maxsize=None)
+def build_search():
+    from tavily import TavilyClient
+    from common.http_clients import tavily_session
+    tavily = CachedTavilyClient(TavilyClient(api_key=os.environ["TAVILY_API_KEY"], session=tavily_session())) # repeated searches come from the local cache
+    return ParallelSearch(tavily, max_concurrency=8, timeout=20, retries=2) # runs all queries of a step at once
 
-tavily = TavilyClient(api_key=os.environ["TAVILY_API_KEY"])
-model = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+
+@lru_cache(maxsize=None)
+def build_model():
+    from langchain_openai import ChatOpenAI
+    # temperature=0, so repeated prompts are answered from disk
+    return CachedChatModel(model=ChatOpenAI(model="gpt-4o-mini", temperature=0), store=default_llm_cache())
 
 
 class AgentState(TypedDict):
@@ -22,10 +45,15 @@ class AgentState(TypedDict):
     plan: str
     draft: str
     critique: str
-    content: List[str]
+    content: Annotated[List[dict], content_store.merge] # nodes only return new snippets, the store merges them
+    queries: List[str] # the search queries of the current research step, one search branch each
     revision_number: int
     max_revisions: int
-    
+
+
+class SearchState(TypedDict):
+    query: str # what a single search branch gets from Send
+
 PLAN_PROMPT = """You are an expert writer tasked with writing a high level outline of an essay. \
 Write such an outline for the user provided topic. Give an outline of the essay along with any relevant notes \
 or instructions for the sections."""
@@ -59,25 +87,36 @@ def plan_node(state: AgentState):
         SystemMessage(content=PLAN_PROMPT), 
         HumanMessage(content=state['task'])
     ]
-    response = model.invoke(messages)
+    response = build_model().invoke(messages)
     print("Planning node: ",Fore.GREEN + "Plan: " + response.content + Fore.RESET)
     return {"plan": response.content}
 
 def research_plan_node(state: AgentState):
-    queries = model.with_structured_output(Queries).invoke([
+    # only needs the task, so it runs at the same time as the planner
+    queries = build_model().with_structured_output(Queries).invoke([
         SystemMessage(content=RESEARCH_PLAN_PROMPT),
         HumanMessage(content=state['task'])
     ])
     print("Researching plan node: ", Fore.YELLOW + "Queries: " + str(queries.queries) + Fore.RESET)
-    content = state.get('content', [])
-    for q in queries.queries:
-        response = tavily.search(query=q, max_results=2)
-        for r in response['results']:
-            content.append(r['content'])
-    return {"content": content}
+    return {"queries": queries.queries}
+
+def search_node(state: SearchState):
+    # one branch per query, the content reducer merges the branches in query order
+    if not state.get('query'):
+        return {"content": []}
+    responses = build_search().search_all([state['query']], max_results=2)
+    return {"content": content_store.from_search(responses)}
+
+def fan_out(search_node_name: str):
+    """Sends every query of the step to its own search branch"""
+    def send_queries(state: AgentState):
+        # with no queries the search node still runs once, so the step after it is not left waiting
+        return [Send(search_node_name, {"query": q}) for q in state.get('queries') or []] or search_node_name
+    return send_queries
 
 def generation_node(state: AgentState):
-    content = "\n\n".join(state['content'] or [])
+    content = ContentStore.text(state.get('content'))
+    print("Generation node: ", Fore.BLUE + f"{len(state.get('content') or [])} snippets, ~{len(content) // 4} tokens of research" + Fore.RESET)
     user_message = HumanMessage(
         content=f"{state['task']}\n\nHere is my plan:\n\n{state['plan']}")
     messages = [
@@ -86,7 +125,7 @@ def generation_node(state: AgentState):
         ),
         user_message
         ]
-    response = model.invoke(messages)
+    response = build_model().invoke(messages)
     print("Generation node: ", Fore.BLUE + "Draft: " + response.content + Fore.RESET)
     return {
         "draft": response.content, 
@@ -98,51 +137,62 @@ def reflection_node(state: AgentState):
         SystemMessage(content=REFLECTION_PROMPT), 
         HumanMessage(content=state['draft'])
     ]
-    response = model.invoke(messages)
+    response = build_model().invoke(messages)
     print("Reflection node: ", Fore.MAGENTA + "Critique: " + response.content + Fore.RESET)
     return {"critique": response.content}
 
 def research_critique_node(state: AgentState):
-    queries = model.with_structured_output(Queries).invoke([
+    queries = build_model().with_structured_output(Queries).invoke([
         SystemMessage(content=RESEARCH_CRITIQUE_PROMPT),
         HumanMessage(content=state['critique'])
     ])
     print("Researching critique node: ", Fore.CYAN + "Queries: " + str(queries.queries) + Fore.RESET)
-    content = state['content'] or []
-    for q in queries.queries:
-        response = tavily.search(query=q, max_results=2)
-        for r in response['results']:
-            content.append(r['content'])
-    return {"content": content}
+    return {"queries": queries.queries}
 
 def should_continue(state):
     if state["revision_number"] > state["max_revisions"]:
         return END
     return "reflect"
 
-builder = StateGraph(AgentState)
-builder.add_node("planner", plan_node)
-builder.add_node("generate", generation_node)
-builder.add_node("reflect", reflection_node)
-builder.add_node("research_plan", research_plan_node)
-builder.add_node("research_critique", research_critique_node)
-builder.set_entry_point("planner")
-builder.add_conditional_edges(
-    "generate", 
-    should_continue, 
-    {END: END, "reflect": "reflect"}
-)
-builder.add_edge("planner", "research_plan")
-builder.add_edge("research_plan", "generate")
-
-builder.add_edge("reflect", "research_critique")
-builder.add_edge("research_critique", "generate")
-graph = builder.compile()
-
-for s in graph.stream({
-    'task': "use of Algae to replace plants for future oxygen demand",
-    "max_revisions": 2,
-    "revision_number": 1,
-}):
-    print(s)
-
+@lru_cache(maxsize=None)
+def build_graph():
+    builder = StateGraph(AgentState)
+    builder.add_node("planner", plan_node)
+    builder.add_node("generate", generation_node)
+    builder.add_node("reflect", reflection_node)
+    builder.add_node("research_plan", research_plan_node)
+    builder.add_node("search_plan", search_node)
+    builder.add_node("research_critique", research_critique_node)
+    builder.add_node("search_critique", search_node)
+
+    # planning and the first research both only need the task, so they start together
+    builder.add_edge(START, "planner")
+    builder.add_edge(START, "research_plan")
+    builder.add_conditional_edges("research_plan", fan_out("search_plan"), ["search_plan"])
+    builder.add_edge(["planner", "search_plan"], "generate") # waits for the plan and every search branch
+
+    builder.add_conditional_edges(
+        "generate", 
+        should_continue, 
+        {END: END, "reflect": "reflect"}
+    )
+    builder.add_edge("reflect", "research_critique")
+    builder.add_conditional_edges("research_critique", fan_out("search_critique"), ["search_critique"])
+    builder.add_edge("search_critique", "generate")
+    return builder.compile()
+
+
+if __name__ == "__main__":
+    profiler = profile_from_env(build_graph()) # GRAPH_PROFILE=<path> times every node, see common/profiler.py
+    for s in build_graph().stream({
+        'task': "use of Algae to replace plants for future oxygen demand",
+        "max_revisions": 2,
+        "revision_number": 1,
+    }):
+        print(s)
+
+    print(content_store.stats)
+    print(build_search().client.stats)
+    print(default_llm_cache().stats)
+    if profiler:
+        print(profiler.report())
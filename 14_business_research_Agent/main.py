@@ -2,28 +2,43 @@ from dotenv import load_dotenv
 
 _ = load_dotenv(override=True)  # Ensure environment variables are loaded
 
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # lets us import the shared helpers in common/
+
+from functools import lru_cache
 from langgraph.graph import StateGraph, END
 from typing import TypedDict, Annotated, List
 import operator
 from langchain_core.messages import AnyMessage, SystemMessage, HumanMessage, AIMessage, ChatMessage
-from langchain_openai import ChatOpenAI
 from pydantic import BaseModel
-from tavily import TavilyClient
-from langchain_community.tools.tavily_search import TavilySearchResults
-import os
 from colorama import Fore
+from common.search import ParallelSearch
+from common.content_store import ContentStore
+from common.search_cache import CachedTavilyClient
+from common.llm_cache import CachedChatModel, default_llm_cache
+from common.profiler import profile_from_env
+from common.quality_gate import QualityGate, Review
+from common.query_memory import QueryMemory
 
 class Queries(BaseModel):
     queries: List[str]
     
+content_store = ContentStore(max_tokens=8000) # dedupes the research snippets and keeps the writer prompt bounded
+query_memory = QueryMemory() # revisions only search the queries earlier revisions did not cover
+
 class AgentState(TypedDict):
     task: str
     plan: str
     draft: str
     critique: str
-    content: List[str]
+    content: Annotated[List[dict], content_store.merge] # nodes only return new snippets, the store merges them
+    searched: Annotated[List[dict], operator.add] # every query searched so far and how many snippets it found
     revision_number: int
     max_revisions: int
+    scores: Annotated[List[int], operator.add] # the reflector's score of every draft
+    best_draft: str # the highest scoring draft so far, this is the final report
+    best_score: int
     messages: Annotated[list[AnyMessage], operator.add] 
     
 class PromptManager:
@@ -54,17 +69,34 @@ class PromptManager:
         Generate critique and recommendations for the report and its direction. \
         Provide detailed recommendations, including requests for length, depth, style, etc.\
         give a score from 1 to 10 for the draft and provide a detailed explanation of the score."
+    RESEARCH_DELTA_PROMPT = "\n\nThese queries were already searched and their results are in the research notes, \
+        do not repeat them. Only generate queries for the gaps named in the critique that they do not cover:\n{searched}"
+
+
+# The search client and the model are built on first use, importing this file stays cheap
+@lru_cache(maxsize=None)
+def build_search():
+    from tavily import TavilyClient
+    from common.http_clients import tavily_session
+    tavily = CachedTavilyClient(TavilyClient(api_key=os.environ["TAVILY_API_KEY"], session=tavily_session())) # repeated searches come from the local cache
+    # tavily = TavilySearchResults(max_results=5)  # Reduced number of results for simplicity
+    return ParallelSearch(tavily, max_concurrency=8, timeout=20, retries=2) # runs all queries of a revision at once
 
 
-tavily = TavilyClient(api_key=os.environ["TAVILY_API_KEY"])
-# tavily = TavilySearchResults(max_results=5)  # Reduced number of results for simplicity
-model = ChatOpenAI(model="gpt-4o", temperature=0)
+@lru_cache(maxsize=None)
+def build_model():
+    from langchain_openai import ChatOpenAI
+    # temperature=0, so repeated prompts are answered from disk
+    return CachedChatModel(model=ChatOpenAI(model="gpt-4o", temperature=0), store=default_llm_cache())
  
     
 class Agent:
-    def __init__(self, model, tools, system=""):
+    def __init__(self, model, tools, system="", gate=None, search=None, memory=None):
         try:
             self.system = system
+            self.gate = gate or QualityGate() # stops the revisions early once the reflector is happy
+            self.search = search # a ParallelSearch, build_search() when not given
+            self.memory = memory or query_memory
             builder = StateGraph(AgentState)
             builder.add_node("planner", self.plan)
             builder.add_node("researcher", self.research)
@@ -90,8 +122,9 @@ class Agent:
             print(Fore.RED + f"Error initializing agent: {e}")
             print(Fore.RESET)
     def should_continue(self,state: AgentState) -> bool:
-        if state['revision_number'] >= state['max_revisions']:
-            print(Fore.RED + "Max revisions reached. Ending process."+ Fore.RESET)
+        reason = self.gate.stop_reason(state.get('scores') or [], state['revision_number'], state['max_revisions'])
+        if reason:
+            print(Fore.RED + f"Ending process: {reason}." + Fore.RESET)
             return False
         return True
     
@@ -105,20 +138,24 @@ class Agent:
         return {'plan': response.content}
     
     def research(self,state: AgentState):
+        searched = state.get('searched') or []
+        prompt = PromptManager.RESEARCHER_PROMPT + "\n\n" + state['critique']
+        if searched: # on a revision only the new gaps are worth searching
+            prompt += PromptManager.RESEARCH_DELTA_PROMPT.format(searched="\n".join(f"- {s['query']}" for s in searched))
         queries = self.model.with_structured_output(Queries).invoke([
-            SystemMessage(content=PromptManager.RESEARCHER_PROMPT + "\n\n" + state['critique']),
+            SystemMessage(content=prompt),
             HumanMessage(content=state['task'])
         ])
-        print("Researching plan node: ", Fore.YELLOW + "Queries: " + str(queries.queries) + Fore.RESET)
-        content = state.get('content', [])
-        for q in queries.queries:
-            response = tavily.search(query=q, max_results=2)
-            for r in response['results']:
-                content.append(r['content'])
-        return {"content": content}
+        new_queries, skipped = self.memory.new_queries(queries.queries, searched)
+        print("Researching plan node: ", Fore.YELLOW + "Queries: " + str(new_queries) + Fore.RESET)
+        if skipped:
+            print("Researching plan node: ", Fore.YELLOW + f"Skipped {len(skipped)} queries already searched: {skipped}" + Fore.RESET)
+        responses = (self.search or build_search()).search_all(new_queries, max_results=2)
+        return {"content": content_store.from_search(responses), "searched": QueryMemory.record(new_queries, responses)}
     
     def write(self,state: AgentState):
-        content = "\n\n".join(state['content'] or [])
+        content = ContentStore.text(state.get('content'))
+        print("Generation node: ", Fore.YELLOW + f"{len(state.get('content') or [])} snippets, ~{len(content) // 4} tokens of research" + Fore.RESET)
         user_message = HumanMessage(
             content=f"{state['task']}\n\nHere is my plan:\n\n{state['plan']} \n\n Here is the critique of the previous draft:\n\n{state['critique']}")
         messages = [
@@ -139,29 +176,52 @@ class Agent:
             SystemMessage(content=PromptManager.REFLECTION_PROMPT), 
             HumanMessage(content=state['draft'])
         ]
-        response = self.model.invoke(messages)
-        print("Reflection node: ", Fore.YELLOW + "Critique: " + response.content + Fore.RESET)
-        return {"critique": response.content}
+        review = self.model.with_structured_output(Review).invoke(messages) # the score drives the early exit
+        print("Reflection node: ", Fore.YELLOW + f"Score: {review.score}/10 Critique: " + review.critique + Fore.RESET)
+        update = {"critique": f"Score: {review.score}/10\n\n{review.critique}", "scores": [review.score]}
+        if review.score > state.get('best_score', 0):
+            update.update(best_draft=state['draft'], best_score=review.score)
+        return update
         
     
     def invoke(self, state: AgentState):
         return self.graph.invoke(state)
     
-graph = Agent(model=model, tools=[tavily])
 
-user_input = input("Enter the Idea on which you want me to create report: " + Fore.GREEN)
-print(Fore.RESET)
+@lru_cache(maxsize=None)
+def build_graph(score_threshold: int = 8):
+    # the researcher searches through build_search()
+    return Agent(model=build_model(), tools=[], gate=QualityGate(threshold=score_threshold)).graph
+
+
+if __name__ == "__main__":
+    graph = build_graph()
+    profiler = profile_from_env(graph) # GRAPH_PROFILE=<path> times every node, see common/profiler.py
+
+    user_input = input("Enter the Idea on which you want me to create report: " + Fore.GREEN)
+    print(Fore.RESET)
         
-result = graph.invoke(AgentState(
-    task=user_input,
-    plan="",
-    draft="",
-    critique="",
-    content=[],
-    revision_number=0,
-    max_revisions=3
-))
-
-
-print(Fore.GREEN + "Final Draft: " + result['draft'] + Fore.RESET)
+    result = graph.invoke(AgentState(
+        task=user_input,
+        plan="",
+        draft="",
+        critique="",
+        content=[],
+        searched=[],
+        revision_number=0,
+        max_revisions=3,
+        scores=[],
+        best_draft="",
+        best_score=0
+    ))
+
+
+    print(Fore.GREEN + f"Final Draft (score {result['best_score']}/10 after {result['revision_number']} revisions): "
+          + result['best_draft'] + Fore.RESET)
+    print(content_store.stats)
+    print(query_memory.stats)
+    print(build_search().client.stats)
+    print(default_llm_cache().stats)
+    if profiler:
+        print(profiler.report())
 
@@ -0,0 +1,148 @@
+"""Async HTTP front-end for the compiled graphs of 08_react_agent (`app`) and 10_RAG (`rag_agent`).
+
+The graphs are imported once at startup and shared by every request. Each request runs
+its own graph run and streams the answer back as Server-Sent Events while the LLM node
+is still generating. At most `max_in_flight` runs execute at the same time, the next
+`max_waiting` requests wait for a slot and anything beyond that gets a 503.
+
+run (from the repo root, 10_RAG has to be ingested once with `python 10_RAG/main.py`):
+    python 16_agent_server/main.py --port 8080
+
+    curl -N -X POST localhost:8080/react -d '{"message": "Add 40 + 12 and multiply the result by 6"}'
+    curl -N -X POST localhost:8080/rag -d '{"message": "How did the S&P 500 do in 2024?"}'
+    curl localhost:8080/health
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT) # lets us import the shared helpers in common/
+
+from aiohttp import web
+from langchain_core.messages import HumanMessage
+from common.examples import load_example
+from common.streaming import TokenStream
+
+# name -> (example folder, nodes whose tokens we stream, what to build before the first request)
+EXAMPLES = {
+    "react": ("08_react_agent", ["our_agent"], ["build_model"]),
+    "rag": ("10_RAG", ["llm"], ["build_model", "build_retriever"]),
+}
+
+
+@dataclass
+class ServerStats:
+    in_flight: int = 0
+    waiting: int = 0
+    served: int = 0
+    failed: int = 0
+    rejected: int = 0
+
+
+class GraphServer:
+    """Serves compiled graphs at POST /<name>, `graphs` maps name -> (graph, nodes whose tokens we stream)"""
+
+    def __init__(self, graphs: dict, max_in_flight: int = 32, max_waiting: int = 256):
+        self.graphs = graphs
+        self.max_in_flight = max_in_flight
+        self.max_waiting = max_waiting
+        self.stats = ServerStats()
+        self._slots = asyncio.Semaphore(max_in_flight)
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/{graph}", self.run)
+        app.router.add_get("/health", self.health)
+        app.on_startup.append(self._start)
+        return app
+
+    async def _start(self, app):
+        # The nodes are sync functions, LangGraph runs them in the default executor
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=self.max_in_flight))
+
+    async def health(self, request):
+        return web.json_response(asdict(self.stats))
+
+    async def run(self, request):
+        name = request.match_info["graph"]
+        if name not in self.graphs:
+            raise web.HTTPNotFound(text=f"unknown graph {name!r}, try one of {sorted(self.graphs)}")
+        try:
+            message = (await request.json())["message"]
+        except (ValueError, KeyError):
+            raise web.HTTPBadRequest(text='expected a JSON body like {"message": "..."}')
+
+        if self._slots.locked() and self.stats.waiting >= self.max_waiting:
+            self.stats.rejected += 1
+            raise web.HTTPServiceUnavailable(text="too many requests, try again later")
+
+        self.stats.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.stats.waiting -= 1
+        self.stats.in_flight += 1
+        try:
+            return await self._stream(request, name, message)
+        finally:
+            self.stats.in_flight -= 1
+            self._slots.release()
+
+    async def _stream(self, request, name, message):
+        graph, nodes = self.graphs[name]
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        response.enable_chunked_encoding()  # keeps the client connection alive after the stream ends
+        await response.prepare(request)
+
+        async def send(event, data):
+            await response.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+
+        stream = TokenStream(graph, {"messages": [HumanMessage(content=message)]}, nodes=nodes)
+        try:
+            async for token in stream:
+                await send("token", {"content": token})
+        except Exception as e:
+            self.stats.failed += 1
+            await send("error", {"error": str(e)})
+            return response
+
+        self.stats.served += 1
+        await send("done", {
+            "answer": stream.state["messages"][-1].content,
+            "first_token_seconds": stream.stats.first_token_seconds,
+            "total_seconds": stream.stats.total_seconds,
+        })
+        await response.write_eof()
+        return response
+
+
+def build_server(max_in_flight: int = 32, max_waiting: int = 256, examples=("react", "rag")) -> GraphServer:
+    graphs = {}
+    for name in examples:
+        folder, nodes, warm_up = EXAMPLES[name]
+        module = load_example(folder)
+        graphs[name] = (module.build_graph(), nodes)
+        for factory in warm_up:  # the examples build these lazily, the first request should not pay for it
+            getattr(module, factory)()
+    return GraphServer(graphs, max_in_flight=max_in_flight, max_waiting=max_waiting)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-in-flight", type=int, default=32)
+    parser.add_argument("--max-waiting", type=int, default=256)
+    parser.add_argument("--graphs", default="react,rag", help="comma separated: react, rag")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    server = build_server(args.max_in_flight, args.max_waiting, args.graphs.split(","))
+    print(f"Loaded graphs {sorted(server.graphs)} in {time.perf_counter() - start:.1f}s")
+    web.run_app(server.app(), host=args.host, port=args.port)
@@ -0,0 +1,101 @@
+"""Load test for 16_agent_server: throughput and tail latency with a cap on in-flight runs.
+
+Serves the real 08_react_agent graph, but ChatOpenAI talks to a local stub of the OpenAI
+chat completions API (first token after 0.2s, then 10ms per token): the first call of a
+run asks for the `add` tool, the call after the tool result streams a short answer.
+64 clients send requests concurrently, and every configuration reports requests per
+second, p50/p99 latency, p50/p99 time to first token and how many connections were
+opened to the upstream, which stays at most the pool size no matter how many requests.
+
+run:
+    python benchmarks/agent_server_benchmark.py
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+
+from common.examples import load_example
+from fakes import StubOpenAI, serve_app
+
+CLIENTS = 64
+REQUESTS = 256
+
+
+async def one_request(session, url):
+    """Returns (time to first token, total time, status)"""
+    start_time = time.perf_counter()
+    first = None
+    async with session.post(url, json={"message": "Add 40 + 12 and tell me a joke"}) as response:
+        if response.status != 200:
+            await response.read()
+            return None, time.perf_counter() - start_time, response.status
+        async for line in response.content:
+            if first is None and line.startswith(b"event: token"):
+                first = time.perf_counter() - start_time
+    return first, time.perf_counter() - start_time, 200
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+async def run(graphs, stub, max_in_flight, max_waiting):
+    server = load_example("16_agent_server").GraphServer(graphs, max_in_flight=max_in_flight, max_waiting=max_waiting)
+    runner, port = await serve_app(server.app())
+    url = f"http://127.0.0.1:{port}/react"
+    stub.connections.clear()
+
+    queue = asyncio.Queue()
+    for _ in range(REQUESTS):
+        queue.put_nowait(None)
+    results = []
+
+    async def client(session):
+        while not queue.empty():
+            queue.get_nowait()
+            results.append(await one_request(session, url))
+
+    start_time = time.perf_counter()
+    async with ClientSession(connector=TCPConnector(limit=CLIENTS), timeout=ClientTimeout(total=300)) as session:
+        await asyncio.gather(*(client(session) for _ in range(CLIENTS)))
+    elapsed = time.perf_counter() - start_time
+    await runner.cleanup()
+
+    ok = [r for r in results if r[2] == 200]
+    totals = [r[1] for r in ok]
+    firsts = [r[0] for r in ok if r[0] is not None]
+    print(f"max_in_flight={max_in_flight:<3} max_waiting={max_waiting:<4} "
+          f"{len(ok) / elapsed:6.1f} req/s  "
+          f"latency p50 {statistics.median(totals):5.2f}s p99 {percentile(totals, 99):5.2f}s  "
+          f"first token p50 {statistics.median(firsts):5.2f}s p99 {percentile(firsts, 99):5.2f}s  "
+          f"503s {len(results) - len(ok):3}  upstream connections {len(stub.connections)}")
+
+
+async def main():
+    stub = StubOpenAI()
+    stub_runner, stub_port = await serve_app(stub.app())
+    os.environ["OPENAI_API_KEY"] = "stub"
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{stub_port}/v1"
+    os.environ["LLM_CACHE_MODE"] = "off"  # every request should reach the stub
+
+    graphs = load_example("16_agent_server").build_server(examples=["react"]).graphs
+
+    print(f"{REQUESTS} requests from {CLIENTS} concurrent clients against 08_react_agent")
+    await run(graphs, stub, max_in_flight=8, max_waiting=256)
+    await run(graphs, stub, max_in_flight=32, max_waiting=256)
+    await run(graphs, stub, max_in_flight=64, max_waiting=256)
+    await run(graphs, stub, max_in_flight=16, max_waiting=16)  # sheds load instead of queueing
+    print(f"stub upstream served {stub.calls} chat completions")
+    await stub_runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
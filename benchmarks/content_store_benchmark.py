@@ -0,0 +1,86 @@
+"""Writer prompt size across revisions: plain content list vs ContentStore reducer.
+
+Runs a small research -> write loop shaped like 14/15 (20 queries per revision) against a
+fake search whose queries overlap between revisions and whose rephrased queries return
+near duplicate snippets, the way real search results do.
+
+run:
+    python benchmarks/content_store_benchmark.py
+"""
+import operator
+import os
+import random
+import sys
+from typing import Annotated, List, TypedDict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langgraph.graph import StateGraph, END
+from common.content_store import ContentStore
+
+topics = [f"topic {i}" for i in range(40)]
+rephrasings = ["{t} market size", "latest {t} market size", "{t} market size 2024"]
+words = "market growth revenue customers demand supply competitors funding pricing trend".split()
+
+
+def fake_search(query):
+    """Two results per query; rephrasings of the same topic return nearly the same text"""
+    topic = next(t for t in topics if query.startswith(t) or f" {t} " in f" {query} ")
+    rng = random.Random(topic)
+    results = []
+    for i in range(2):
+        body = " ".join(rng.choice(words) for _ in range(120))
+        results.append({"content": f"{topic} result {i}: {body}. Retrieved for '{query}'.",
+                        "url": f"https://example.com/{topic.replace(' ', '-')}/{i}",
+                        "score": round(rng.random(), 3)})
+    return {"results": results}
+
+
+def queries_for(revision):
+    rng = random.Random(revision)
+    # Later revisions mostly revisit the same topics with slightly different wording
+    pool = topics[:20 + 4 * revision]
+    return [rng.choice(rephrasings).format(t=rng.choice(pool)) for _ in range(20)]
+
+
+def run(content_channel, to_snippets, to_text, max_revisions=6):
+    prompt_tokens = []
+
+    class State(TypedDict):
+        content: content_channel
+        revision_number: int
+
+    def research(state):
+        responses = [fake_search(q) for q in queries_for(state["revision_number"])]
+        return {"content": to_snippets(responses)}
+
+    def write(state):
+        prompt_tokens.append(len(to_text(state["content"])) // 4)
+        return {"revision_number": state["revision_number"] + 1}
+
+    builder = StateGraph(State)
+    builder.add_node("research", research)
+    builder.add_node("write", write)
+    builder.set_entry_point("research")
+    builder.add_edge("research", "write")
+    builder.add_conditional_edges("write", lambda s: s["revision_number"] < max_revisions,
+                                  {True: "research", False: END})
+    builder.compile().invoke({"content": [], "revision_number": 0})
+    return prompt_tokens
+
+
+def main():
+    plain = run(Annotated[List[str], operator.add],
+                lambda responses: [r["content"] for resp in responses for r in resp["results"]],
+                lambda content: "\n\n".join(content))
+    store = ContentStore(max_tokens=8000)
+    bounded = run(Annotated[List[dict], store.merge], store.from_search, ContentStore.text)
+
+    print("writer prompt research tokens per revision")
+    for revision, (a, b) in enumerate(zip(plain, bounded), start=1):
+        print(f"revision {revision}: plain list ~{a:>6} tokens, content store ~{b:>5} tokens")
+    print(store.stats)
+
+
+if __name__ == "__main__":
+    main()
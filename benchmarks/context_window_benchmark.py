@@ -0,0 +1,99 @@
+"""Prompt tokens, latency and memory per turn of the 07 memory agent over a long conversation.
+
+Full history: every turn sends the whole conversation (what `process` used to do).
+Context window: the manage_context node keeps a token budget and a rolling summary.
+Runs on a fake chat model whose latency grows with the prompt size, so no API key is needed.
+The full history run stops at 1,000 turns, it only gets slower from there.
+
+run:
+    python benchmarks/context_window_benchmark.py
+"""
+import os
+import sys
+import time
+import tracemalloc
+from typing import Annotated, List, TypedDict
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "07_memory_agent"))
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langgraph.graph import END, START, StateGraph
+from langgraph.graph.message import add_messages
+
+from context_window import ContextWindow, count_tokens
+from fakes import FakeChatModel
+
+CHECKPOINTS = [10, 100, 1_000, 5_000, 10_000]
+
+
+class AgentState(TypedDict):
+    messages: Annotated[List[BaseMessage], add_messages]
+    summary: str
+    summarized: int
+
+
+def build_agent(llm, context_window=None):
+    def process(state):
+        prompt = context_window.prompt(state) if context_window else state["messages"]
+        response = llm.invoke(prompt)
+        return {"messages": [AIMessage(content=response.content)]}
+
+    graph = StateGraph(AgentState)
+    graph.add_node("process", process)
+    if context_window:
+        graph.add_node("manage_context", context_window.manage_context)
+        graph.add_edge(START, "manage_context")
+        graph.add_edge("manage_context", "process")
+    else:
+        graph.add_edge(START, "process")
+    graph.add_edge("process", END)
+    return graph.compile()
+
+
+def user_message(turn: int) -> HumanMessage:
+    return HumanMessage(content=f"Turn {turn}: I drove my sports car to the coast today, the weather was "
+                                f"great and I want to plan another trip next weekend, any ideas?")
+
+
+def converse(agent, turns, measure_memory=False):
+    """Yields (turn, prompt tokens, seconds for the last turns, traced memory) at every checkpoint"""
+    history, summary, summarized = [], "", 0
+    window_seconds = 0.0
+    for turn in range(1, turns + 1):
+        history.append(user_message(turn))
+        start = time.perf_counter()
+        result = agent.invoke({"messages": history, "summary": summary, "summarized": summarized})
+        window_seconds += time.perf_counter() - start
+        history, summary, summarized = result["messages"], result.get("summary", ""), result.get("summarized", 0)
+        if turn in CHECKPOINTS:
+            prompt_tokens = sum(count_tokens(str(m.content)) for m in history) + count_tokens(summary)
+            memory = tracemalloc.get_traced_memory()[0] if measure_memory else 0
+            yield turn, prompt_tokens, window_seconds, memory
+            window_seconds = 0.0
+
+
+def main():
+    llm = FakeChatModel(latency=0, per_token_latency=5e-7)
+
+    print("full history:")
+    for turn, tokens, seconds, _ in converse(build_agent(llm), 1_000):
+        print(f"  turn {turn:>6}: {tokens:>7} prompt tokens, {seconds * 1000 / turn:7.2f}ms per turn so far")
+
+    context_window = ContextWindow(llm, max_tokens=3000, summarize_every=10)
+    print("context window (3000 tokens, summary every 10+ messages):")
+    previous = 0
+    for turn, tokens, seconds, _ in converse(build_agent(llm, context_window), CHECKPOINTS[-1]):
+        print(f"  turn {turn:>6}: {tokens:>7} prompt tokens, {seconds * 1000 / (turn - previous):7.2f}ms per turn "
+              f"since turn {previous}, {context_window.summaries} summary updates")
+        previous = turn
+
+    # Memory in a separate run, tracemalloc slows everything down
+    tracemalloc.start()
+    print("context window memory:")
+    for turn, _, _, memory in converse(build_agent(llm, ContextWindow(llm, max_tokens=3000)), CHECKPOINTS[-1], True):
+        print(f"  turn {turn:>6}: {memory / 1024:8.0f} KiB traced")
+    tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    main()
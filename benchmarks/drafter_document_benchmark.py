@@ -0,0 +1,125 @@
+"""Per-turn tokens and latency of a Drafter editing session: whole-document updates vs line edits.
+
+A session makes 10 small edits (one line rewritten each) to documents of 100 to 5000 lines.
+The old Drafter sent the whole document in every `update` tool call, echoed it back in the
+ToolMessage and pasted it into the system prompt. The new one edits through the piece
+table tools of 09_drafter_agent: it views the 11 lines around the edit, then `replace`s
+the line, so only those lines and the diff travel. For the last turn
+of the session we count the tokens the model reads (system prompt + conversation so far)
+and writes (the tool call), and time the tool itself. Latency is estimated from the tokens
+with typical gpt-4o rates (see PREFILL_TOKENS_PER_S / DECODE_TOKENS_PER_S), since writing
+the tool call dominates: the old Drafter had to re-type the whole document for every edit.
+
+run:
+    python benchmarks/drafter_document_benchmark.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.tools import tool
+
+from common.content_store import estimate_tokens
+from common.examples import load_example
+
+EDITS = 10
+PREFILL_TOKENS_PER_S = 4000  # prompt tokens the model reads per second
+DECODE_TOKENS_PER_S = 80  # tokens it writes per second
+
+OLD_SYSTEM_PROMPT = """
+    You are Drafter, a helpful writing assistant. You are going to help the user update and modify documents.
+
+    - If the user wants to update or modify content, use the 'update' tool with the complete updated content.
+    - If the user wants to save and finish, you need to use the 'save' tool.
+    - Make sure to always show the current document state after modifications.
+
+    The current document content is:{document_content}
+    """
+
+
+document_content = ""
+
+
+@tool
+def update(content: str) -> str:
+    """The old Drafter update tool"""
+    global document_content
+    document_content = content
+    return f"Document has been updated successfully! The current content is:\n{document_content}"
+
+
+def make_document(lines: int) -> str:
+    return "\n".join(f"Line {i}: the quarterly report explains how revenue grew in region {i % 7}." for i in range(lines))
+
+
+def edit_line(i: int, lines: int) -> int:
+    return (i * 37) % lines + 1
+
+
+def old_session(text: str, lines: int):
+    """Every edit is a full `update`: the args, the echoed result and the system prompt carry the document"""
+    history_tokens, tool_seconds = 0, 0.0
+    for i in range(EDITS):
+        line = edit_line(i, lines)
+        parts = text.split("\n")
+        parts[line - 1] = f"Line {line - 1}: rewritten in turn {i}."
+        content = "\n".join(parts)  # what the model has to write in the tool call
+
+        start = time.perf_counter()
+        result = update.invoke({"content": content})
+        tool_seconds = time.perf_counter() - start
+
+        read = estimate_tokens(OLD_SYSTEM_PROMPT.format(document_content=text)) + history_tokens
+        written = estimate_tokens(content)
+        history_tokens += written + estimate_tokens(result)
+        text = content
+    return read, written, tool_seconds
+
+
+def new_session(drafter, text: str, lines: int):
+    """Every edit is a `view` of the lines around it and a `replace` of one line"""
+    config = {"configurable": {"thread_id": f"benchmark-{lines}"}}
+    document = drafter.session_for(config).document
+    document.set_text(text)
+    history_tokens, tool_seconds = 0, 0.0
+    for i in range(EDITS):
+        line = edit_line(i, lines)
+        args = {"start": line, "end": line, "text": f"Line {line - 1}: rewritten in turn {i}."}
+        system_prompt = drafter.build_system_prompt(document).content
+        view_args = {"start": max(line - 5, 1), "end": min(line + 5, lines)}
+        history_tokens += estimate_tokens(str(view_args)) + estimate_tokens(drafter.view.invoke(view_args, config))
+
+        start = time.perf_counter()
+        result = drafter.replace.invoke(args, config)
+        tool_seconds = time.perf_counter() - start
+
+        read = estimate_tokens(system_prompt) + history_tokens
+        written = estimate_tokens(str(args))
+        history_tokens += written + estimate_tokens(result)
+    expected = text.split("\n")
+    for i in range(EDITS):
+        line = edit_line(i, lines)
+        expected[line - 1] = f"Line {line - 1}: rewritten in turn {i}."
+    assert document.text() == "\n".join(expected)
+    return read, written, tool_seconds
+
+
+def main():
+    os.environ["DRAFTER_SESSIONS_DIR"] = tempfile.mkdtemp()  # the autosaves of the sessions
+    drafter = load_example("09_drafter_agent")
+    print(f"turn {EDITS} of a session of {EDITS} one-line edits "
+          f"(latency estimated at {PREFILL_TOKENS_PER_S} prompt and {DECODE_TOKENS_PER_S} output tokens/s)\n")
+    print(f"{'lines':>6} {'':<12} {'tokens read':>12} {'written':>9} {'tool time':>11} {'est. latency':>13}")
+    for lines in [100, 1_000, 5_000]:
+        text = make_document(lines)
+        for label, (read, written, seconds) in [("whole doc", old_session(text, lines)),
+                                                ("line edits", new_session(drafter, text, lines))]:
+            latency = read / PREFILL_TOKENS_PER_S + written / DECODE_TOKENS_PER_S
+            print(f"{lines:>6} {label:<12} {read:>12,} {written:>9,} {seconds * 1e6:>9.0f}us {latency:>12.1f}s")
+
+
+if __name__ == "__main__":
+    main()
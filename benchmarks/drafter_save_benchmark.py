@@ -0,0 +1,130 @@
+"""Saving the Drafter's document: a synchronous full write in the turn vs the session store.
+
+The old save tool wrote the whole document with open(filename, 'w') inside the agent turn,
+in the current directory. 09_drafter_agent now saves per session (session_store.py): edits
+queue an incremental autosave of their hunks, and save writes a temp file that replaces the
+old one, both on the session's writer thread. Measures:
+
+  1. an edit turn (a one line `replace`) that also persists the document: the old full write
+     vs the queued autosave, and the bytes that reach the disk per edit
+  2. the explicit save with the graph running on an event loop: how long the loop is
+     blocked (a 1ms heartbeat task measures its longest stall) while the document is saved
+  3. two sessions saving "report.txt" at the same time
+
+run:
+    python benchmarks/drafter_save_benchmark.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.examples import load_example
+
+EDITS = 50
+
+
+def make_document(lines: int) -> str:
+    return "\n".join(f"Line {i}: the quarterly report explains how revenue grew in region {i % 7}." for i in range(lines))
+
+
+def old_write(path: str, text: str):
+    with open(path, "w") as file:
+        file.write(text)
+
+
+def edit_turns(drafter, session_id: str, text: str, lines: int, old_folder: str = ""):
+    """Per turn seconds of EDITS one line replaces, each followed by the old full write or an autosave"""
+    config = {"configurable": {"thread_id": session_id}}
+    session = drafter.session_for(config)
+    session.document.set_text(text)
+    session.autosave()
+    session.flush()
+    written = session.stats.bytes_written
+    start = time.perf_counter()
+    for i in range(EDITS):
+        line = (i * 37) % lines + 1
+        session.document.replace(line, line, f"Line {line - 1}: rewritten in turn {i}.")
+        if old_folder:
+            old_write(os.path.join(old_folder, "report.txt"), session.document.text())
+        else:
+            session.autosave()  # what the edit tools do
+    seconds = (time.perf_counter() - start) / EDITS
+    session.flush()
+    per_edit = len(text) if old_folder else (session.stats.bytes_written - written) / EDITS
+    return seconds, per_edit
+
+
+async def loop_stall(save) -> tuple:
+    """(save seconds, longest event loop stall) while a 1ms heartbeat runs next to the save"""
+    stalls, running = [0.0], True
+
+    async def heartbeat():
+        last = time.perf_counter()
+        while running:
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            stalls[0] = max(stalls[0], now - last - 0.001)
+            last = now
+
+    beat = asyncio.create_task(heartbeat())
+    await asyncio.sleep(0.01)
+    start = time.perf_counter()
+    await save()
+    seconds = time.perf_counter() - start
+    running = False
+    await beat
+    return seconds, stalls[0]
+
+
+def main():
+    root = tempfile.mkdtemp()
+    os.environ["DRAFTER_SESSIONS_DIR"] = root
+    drafter = load_example("09_drafter_agent")
+    old_folder = tempfile.mkdtemp()
+
+    edit_turns(drafter, "warmup", make_document(100), 100)
+    print(f"1. an edit turn that persists the document, mean of {EDITS} one line replaces")
+    print(f"{'lines':>8} {'full write':>12} {'autosave':>10} {'bytes/edit, full':>18} {'autosave':>10}")
+    for lines in [1_000, 10_000, 100_000]:
+        text = make_document(lines)
+        old_seconds, old_bytes = edit_turns(drafter, f"old-{lines}", text, lines, old_folder)
+        new_seconds, new_bytes = edit_turns(drafter, f"new-{lines}", text, lines)
+        print(f"{lines:>8} {old_seconds * 1000:>10.2f}ms {new_seconds * 1000:>8.2f}ms {old_bytes:>18,.0f} {new_bytes:>10,.0f}")
+
+    print("\n2. the save tool on an event loop: save time / longest loop stall")
+    print(f"{'lines':>8} {'open(w) in the turn':>24} {'session.asave':>24}")
+    for lines in [10_000, 100_000, 400_000]:
+        session = drafter.get_session(f"save-{lines}")
+        session.document.set_text(make_document(lines))
+
+        async def old_save():
+            old_write(os.path.join(old_folder, "report.txt"), session.document.text())
+
+        async def new_save():
+            await session.asave("report")
+
+        results = [asyncio.run(loop_stall(save)) for save in (old_save, new_save)]
+        print(f"{lines:>8} " + " ".join(f"{seconds * 1000:>10.1f}ms / {stall * 1000:>7.1f}ms" for seconds, stall in results))
+
+    print("\n3. two sessions save 'report.txt' at the same time")
+    sessions = [drafter.get_session(name) for name in ("alice", "bob")]
+    for session in sessions:
+        session.document.set_text(f"{session.session_id}'s report")
+    for session in sessions:
+        old_write(os.path.join(old_folder, "report.txt"), session.document.text())
+    with open(os.path.join(old_folder, "report.txt")) as file:
+        print(f"   open(w) in the current directory: one file left, {file.read()!r}")
+    paths = [future.result() for future in [session.save("report.txt") for session in sessions]]
+    contents = []
+    for path in paths:
+        with open(path) as file:
+            contents.append(file.read())
+    print(f"   session store: {len(set(paths))} files, {contents}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""How many embedding calls and how much latency the 10_RAG embedding cache removes across restarts.
+
+Every "restart" builds a brand new vector store (so ingestion has to embed everything again)
+but shares the same cache file, then answers the same set of queries.
+
+run:
+    python benchmarks/embedding_cache_benchmark.py
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "10_RAG"))
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_chroma import Chroma
+from ingestion import ingest_pdf
+from embedding_cache import CachedEmbeddings
+from fakes import SlowFakeEmbeddings
+
+pdf_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        "10_RAG", "Stock_Market_Performance_2024.pdf")
+
+queries = [
+    "How did the S&P 500 perform in 2024?",
+    "Which sector performed best?",
+    "What happened to the Nasdaq?",
+    "How did the S&P 500 perform in 2024?",
+    "What did the Fed do with interest rates?",
+] * 4
+
+
+def restart(cache_path, workdir):
+    fake = SlowFakeEmbeddings(size=1536)
+    embeddings = CachedEmbeddings(fake, cache_path)
+    persist_directory = tempfile.mkdtemp(dir=workdir)
+    vectorstore = Chroma(embedding_function=embeddings, persist_directory=persist_directory,
+                         collection_name="stock_market")
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+
+    start = time.perf_counter()
+    ingest_pdf(pdf_path, vectorstore, text_splitter, persist_directory)
+    ingest_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for q in queries:
+        vectorstore.similarity_search(q, k=5)
+    query_seconds = time.perf_counter() - start
+
+    embeddings.close()
+    return fake, embeddings.stats, ingest_seconds, query_seconds
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="embedding_cache_bench_")
+    cache_path = os.path.join(workdir, "embedding_cache.sqlite")
+    try:
+        for run in range(1, 4):
+            fake, stats, ingest_seconds, query_seconds = restart(cache_path, workdir)
+            print(f"run {run}: ingest {ingest_seconds:.3f}s, {len(queries)} queries {query_seconds:.3f}s, "
+                  f"real embedding calls={fake.calls}")
+            print(f"       {stats}")
+        print(f"cache file size: {os.path.getsize(cache_path)} bytes")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""Local stand-ins for the paid APIs, so the benchmarks run offline and for free."""
+import asyncio
+import hashlib
+import json
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Optional
+
+from aiohttp import web
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+
+class FakeRateLimitError(Exception):
+    """Looks like the 429 an API client raises when we go too fast"""
+    status_code = 429
+
+
+class SlowFakeEmbeddings(DeterministicFakeEmbedding):
+    """Deterministic fake embeddings that sleep like a real API call would.
+
+    With requests_per_second set, requests over that rate fail with a 429 style error.
+    """
+    latency: float = 0.05  # seconds per request
+    per_text_latency: float = 0.001  # extra seconds per text in the request
+    requests_per_second: float = 0.0  # 0 means no rate limit
+    calls: int = 0
+    texts_embedded: int = 0
+    rate_limited: int = 0
+    recent: deque = None
+
+    def _check_rate_limit(self):
+        if not self.requests_per_second:
+            return
+        if self.recent is None:
+            self.recent = deque()
+        now = time.monotonic()
+        while self.recent and now - self.recent[0] > 1.0:
+            self.recent.popleft()
+        if len(self.recent) >= self.requests_per_second:
+            self.rate_limited += 1
+            raise FakeRateLimitError("Rate limit reached for requests")
+        self.recent.append(now)
+
+    def embed_documents(self, texts):
+        self._check_rate_limit()
+        self.calls += 1
+        self.texts_embedded += len(texts)
+        time.sleep(self.latency + self.per_text_latency * len(texts))
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        self._check_rate_limit()
+        self.calls += 1
+        self.texts_embedded += 1
+        time.sleep(self.latency + self.per_text_latency)
+        return super().embed_query(text)
+
+    async def aembed_documents(self, texts):
+        self._check_rate_limit()
+        self.calls += 1
+        self.texts_embedded += len(texts)
+        await asyncio.sleep(self.latency + self.per_text_latency * len(texts))
+        return super().embed_documents(texts)
+
+    async def aembed_query(self, text):
+        self._check_rate_limit()
+        self.calls += 1
+        self.texts_embedded += 1
+        await asyncio.sleep(self.latency + self.per_text_latency)
+        return super().embed_query(text)
+
+
+def make_large_pdf(path: str, copies: int = 20):
+    """Builds a bigger PDF by repeating the pages of the 10_RAG sample report"""
+    import os
+    from pypdf import PdfReader, PdfWriter
+
+    sample = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          "10_RAG", "Stock_Market_Performance_2024.pdf")
+    reader = PdfReader(sample)
+    writer = PdfWriter()
+    for _ in range(copies):
+        for page in reader.pages:
+            writer.add_page(page)
+    with open(path, "wb") as file:
+        writer.write(file)
+    return path
+
+
+class FakeTavilyClient:
+    """Stands in for tavily.TavilyClient: deterministic results after a configurable delay.
+
+    latency is the base delay per search, jitter adds up to that many extra seconds
+    (derived from the query, so runs are repeatable) and every fail_every-th call raises.
+    """
+
+    def __init__(self, latency: float = 0.5, jitter: float = 0.5, fail_every: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.fail_every = fail_every
+        self.calls = 0
+
+    def delay_for(self, query: str) -> float:
+        fraction = int(hashlib.sha256(query.encode()).hexdigest()[:8], 16) / 0xFFFFFFFF
+        return self.latency + self.jitter * fraction
+
+    def search(self, query: str, max_results: int = 5, include_answer: bool = False, **kwargs):
+        self.calls += 1
+        if self.fail_every and self.calls % self.fail_every == 0:
+            raise ConnectionError("fake network error")
+        time.sleep(self.delay_for(query))
+        slug = hashlib.sha256(query.encode()).hexdigest()[:8]
+        results = [{"url": f"https://example.com/{slug}/{i}",
+                    "title": f"{query} #{i}",
+                    "content": f"Snippet {i} about {query}."}
+                   for i in range(max_results)]
+        response = {"query": query, "results": results}
+        if include_answer:
+            response["answer"] = f"A short answer about {query}."
+        return response
+
+
+def _fake_args(schema: dict, text: str) -> dict:
+    """Arguments for a tool call that fit the tool's JSON schema"""
+    args = {}
+    for name, prop in schema.get("properties", {}).items():
+        kind = prop.get("type")
+        if kind == "array":
+            args[name] = [f"{text[:40]} {i}" for i in range(3)]
+        elif kind in ("integer", "number"):
+            args[name] = 1
+        elif kind == "boolean":
+            args[name] = True
+        else:
+            args[name] = text[:40]
+    return args
+
+
+class FakeChatModel(BaseChatModel):
+    """Stands in for ChatOpenAI: deterministic replies after a configurable delay.
+
+    The reply depends only on the last message. With tools bound and tool_choice set
+    (with_structured_output does that) it answers with a call to the first tool.
+    Streaming yields the reply word by word, the first word after `latency`.
+    """
+    latency: float = 0.2
+    per_token_latency: float = 0.0  # extra seconds per prompt token, like prefill on a real model
+    token_latency: float = 0.0  # seconds per generated word
+    reply_words: int = 0  # pads the reply to make it longer
+    temperature: Optional[float] = 0
+    model_name: str = "fake-gpt"
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"model_name": self.model_name, "temperature": self.temperature}
+
+    def bind_tools(self, tools, tool_choice=None, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], tool_choice=tool_choice, **kwargs)
+
+    def _reply(self, messages, tools=None, tool_choice=None, **kwargs):
+        self.calls += 1
+        last = str(messages[-1].content)
+        digest = hashlib.sha256(last.encode()).hexdigest()[:8]
+        tokens = sum(len(str(m.content)) for m in messages) // 4 + 50
+        usage = {"input_tokens": tokens - 50, "output_tokens": 50, "total_tokens": tokens}
+        if tools and tool_choice:
+            function = tools[0]["function"]
+            call = {"name": function["name"], "args": _fake_args(function.get("parameters", {}), last),
+                    "id": f"call_{digest}"}
+            message = AIMessage(content="", tool_calls=[call], usage_metadata=usage)
+        else:
+            padding = "".join(f" word{i}" for i in range(self.reply_words))
+            message = AIMessage(content=f"Answer {digest} to: {last[:60]}{padding}", usage_metadata=usage)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _delay(self, messages):
+        return self.latency + self.per_token_latency * sum(len(str(m.content)) // 4 for m in messages)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        result = self._reply(messages, **kwargs)
+        words = len(result.generations[0].message.content.split())
+        time.sleep(self._delay(messages) + self.token_latency * words)
+        return result
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        result = self._reply(messages, **kwargs)
+        words = len(result.generations[0].message.content.split())
+        await asyncio.sleep(self._delay(messages) + self.token_latency * words)
+        return result
+
+    def _chunks(self, message):
+        if message.tool_calls:
+            return [AIMessageChunk(content="", tool_calls=message.tool_calls, usage_metadata=message.usage_metadata)]
+        words = re.findall(r"\S+\s*", message.content)
+        return [AIMessageChunk(content=word, usage_metadata=message.usage_metadata if i == len(words) - 1 else None)
+                for i, word in enumerate(words)]
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        chunks = self._chunks(self._reply(messages, **kwargs).generations[0].message)
+        time.sleep(self._delay(messages))
+        for i, chunk in enumerate(chunks):
+            if i:
+                time.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        chunks = self._chunks(self._reply(messages, **kwargs).generations[0].message)
+        await asyncio.sleep(self._delay(messages))
+        for i, chunk in enumerate(chunks):
+            if i:
+                await asyncio.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=chunk)
+
+
+class StubOpenAI:
+    """Just enough of the OpenAI API (POST /v1/chat/completions, streaming and not) for ChatOpenAI.
+
+    The first call of a run asks for the `add` tool, the call after the tool result answers
+    with `answer`, streamed word by word. Counts the calls and the client connections.
+    """
+
+    def __init__(self, first_token_latency: float = 0.2, token_latency: float = 0.01,
+                 answer: str = "40 plus 12 is 52 . Here is a joke : why did the graph cross the road ? To reach END ."):
+        self.first_token_latency = first_token_latency
+        self.token_latency = token_latency
+        self.answer = answer
+        self.calls = 0
+        self.connections = set()
+
+    def app(self):
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.completions)
+        return app
+
+    def _chunk(self, delta, finish_reason=None):
+        return {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                "model": "gpt-4o", "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+
+    async def completions(self, request):
+        self.calls += 1
+        self.connections.add(request.transport.get_extra_info("peername"))
+        body = await request.json()
+        tool_turn = body["messages"][-1]["role"] != "tool"
+        await asyncio.sleep(self.first_token_latency)
+
+        if tool_turn:
+            tool_call = {"id": f"call_{uuid.uuid4().hex[:8]}", "type": "function",
+                         "function": {"name": "add", "arguments": json.dumps({"a": 40, "b": 12})}}
+        if not body.get("stream"):
+            message = {"role": "assistant", "content": None if tool_turn else self.answer}
+            if tool_turn:
+                message["tool_calls"] = [tool_call]
+            return web.json_response({
+                "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()), "model": "gpt-4o",
+                "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if tool_turn else "stop"}],
+                "usage": {"prompt_tokens": 50, "completion_tokens": 20, "total_tokens": 70},
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        response.enable_chunked_encoding()  # without a length aiohttp would close the connection after every response
+        await response.prepare(request)
+
+        async def send(data):
+            await response.write(f"data: {json.dumps(data)}\n\n".encode())
+
+        if tool_turn:
+            await send(self._chunk({"role": "assistant", "tool_calls": [dict(tool_call, index=0)]}))
+            await send(self._chunk({}, "tool_calls"))
+        else:
+            await send(self._chunk({"role": "assistant", "content": ""}))
+            for word in self.answer.split():
+                await send(self._chunk({"content": word + " "}))
+                await asyncio.sleep(self.token_latency)
+            await send(self._chunk({}, "stop"))
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    def start_in_thread(self) -> str:
+        """Serves the stub from its own event loop in a daemon thread, returns the base URL for OPENAI_BASE_URL"""
+        loop = asyncio.new_event_loop()
+        _, port = loop.run_until_complete(serve_app(self.app()))
+        threading.Thread(target=loop.run_forever, daemon=True).start()
+        return f"http://127.0.0.1:{port}/v1"
+
+
+async def serve_app(app, port: int = 0):
+    """Starts an aiohttp app on localhost, returns (runner, port)"""
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", port)
+    await site.start()
+    return runner, runner.addresses[0][1]
@@ -0,0 +1,113 @@
+"""Where the time goes in the 14/15 research loops, and what the profiler itself costs.
+
+GraphProfiler (common/profiler.py) is attached to the compiled graphs of
+14_business_research_Agent and 15_idea_research_agent, unchanged, running on a fake chat
+model and a fake Tavily client with latencies in the proportions of the real ones: a model
+call of 0.1s plus 2ms per written word (the drafts are long), a search of 0.15 to 0.3s,
+8 queries per research step. Prints the per-node summary of 3 reports each and writes
+the traces (Chrome trace JSON and collapsed stacks) to a temp folder.
+
+Then measures the profiler's overhead per node invocation on a graph of no-op nodes, the
+05_looping_graph random node looping 2000 times, with and without the state sizes.
+
+run:
+    python benchmarks/graph_profiler_benchmark.py
+"""
+import contextlib
+import io
+import operator
+import os
+import sys
+import tempfile
+import time
+from typing import Annotated, List, TypedDict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langgraph.graph import END, StateGraph
+
+from common.examples import load_example
+from common.profiler import GraphProfiler
+from common.quality_gate import QualityGate
+from common.search import ParallelSearch
+from fakes import FakeChatModel, FakeTavilyClient
+
+REPORTS = 3
+LOOP_STEPS = 2_000
+
+
+class ResearchModel(FakeChatModel):
+    """FakeChatModel that reviews the drafts 6, 7 then 9 and asks for 8 queries per research step"""
+    scores: list = []
+
+    def _reply(self, messages, tools=None, tool_choice=None, **kwargs):
+        name = tools[0]["function"]["name"] if tools and tool_choice else None
+        if name not in ("Review", "Queries"):
+            return super()._reply(messages, tools=tools, tool_choice=tool_choice, **kwargs)
+        self.calls += 1
+        if name == "Review":
+            args = {"score": self.scores.pop(0), "critique": "Needs more depth on competitors."}
+        else:
+            args = {"queries": [f"{messages[-1].content[:30]} market query {i} {self.calls}" for i in range(8)]}
+        prompt = sum(len(str(m.content)) for m in messages) // 4
+        message = AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": f"call_{self.calls}"}],
+                            usage_metadata={"input_tokens": prompt, "output_tokens": 40, "total_tokens": prompt + 40})
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def profile_reports(folder: str, trace_path: str) -> GraphProfiler:
+    agent_module = load_example(folder)
+    model = ResearchModel(latency=0.1, token_latency=0.002, reply_words=300)
+    search = ParallelSearch(FakeTavilyClient(latency=0.15, jitter=0.15), max_concurrency=8, timeout=5)
+    graph = agent_module.Agent(model=model, tools=[], gate=QualityGate(), search=search).graph
+    profiler = GraphProfiler(path=trace_path).attach(graph)  # the graph itself stays as it is
+    for report in range(REPORTS):
+        model.scores = [6, 7, 9]
+        with contextlib.redirect_stdout(io.StringIO()):  # the nodes print every plan, draft and critique
+            graph.invoke({"task": f"idea {report}: a subscription service for home plants", "plan": "",
+                          "draft": "", "critique": "", "content": [], "searched": [], "revision_number": 0,
+                          "max_revisions": 3, "scores": [], "best_draft": "", "best_score": 0})
+    profiler.detach()
+    return profiler
+
+
+class LoopState(TypedDict):
+    name: str
+    number: Annotated[List[int], operator.add]
+    counter: int
+
+
+def loop_graph(random_node):
+    builder = StateGraph(LoopState)
+    builder.add_node("random", random_node)
+    builder.set_entry_point("random")
+    builder.add_conditional_edges("random", lambda state: END if state["counter"] >= LOOP_STEPS else "random")
+    return builder.compile()
+
+
+def main():
+    traces = tempfile.mkdtemp()  # kept, to open the traces afterwards
+    for folder in ["14_business_research_Agent", "15_idea_research_agent"]:
+        print(f"{folder}, {REPORTS} reports")
+        print(profile_reports(folder, os.path.join(traces, folder)).report())
+        print()
+
+    looping = load_example("05_looping_graph")
+    print(f"overhead per node invocation, 05_looping_graph random node looping {LOOP_STEPS} times")
+    baseline = None
+    for label, profiler in [("no profiler", None), ("profiler", GraphProfiler()),
+                            ("profiler, no state sizes", GraphProfiler(measure_state=False))]:
+        graph = loop_graph(looping.random_node)
+        if profiler:
+            profiler.attach(graph)
+        start = time.perf_counter()
+        graph.invoke({"name": "Lakshya", "number": [], "counter": 0}, {"recursion_limit": LOOP_STEPS + 10})
+        per_node = (time.perf_counter() - start) / LOOP_STEPS
+        baseline = baseline or per_node
+        print(f"  {label:<26} {per_node * 1e6:>7.0f}us per node  (+{(per_node - baseline) * 1e6:.0f}us)")
+
+
+if __name__ == "__main__":
+    main()
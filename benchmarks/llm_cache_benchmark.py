@@ -0,0 +1,111 @@
+"""Full graph run against the real model vs replayed from the LLM response cache.
+
+Builds a graph shaped like 13_research_agent (planner, research, generate, reflect with
+revisions) on a fake chat model with a fixed latency, so no API key is needed. The first
+run records every response, the second replays it from the cache file, the third runs in
+strict replay mode with the model switched off to show the run is fully offline.
+
+run:
+    python benchmarks/llm_cache_benchmark.py
+"""
+import os
+import sys
+import tempfile
+import time
+from typing import List, TypedDict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import HumanMessage, SystemMessage
+from langgraph.graph import END, StateGraph
+from pydantic import BaseModel
+
+from common.llm_cache import CachedChatModel, LLMCache
+from fakes import FakeChatModel
+
+
+class Queries(BaseModel):
+    queries: List[str]
+
+
+class AgentState(TypedDict):
+    task: str
+    plan: str
+    draft: str
+    critique: str
+    content: List[str]
+    revision_number: int
+    max_revisions: int
+
+
+def build_graph(model):
+    def plan_node(state):
+        response = model.invoke([SystemMessage(content="Write an outline."), HumanMessage(content=state["task"])])
+        return {"plan": response.content}
+
+    def research_plan_node(state):
+        queries = model.with_structured_output(Queries).invoke(
+            [SystemMessage(content="Generate search queries."), HumanMessage(content=state["task"])])
+        return {"content": state["content"] + [f"result for {q}" for q in queries.queries]}
+
+    def generation_node(state):
+        content = "\n\n".join(state["content"])
+        response = model.invoke([SystemMessage(content=f"Write an essay.\n\n{content}"),
+                                 HumanMessage(content=f"{state['task']}\n\nHere is my plan:\n\n{state['plan']}")])
+        return {"draft": response.content, "revision_number": state["revision_number"] + 1}
+
+    def reflection_node(state):
+        response = model.invoke([SystemMessage(content="Critique the essay."), HumanMessage(content=state["draft"])])
+        return {"critique": response.content}
+
+    def research_critique_node(state):
+        queries = model.with_structured_output(Queries).invoke(
+            [SystemMessage(content="Generate search queries for the critique."), HumanMessage(content=state["critique"])])
+        return {"content": state["content"] + [f"result for {q}" for q in queries.queries]}
+
+    builder = StateGraph(AgentState)
+    builder.add_node("planner", plan_node)
+    builder.add_node("research_plan", research_plan_node)
+    builder.add_node("generate", generation_node)
+    builder.add_node("reflect", reflection_node)
+    builder.add_node("research_critique", research_critique_node)
+    builder.set_entry_point("planner")
+    builder.add_conditional_edges(
+        "generate",
+        lambda state: END if state["revision_number"] > state["max_revisions"] else "reflect",
+        {END: END, "reflect": "reflect"},
+    )
+    builder.add_edge("planner", "research_plan")
+    builder.add_edge("research_plan", "generate")
+    builder.add_edge("reflect", "research_critique")
+    builder.add_edge("research_critique", "generate")
+    return builder.compile()
+
+
+def run(model):
+    graph = build_graph(model)
+    start = time.perf_counter()
+    result = graph.invoke({"task": "use of Algae to replace plants for future oxygen demand", "plan": "",
+                           "draft": "", "critique": "", "content": [], "revision_number": 1, "max_revisions": 3})
+    return result, time.perf_counter() - start
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "llm_cache.sqlite")
+
+        fake = FakeChatModel(latency=0.2)
+        expected, seconds = run(fake)
+        print(f"no cache:    {fake.calls:>2} model calls, {seconds:.2f}s")
+
+        for mode in ["record", "auto", "replay"]:
+            fake = FakeChatModel(latency=0.2)
+            cache = LLMCache(path)  # a fresh process, same cache file
+            result, seconds = run(CachedChatModel(model=fake, store=cache, mode=mode))
+            assert result == expected
+            print(f"mode {mode:<6} {fake.calls:>2} model calls, {seconds:.2f}s")
+            print(cache.stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Load test for the checkpointer backed memory agent (07_memory_agent/agent.py).
+
+Hundreds of simulated users chat at the same time, each in its own thread_id, against a
+fake chat model with a fixed latency. Reports p50/p99 turn latency and checkpoint write
+throughput for the stock SqliteSaver settings (fsync'd commit per write), a commit per
+write with synchronous=NORMAL and batched commits. Checks at the end that no
+conversation saw another one's messages.
+
+run:
+    python benchmarks/memory_agent_load_benchmark.py
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "07_memory_agent"))
+
+from agent import build_agent, chat, open_checkpointer, session
+from context_window import ContextWindow
+from fakes import FakeChatModel
+
+SESSIONS = 300
+TURNS = 8
+WORKERS = 64
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def run_user(agent, user: int):
+    thread_id = f"user-{user}"
+    latencies = []
+    for turn in range(TURNS):
+        start = time.perf_counter()
+        chat(agent, thread_id, f"I am user {user}, this is my message number {turn} about sports cars.")
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def load_test(path, **saver_options):
+    llm = FakeChatModel(latency=0.02)
+    checkpointer = open_checkpointer(path, **saver_options)
+    agent = build_agent(llm, checkpointer, ContextWindow(llm, max_tokens=400, summarize_every=6))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        latencies = [t for user_latencies in pool.map(lambda u: run_user(agent, u), range(SESSIONS))
+                     for t in user_latencies]
+    checkpointer.flush()
+    seconds = time.perf_counter() - start
+
+    # Every conversation only contains its own user's messages
+    for user in range(0, SESSIONS, 17):
+        values = agent.get_state(session(f"user-{user}")).values
+        humans = [m.content for m in values["messages"] if m.type == "human"]
+        assert humans and all(f"I am user {user}," in h for h in humans)
+
+    checkpointer.conn.close()
+    return latencies, checkpointer, seconds
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, options in [("stock SqliteSaver", {"commit_every": 1, "synchronous": "FULL"}),
+                              ("commit per write", {"commit_every": 1}),
+                              ("batched commits ", {"commit_every": 64, "commit_interval": 0.05})]:
+            latencies, checkpointer, seconds = load_test(os.path.join(tmp, f"{name.strip()}.sqlite"), **options)
+            print(f"{name}: {SESSIONS} sessions x {TURNS} turns in {seconds:.2f}s, "
+                  f"turn p50 {percentile(latencies, 0.5) * 1000:.1f}ms, p99 {percentile(latencies, 0.99) * 1000:.1f}ms, "
+                  f"mean {statistics.mean(latencies) * 1000:.1f}ms | {checkpointer.writes} checkpoint writes, "
+                  f"{checkpointer.writes / seconds:.0f} writes/s, {checkpointer.commits} commits")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Research latency of one revision round: serial Tavily searches vs ParallelSearch.
+
+Uses a fake Tavily client with configurable latency, so no network or API key is needed.
+One revision in 14/15 can generate up to 20 queries.
+
+run:
+    python benchmarks/parallel_search_benchmark.py
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.search import ParallelSearch
+from fakes import FakeTavilyClient
+
+
+def research_serial(client, queries):
+    """What the research nodes used to do"""
+    content = []
+    for q in queries:
+        response = client.search(query=q, max_results=2)
+        for r in response['results']:
+            content.append(r['content'])
+    return content
+
+
+def research_parallel(search, queries):
+    content = []
+    for response in search.search_all(queries, max_results=2):
+        for r in (response or {}).get('results', []):
+            content.append(r['content'])
+    return content
+
+
+def main():
+    client = FakeTavilyClient(latency=0.2, jitter=0.6)
+    for n in [3, 10, 20]:
+        queries = [f"market trend query {i}" for i in range(n)]
+        slowest = max(client.delay_for(q) for q in queries)
+        total = sum(client.delay_for(q) for q in queries)
+
+        start = time.perf_counter()
+        expected = research_serial(client, queries)
+        serial_seconds = time.perf_counter() - start
+
+        for max_concurrency in [4, 8, 20]:
+            search = ParallelSearch(client, max_concurrency=max_concurrency, timeout=5, retries=2)
+            start = time.perf_counter()
+            content = research_parallel(search, queries)
+            parallel_seconds = time.perf_counter() - start
+            assert content == expected  # same snippets, same order
+            print(f"{n:>2} queries, {max_concurrency:>2} workers: serial {serial_seconds:.2f}s "
+                  f"(sum {total:.2f}s), parallel {parallel_seconds:.2f}s (slowest query {slowest:.2f}s)")
+
+    # Every 4th call fails once, the retries keep the result complete and in order
+    flaky = FakeTavilyClient(latency=0.2, jitter=0.6, fail_every=4)
+    queries = [f"market trend query {i}" for i in range(20)]
+    start = time.perf_counter()
+    content = research_parallel(ParallelSearch(flaky, max_concurrency=20, timeout=5, retries=2), queries)
+    print(f"flaky client: {len(content)} snippets in {time.perf_counter() - start:.2f}s after {flaky.calls} calls, "
+          f"same order as serial: {content == research_serial(FakeTavilyClient(0, 0), queries)}")
+
+
+if __name__ == "__main__":
+    main()
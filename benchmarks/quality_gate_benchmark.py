@@ -0,0 +1,102 @@
+"""LLM calls, searches and wall time per report with and without the early-exit quality gate.
+
+Runs the real 14_business_research_Agent graph on a fake chat model and a fake Tavily client.
+Each trace is the sequence of scores the reflector gave the drafts of one report. The fake
+model replays those scores through the structured Review and asks for 20 queries per
+research step, like gpt-4o does. Every trace runs with max_revisions=3 and the loop stopping
+only on max_revisions (the old behaviour), then with the quality gate at a threshold of 8
+and of 9. Reports the averages per report, and the score of the report that comes out.
+
+run:
+    python benchmarks/quality_gate_benchmark.py
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from common.examples import load_example
+from common.quality_gate import QualityGate
+from common.search import ParallelSearch
+from fakes import FakeChatModel, FakeTavilyClient
+
+MAX_REVISIONS = 3
+
+# Reflector scores of the drafts of one report, in revision order
+TRACES = [
+    [6, 8, 9], [7, 8, 8], [9, 9, 9], [5, 6, 8], [8, 9, 9], [6, 6, 7],
+    [7, 9, 8], [4, 6, 7], [8, 8, 9], [6, 7, 9], [7, 7, 8], [9, 8, 9],
+]
+
+
+class ReplayedReviewer(FakeChatModel):
+    """FakeChatModel that answers the Review with the next score of the trace and asks for 20 queries"""
+    scores: list = []
+
+    def _reply(self, messages, tools=None, tool_choice=None, **kwargs):
+        name = tools[0]["function"]["name"] if tools and tool_choice else None
+        if name not in ("Review", "Queries"):
+            return super()._reply(messages, tools=tools, tool_choice=tool_choice, **kwargs)
+        self.calls += 1
+        if name == "Review":
+            args = {"score": self.scores.pop(0), "critique": "Needs more depth on competitors."}
+        else:
+            # new gaps every research step, the query memory only skips what an earlier revision searched
+            args = {"queries": [f"{messages[-1].content[:30]} market query {i} round {self.calls}" for i in range(20)]}
+        message = AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": f"call_{self.calls}"}])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class MaxRevisionsOnly(QualityGate):
+    """The old should_continue: always runs max_revisions cycles"""
+
+    def stop_reason(self, scores, revision_number, max_revisions):
+        return f"max revisions ({max_revisions}) reached" if revision_number >= max_revisions else None
+
+
+def run_traces(agent_module, gate):
+    model = ReplayedReviewer(latency=0.05)
+    client = FakeTavilyClient(latency=0.05, jitter=0.05)
+    graph = agent_module.Agent(model=model, tools=[], gate=gate,
+                               search=ParallelSearch(client, max_concurrency=8, timeout=5)).graph
+    seconds, final_scores = 0.0, []
+    for i, trace in enumerate(TRACES):
+        model.scores = list(trace)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):  # the nodes print every plan, draft and critique
+            result = graph.invoke({"task": f"idea {i}: a subscription service for home plants", "plan": "", "draft": "",
+                                   "critique": "", "content": [], "revision_number": 0,
+                                   "max_revisions": MAX_REVISIONS, "scores": [], "best_draft": "", "best_score": 0})
+        seconds += time.perf_counter() - start
+        # the old loop returned the last draft, the gated one returns the best
+        final_scores.append(result["best_score"] if not isinstance(gate, MaxRevisionsOnly) else result["scores"][-1])
+    n = len(TRACES)
+    return model.calls / n, client.calls / n, seconds / n, sum(final_scores) / n
+
+
+def main():
+    agent_module = load_example("14_business_research_Agent")
+    print(f"{len(TRACES)} replayed reports, max_revisions={MAX_REVISIONS}, 20 queries per research step\n")
+    print(f"{'loop':<30} {'LLM calls':>10} {'searches':>9} {'seconds':>8} {'final score':>12}   (per report)")
+    baseline = None
+    for label, gate in [
+        ("max revisions only", MaxRevisionsOnly()),
+        ("quality gate, threshold 8", QualityGate(threshold=8)),
+        ("quality gate, threshold 9", QualityGate(threshold=9)),
+    ]:
+        llm_calls, searches, seconds, score = run_traces(agent_module, gate)
+        baseline = baseline or (llm_calls, searches, seconds)
+        print(f"{label:<30} {llm_calls:>10.1f} {searches:>9.1f} {seconds:>8.2f} {score:>12.2f}   "
+              f"({1 - llm_calls / baseline[0]:.0%} fewer LLM calls, {1 - searches / baseline[1]:.0%} fewer searches, "
+              f"{1 - seconds / baseline[2]:.0%} less time)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Hit rate and latency of the 10_RAG semantic query cache for different similarity thresholds.
+
+Replays a stream of near duplicate questions against a real Chroma collection. The fake
+embedder maps a question to a vector built from its words, so rephrasings that share most
+words land close together, like they would with a real embedding model.
+
+run:
+    python benchmarks/query_cache_benchmark.py
+"""
+import hashlib
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "10_RAG"))
+
+import numpy as np
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_chroma import Chroma
+from ingestion import ingest_pdf, collection_version
+from query_cache import SemanticQueryCache
+from fakes import SlowFakeEmbeddings
+
+pdf_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        "10_RAG", "Stock_Market_Performance_2024.pdf")
+
+questions = [
+    ["how did the s&p 500 perform in 2024", "how did the s&p 500 do in 2024", "s&p 500 performance in 2024"],
+    ["which sector performed best in 2024", "what was the best performing sector in 2024"],
+    ["what did the fed do with interest rates", "what did the fed do with rates in 2024"],
+    ["how did the nasdaq do last year", "how did the nasdaq perform last year"],
+    ["what were the biggest risks for the market", "what were the biggest market risks"],
+]
+
+
+class BagOfWordsEmbeddings(SlowFakeEmbeddings):
+    """Sum of one random vector per word, so similar wording gives similar vectors"""
+
+    def _word_vector(self, word):
+        rng = np.random.default_rng(int(hashlib.sha256(word.encode()).hexdigest()[:8], 16))
+        return rng.normal(size=self.size)
+
+    def embed_query(self, text):
+        self.calls += 1
+        time.sleep(self.latency)
+        vector = sum(self._word_vector(w) for w in text.lower().split())
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return [self.embed_query(t) for t in texts]
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="query_cache_bench_")
+    try:
+        embeddings = BagOfWordsEmbeddings(size=256, latency=0.0)
+        vectorstore = Chroma(embedding_function=embeddings, persist_directory=workdir,
+                             collection_name="stock_market")
+        ingest_pdf(pdf_path, vectorstore, RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200), workdir)
+
+        random.seed(0)
+        stream = [random.choice(random.choice(questions)) for _ in range(200)]
+
+        start = time.perf_counter()
+        for q in stream:
+            vectorstore.similarity_search(q, k=5)
+        print(f"no cache: {len(stream)} queries in {time.perf_counter() - start:.3f}s")
+
+        for threshold in [0.99, 0.9, 0.8, 0.7]:
+            cache = SemanticQueryCache(vectorstore, k=5, threshold=threshold,
+                                       version=lambda: collection_version(workdir))
+            start = time.perf_counter()
+            wrong = 0
+            for q in stream:
+                docs, result = cache.search(q)
+                group = next(g for g in questions if q in g)
+                if result.hit and result.matched_query not in group:
+                    wrong += 1  # served the chunks of a different question
+            seconds = time.perf_counter() - start
+            print(f"threshold {threshold}: {seconds:.3f}s, {wrong} hits for a different question")
+            print(f"    {cache.stats}")
+
+        # A restart re-ingests too: with nothing new the cache stays, once chunks change it is dropped
+        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+        ingest_pdf(pdf_path, vectorstore, text_splitter, workdir)
+        print(f"after re-ingest, nothing new: {cache.search(stream[0])[1]}, {cache.stats.invalidations} invalidation(s)")
+        vectorstore.delete(ids=vectorstore.get(limit=3, include=[])["ids"])
+        ingest_pdf(pdf_path, vectorstore, text_splitter, workdir)
+        print(f"after re-ingest, 3 chunks re-added: {cache.search(stream[0])[1]}, {cache.stats.invalidations} invalidation(s)")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
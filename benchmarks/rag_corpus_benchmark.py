@@ -0,0 +1,95 @@
+"""Multi-document ingestion for 10_RAG with 1, 2, 4 and N parse/split processes.
+
+Generates a corpus of PDFs and ingests the whole folder with ingest_corpus(). Reports the
+parse/split stage on its own (the part that is spread over the process pool) and the full
+ingest, where embedding and writes happen from a single writer, with the peak Python memory
+of the ingesting process (the chunks stream back from the workers, so it stays flat).
+Finally an embedder that fails after its first batch: the ingest has to raise, not hang on
+the parsing processes that are still waiting to hand over their chunks.
+
+run:
+    python benchmarks/rag_corpus_benchmark.py
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "10_RAG"))
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_chroma import Chroma
+from ingestion import ingest_corpus, split_pdf
+from fakes import SlowFakeEmbeddings, make_large_pdf
+
+
+class FailingEmbeddings(SlowFakeEmbeddings):
+    """Embeds one batch, then every call fails like an API outage"""
+
+    async def aembed_documents(self, texts):
+        if self.calls:
+            raise RuntimeError("embedding service unavailable")
+        return await super().aembed_documents(texts)
+
+
+def make_corpus(directory, files=48, copies=3):
+    os.makedirs(directory)
+    for i in range(files):
+        make_large_pdf(os.path.join(directory, f"report_{i:03}.pdf"), copies=copies)
+    return directory
+
+
+def parse_stage(corpus, processes, text_splitter):
+    pdf_paths = sorted(os.path.join(corpus, f) for f in os.listdir(corpus))
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        chunks = sum(len(c) for _, _, c in pool.map(split_pdf, pdf_paths, [text_splitter] * len(pdf_paths)))
+    return chunks, time.perf_counter() - start
+
+
+def full_ingest(corpus, processes, text_splitter, workdir):
+    persist_directory = tempfile.mkdtemp(dir=workdir)
+    embeddings = SlowFakeEmbeddings(size=256, latency=0.01, per_text_latency=0.0)
+    vectorstore = Chroma(embedding_function=embeddings, persist_directory=persist_directory,
+                         collection_name="stock_market")
+    tracemalloc.start()
+    stats = ingest_corpus(corpus, vectorstore, text_splitter, persist_directory, processes=processes)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return stats, peak
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="rag_corpus_bench_")
+    try:
+        corpus = make_corpus(os.path.join(workdir, "corpus"))
+        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+        process_counts = sorted({1, 2, 4, os.cpu_count() or 1})
+        baseline = None
+        for processes in process_counts:
+            chunks, parse_seconds = parse_stage(corpus, processes, text_splitter)
+            baseline = baseline or parse_seconds
+            stats, peak = full_ingest(corpus, processes, text_splitter, workdir)
+            print(f"processes={processes:>2}: parse/split {chunks} chunks in {parse_seconds:.2f}s "
+                  f"(speedup x{baseline / parse_seconds:.1f}), full ingest {stats.seconds:.2f}s "
+                  f"peak {peak / 2**20:.1f}MiB ({stats.files} files, {stats.pages} pages, {stats.embedded} embedded)")
+
+        persist_directory = tempfile.mkdtemp(dir=workdir)
+        vectorstore = Chroma(embedding_function=FailingEmbeddings(size=256, latency=0.01, per_text_latency=0.0),
+                             persist_directory=persist_directory, collection_name="stock_market")
+        start = time.perf_counter()
+        try:
+            ingest_corpus(corpus, vectorstore, text_splitter, persist_directory, processes=2)
+            outcome = "finished?!"
+        except Exception as e:
+            outcome = f"raised {e!r}"
+        print(f"embedder failing after its first batch: {outcome} after {time.perf_counter() - start:.2f}s")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Cold vs warm ingest time for the 10_RAG vector store.
+
+run:
+    python benchmarks/rag_ingest_benchmark.py
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "10_RAG"))
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_chroma import Chroma
+from ingestion import ingest_pdf
+from fakes import SlowFakeEmbeddings
+
+pdf_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        "10_RAG", "Stock_Market_Performance_2024.pdf")
+
+
+def run_ingest(persist_directory, embeddings):
+    vectorstore = Chroma(
+        embedding_function=embeddings,
+        persist_directory=persist_directory,
+        collection_name="stock_market",
+    )
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    start = time.perf_counter()
+    stats = ingest_pdf(pdf_path, vectorstore, text_splitter, persist_directory)
+    return time.perf_counter() - start, stats, vectorstore._collection.count()
+
+
+def main():
+    persist_directory = tempfile.mkdtemp(prefix="rag_ingest_bench_")
+    try:
+        for label in ["cold", "warm", "warm"]:
+            embeddings = SlowFakeEmbeddings(size=1536)
+            seconds, stats, count = run_ingest(persist_directory, embeddings)
+            print(f"{label:>5}: {seconds:.3f}s  embedding calls={embeddings.calls}  "
+                  f"texts embedded={embeddings.texts_embedded}  collection size={count}")
+            print(f"       {stats}")
+    finally:
+        shutil.rmtree(persist_directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Throughput and peak memory of the batched, concurrent 10_RAG ingestion pipeline.
+
+The fake embedder sleeps like a real API call and answers with 429s once the
+requests per second limit is exceeded, so the adaptive backoff gets exercised too.
+
+run:
+    python benchmarks/rag_pipeline_benchmark.py
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "10_RAG"))
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_chroma import Chroma
+from ingestion import ingest_pdf
+from fakes import SlowFakeEmbeddings, make_large_pdf
+
+
+def ingest(pdf_path, workdir, workers, requests_per_second):
+    persist_directory = tempfile.mkdtemp(dir=workdir)
+    embeddings = SlowFakeEmbeddings(size=1536, latency=0.2, requests_per_second=requests_per_second)
+    vectorstore = Chroma(embedding_function=embeddings, persist_directory=persist_directory,
+                         collection_name="stock_market")
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    stats = ingest_pdf(pdf_path, vectorstore, text_splitter, persist_directory,
+                       workers=workers, max_tokens=2_000)
+    return stats, embeddings
+
+
+def run(pdf_path, workdir, workers, requests_per_second):
+    start = time.perf_counter()
+    stats, embeddings = ingest(pdf_path, workdir, workers, requests_per_second)
+    seconds = time.perf_counter() - start
+
+    # tracemalloc slows everything down, so memory gets its own run
+    tracemalloc.start()
+    ingest(pdf_path, workdir, workers, requests_per_second)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return stats, seconds, peak, embeddings
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="rag_pipeline_bench_")
+    try:
+        pdf_path = make_large_pdf(os.path.join(workdir, "large.pdf"), copies=10)
+        for requests_per_second in [0, 10]:
+            label = f"{requests_per_second} req/s limit" if requests_per_second else "no rate limit"
+            print(f"--- {label} ---")
+            for workers in [1, 2, 4, 8]:
+                stats, seconds, peak, embeddings = run(pdf_path, workdir, workers, requests_per_second)
+                print(f"workers={workers}: {stats.embedded} chunks in {seconds:.2f}s "
+                      f"({stats.embedded / seconds:.1f} chunks/s), {stats.batches} batches, "
+                      f"{embeddings.rate_limited} rate limited, {stats.retries} retries, "
+                      f"peak memory {peak / 1024 / 1024:.1f} MiB")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Peak memory and time-to-first-chunk-indexed for streaming vs eager PDF ingestion in 10_RAG.
+
+Builds synthetic PDFs of growing size and ingests each one in a fresh process, so the
+peak RSS of one run does not leak into the next.
+  - eager:     pdf_loader.load() + split_documents() + add_documents() (the old way)
+  - streaming: ingest_pdf(), one page at a time straight into the embed-and-store stage
+
+run:
+    python benchmarks/rag_streaming_benchmark.py
+"""
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "10_RAG"))
+
+from fakes import SlowFakeEmbeddings, make_large_pdf
+
+
+def child(mode, pdf_path, persist_directory):
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    from langchain_chroma import Chroma
+    from langchain_community.document_loaders import PyPDFLoader
+    from ingestion import ingest_pdf
+
+    embeddings = SlowFakeEmbeddings(size=256, latency=0.01, per_text_latency=0.0)
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    if mode == "eager":
+        pages = PyPDFLoader(pdf_path).load()
+        pages_split = text_splitter.split_documents(pages)
+        # Nothing is searchable until from_documents has embedded and stored everything
+        Chroma.from_documents(documents=pages_split, embedding=embeddings,
+                              persist_directory=persist_directory, collection_name="stock_market")
+        first_indexed = time.perf_counter() - start
+        chunks = len(pages_split)
+    else:
+        vectorstore = Chroma(embedding_function=embeddings, persist_directory=persist_directory,
+                             collection_name="stock_market")
+        stats = ingest_pdf(pdf_path, vectorstore, text_splitter, persist_directory)
+        first_indexed = stats.first_indexed_seconds
+        chunks = stats.embedded
+    seconds = time.perf_counter() - start
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"chunks": chunks, "seconds": seconds, "first_indexed": first_indexed,
+                      "rss_growth_kib": peak_rss - baseline_rss}))
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="rag_streaming_bench_")
+    try:
+        for copies in [20, 80, 320]:
+            pdf_path = make_large_pdf(os.path.join(workdir, f"large_{copies}.pdf"), copies=copies)
+            for mode in ["eager", "streaming"]:
+                persist_directory = tempfile.mkdtemp(dir=workdir)
+                output = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--child", mode, pdf_path, persist_directory],
+                    capture_output=True, text=True, check=True,
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                print(f"{copies * 9:>5} pages {mode:>9}: {result['chunks']} chunks in {result['seconds']:.2f}s, "
+                      f"first chunk indexed after {result['first_indexed']:.2f}s, "
+                      f"peak RSS growth {result['rss_growth_kib'] / 1024:.1f} MiB")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(*sys.argv[2:5])
+    else:
+        main()
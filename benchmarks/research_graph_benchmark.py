@@ -0,0 +1,85 @@
+"""End-to-end latency of a 2-revision essay in 13_research_agent: sequential graph vs fan-out/fan-in.
+
+The sequential graph is the old wiring (planner -> research_plan -> generate -> reflect ->
+research_critique -> generate), with every research step running its searches through
+ParallelSearch inside the node. The parallel graph is the one 13_research_agent builds now:
+planner and research_plan start together, every query gets its own search branch (Send) and
+generate waits for the plan and all branches. Both run the same node functions on a fake
+chat model and a fake Tavily client with fixed latencies, and must produce the same essay
+from the same research content.
+
+run:
+    python benchmarks/research_graph_benchmark.py
+"""
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langgraph.graph import END, StateGraph
+
+from common.examples import load_example
+from common.search import ParallelSearch
+from fakes import FakeChatModel, FakeTavilyClient
+
+RUNS = 3
+
+
+def sequential_graph(agent):
+    """13_research_agent before the fan-out, built from the same nodes"""
+    def research(node):
+        def run(state):
+            queries = node(state)["queries"]
+            return {"content": agent.content_store.from_search(agent.build_search().search_all(queries, max_results=2))}
+        return run
+
+    builder = StateGraph(agent.AgentState)
+    builder.add_node("planner", agent.plan_node)
+    builder.add_node("generate", agent.generation_node)
+    builder.add_node("reflect", agent.reflection_node)
+    builder.add_node("research_plan", research(agent.research_plan_node))
+    builder.add_node("research_critique", research(agent.research_critique_node))
+    builder.set_entry_point("planner")
+    builder.add_conditional_edges("generate", agent.should_continue, {END: END, "reflect": "reflect"})
+    builder.add_edge("planner", "research_plan")
+    builder.add_edge("research_plan", "generate")
+    builder.add_edge("reflect", "research_critique")
+    builder.add_edge("research_critique", "generate")
+    return builder.compile()
+
+
+def measure(graph):
+    seconds, result = [], None
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):  # the nodes print every plan, draft and critique
+            result = graph.invoke({"task": "use of Algae to replace plants for future oxygen demand",
+                                   "max_revisions": 2, "revision_number": 1})
+        seconds.append(time.perf_counter() - start)
+    return statistics.median(seconds), result
+
+
+def main():
+    agent = load_example("13_research_agent")
+    for llm_latency, search_latency in [(0.3, 0.4), (0.8, 0.4), (0.3, 1.0)]:
+        model = FakeChatModel(latency=llm_latency)
+        search = ParallelSearch(FakeTavilyClient(latency=search_latency, jitter=0.2), max_concurrency=8, timeout=10)
+        # the nodes get their model and search client from these factories
+        agent.build_model = lambda: model
+        agent.build_search = lambda: search
+
+        sequential_seconds, sequential = measure(sequential_graph(agent))
+        model.calls = 0
+        parallel_seconds, parallel = measure(agent.build_graph())
+        assert parallel["draft"] == sequential["draft"] and parallel["content"] == sequential["content"]
+        print(f"LLM {llm_latency:.1f}s, search {search_latency:.1f}-{search_latency + 0.2:.1f}s: "
+              f"sequential {sequential_seconds:.2f}s, fan-out/fan-in {parallel_seconds:.2f}s "
+              f"({1 - parallel_seconds / sequential_seconds:.0%} faster, {model.calls // RUNS} LLM calls per essay)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Searches per revision of the 14/15 research loop with and without the query memory.
+
+Runs the real 14_business_research_Agent graph on a fake chat model and a fake Tavily client
+(behind the usual search cache). The fake model replays query lists like the ones gpt-4o
+writes: 20 queries for the first research step, then revisions where most queries reword an
+earlier one (word order, plurals, filler words, an extra word) and a few cover new gaps from
+the critique. The reflector gives every draft the same score and the quality gate is set
+to keep revising, so every report runs all 3 revisions. Compares queries searched per revision, Tavily requests, search cache hits and
+wall time against searching every query again.
+
+run:
+    python benchmarks/research_memory_benchmark.py
+"""
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from common.examples import load_example
+from common.quality_gate import QualityGate
+from common.query_memory import QueryMemory
+from common.search import ParallelSearch
+from common.search_cache import CachedTavilyClient
+from fakes import FakeChatModel, FakeTavilyClient
+
+REPORTS = 5
+MAX_REVISIONS = 3
+NEW_PER_REVISION = [20, 6, 4]  # queries about gaps nobody searched yet, per revision
+
+TOPICS = [
+    "plant subscription market size", "indoor plant delivery competitors", "plant care app pricing",
+    "houseplant buyer demographics", "plant subscription churn rate", "online plant retailer margins",
+    "plant shipping damage rates", "urban gardening trends", "plant subscription box startups",
+    "succulent delivery business model", "plant nursery wholesale prices", "plant subscription customer reviews",
+    "eco friendly packaging for plants", "plant care subscription retention", "bloomscape business model",
+    "the sill funding rounds", "plant influencer marketing costs", "corporate office plant services",
+    "plant rental market growth", "pet safe houseplant demand", "plant delivery last mile costs",
+    "smart planter sensor market", "plant subscription gifting season", "indoor plant failure reasons",
+    "vertical farming consumer products", "plant subscription unit economics", "houseplant search trends",
+    "plant marketplace regulations", "plant delivery startups that shut down", "plant care chatbot adoption",
+    "millennial spending on houseplants", "plant subscription referral programs",
+]
+
+
+def reword(query: str, rng: random.Random) -> str:
+    words = query.split()
+    kind = rng.randrange(4)
+    if kind == 0:
+        return " ".join(reversed(words))
+    if kind == 1:
+        return f"latest {query} data"
+    if kind == 2:
+        return f"what is the {words[-1]}s of {' '.join(words[:-1])}"
+    return query.title() + "?"
+
+
+def query_steps(report: int):
+    """The query lists the model writes for the research steps of one report"""
+    rng = random.Random(report)
+    topics = rng.sample(TOPICS, sum(NEW_PER_REVISION))
+    steps, seen = [], []
+    for new in NEW_PER_REVISION:
+        fresh, topics = topics[:new], topics[new:]
+        repeats = [reword(q, rng) for q in rng.sample(seen, min(len(seen), 20 - new))]
+        steps.append(fresh + repeats)
+        seen += fresh
+    return steps
+
+
+class ReplayedResearcher(FakeChatModel):
+    """FakeChatModel that replays the query lists of a report, the reflector always gives a 5"""
+    steps: list = []
+
+    def _reply(self, messages, tools=None, tool_choice=None, **kwargs):
+        name = tools[0]["function"]["name"] if tools and tool_choice else None
+        if name not in ("Review", "Queries"):
+            return super()._reply(messages, tools=tools, tool_choice=tool_choice, **kwargs)
+        self.calls += 1
+        if name == "Review":
+            args = {"score": 5, "critique": "Needs more depth on competitors."}
+        else:
+            args = {"queries": self.steps.pop(0)}
+        message = AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": f"call_{self.calls}"}])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class RemembersNothing(QueryMemory):
+    """The old research node: searches every query the model writes"""
+
+    def new_queries(self, queries, searched):
+        self.stats.executed += len(queries)
+        self.stats.steps.append((len(queries), len(queries)))
+        return list(queries), []
+
+
+def run_reports(agent_module, memory, cache_path):
+    model = ReplayedResearcher(latency=0.02)
+    tavily = FakeTavilyClient(latency=0.1, jitter=0.1)
+    client = CachedTavilyClient(tavily, path=cache_path)
+    graph = agent_module.Agent(model=model, tools=[], memory=memory,
+                               gate=QualityGate(min_improvement=0),  # a flat score keeps revising
+                               search=ParallelSearch(client, max_concurrency=8, timeout=5)).graph
+    start = time.perf_counter()
+    for report in range(REPORTS):
+        model.steps = query_steps(report)
+        with contextlib.redirect_stdout(io.StringIO()):  # the nodes print every plan, draft and critique
+            graph.invoke({"task": f"idea {report}: a subscription service for home plants", "plan": "",
+                          "draft": "", "critique": "", "content": [], "searched": [], "revision_number": 0,
+                          "max_revisions": MAX_REVISIONS, "scores": [], "best_draft": "", "best_score": 0})
+    seconds = time.perf_counter() - start
+    return tavily.calls, client.stats, seconds
+
+
+def main():
+    agent_module = load_example("14_business_research_Agent")
+    print(f"{REPORTS} reports, {MAX_REVISIONS} revisions each, 20 queries per research step\n")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, memory in [("search every query", RemembersNothing()), ("query memory", QueryMemory())]:
+            requests, cache_stats, seconds = run_reports(agent_module, memory, os.path.join(tmp, f"{label}.sqlite"))
+            per_revision = [[0, 0] for _ in range(MAX_REVISIONS)]
+            for i, (asked, executed) in enumerate(memory.stats.steps):
+                per_revision[i % MAX_REVISIONS][0] += asked
+                per_revision[i % MAX_REVISIONS][1] += executed
+            print(f"{label}: {seconds:.2f}s, {requests} Tavily requests, {cache_stats.hits} search cache hits")
+            for revision, (asked, executed) in enumerate(per_revision, start=1):
+                print(f"  revision {revision}: {asked / REPORTS:5.1f} queries asked, {executed / REPORTS:5.1f} searched, "
+                      f"{(asked - executed) / REPORTS:5.1f} skipped")
+            print()
+
+
+if __name__ == "__main__":
+    main()
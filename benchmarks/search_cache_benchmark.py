@@ -0,0 +1,74 @@
+"""Tavily calls and research latency with and without the persistent search cache.
+
+Replays the searches of a few research runs (same task, with revision queries that
+repeat earlier ones) against a fake Tavily client. The first run fills the cache, the
+next runs share the cache file like separate `python main.py` runs would. Also fires
+identical queries concurrently through ParallelSearch to show they are coalesced.
+
+run:
+    python benchmarks/search_cache_benchmark.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.search import ParallelSearch
+from common.search_cache import CachedTavilyClient
+from fakes import FakeTavilyClient
+
+# What one run of 14/15 searches for: the plan queries, then critique queries that overlap
+RUN_QUERIES = [
+    ["algae oxygen production", "algae photobioreactor cost", "algae vs trees oxygen"],
+    ["Algae oxygen production", "algae photobioreactor  cost", "algae farming scale"],
+    ["algae oxygen production", "algae farming scale", "algae carbon capture"],
+]
+
+
+def research_run(client, max_concurrency=8):
+    search = ParallelSearch(client, max_concurrency=max_concurrency, timeout=5, retries=2)
+    snippets = 0
+    for queries in RUN_QUERIES:
+        for response in search.search_all(queries, max_results=2):
+            snippets += len((response or {}).get("results", []))
+    return snippets
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tavily_cache.sqlite")
+
+        plain = FakeTavilyClient(latency=0.2, jitter=0.3)
+        start = time.perf_counter()
+        expected = research_run(plain)
+        print(f"no cache:  {plain.calls:>2} Tavily calls, {time.perf_counter() - start:.2f}s")
+
+        for run in range(1, 4):
+            fake = FakeTavilyClient(latency=0.2, jitter=0.3)
+            client = CachedTavilyClient(fake, path=path)  # a fresh process, same cache file
+            start = time.perf_counter()
+            snippets = research_run(client)
+            assert snippets == expected
+            print(f"run {run}:     {fake.calls:>2} Tavily calls, {time.perf_counter() - start:.2f}s, {client.stats}")
+
+        # 20 identical searches at the same time only reach Tavily once
+        fake = FakeTavilyClient(latency=0.3, jitter=0)
+        client = CachedTavilyClient(fake, path=os.path.join(tmp, "coalesce.sqlite"))
+        search = ParallelSearch(client, max_concurrency=20, timeout=5, retries=0)
+        start = time.perf_counter()
+        responses = search.search_all(["nvidia blackwell gpu"] * 20, max_results=2)
+        assert all(r == responses[0] for r in responses)
+        print(f"20 concurrent identical searches: {fake.calls} Tavily call, "
+              f"{time.perf_counter() - start:.2f}s, {client.stats}")
+
+        # Expired entries are fetched again
+        fake = FakeTavilyClient(latency=0, jitter=0)
+        client = CachedTavilyClient(fake, path=path, ttl=0)
+        research_run(client)
+        print(f"ttl=0: {fake.calls} Tavily calls, {client.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Startup time and per-turn write cost of the 07 memory agent's conversation log.
+
+Old: logging.txt is parsed line by line at startup and rewritten completely on exit.
+New: SessionLog appends (and fsyncs) each message, startup reads only the tail window.
+Both are measured for conversations of growing length, no API calls involved.
+
+run:
+    python benchmarks/session_log_benchmark.py
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "07_memory_agent"))
+
+from langchain_core.messages import AIMessage, HumanMessage
+from session_log import OFFSET, SessionLog
+
+WINDOW = 40
+
+
+def conversation(turns):
+    for i in range(turns):
+        yield HumanMessage(content=f"question number {i}, tell me something about driving")
+        yield AIMessage(content=f"Answer {i}:\nSports cars are fun.\n\n- line two of a multi-line reply")
+
+
+def legacy_save(path, history):
+    """What the finally block used to do after every session"""
+    with open(path, "w") as file:
+        file.write("Your Conversation Log:\n")
+        for message in history:
+            if isinstance(message, HumanMessage):
+                file.write(f"You: {message.content}\n")
+            else:
+                file.write(f"AI: {message.content}\n\n")
+        file.write("End of Conversation")
+
+
+def legacy_load(path):
+    history = []
+    with open(path, "r") as file:
+        for line in file.readlines():
+            if line.startswith("You:"):
+                history.append(HumanMessage(content=line[4:].strip()))
+            elif line.startswith("AI:"):
+                history.append(AIMessage(content=line[3:].strip()))
+    return history
+
+
+def build_log(path, messages):
+    """Writes the log in the same format as SessionLog.append, minus the fsync per message"""
+    with open(path, "wb") as log, open(os.path.splitext(path)[0] + ".idx", "wb") as index:
+        for message in messages:
+            index.write(OFFSET.pack(log.tell()))
+            log.write((json.dumps({"role": message.type, "content": message.content}, ensure_ascii=False) + "\n").encode("utf-8"))
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        for turns in [100, 1_000, 10_000, 50_000]:
+            history = list(conversation(turns))
+
+            legacy_path = os.path.join(tmp, f"logging_{turns}.txt")
+            start = time.perf_counter()
+            legacy_save(legacy_path, history)  # one more turn means writing everything again
+            legacy_write = time.perf_counter() - start
+            start = time.perf_counter()
+            loaded = legacy_load(legacy_path)
+            legacy_startup = time.perf_counter() - start
+            multi_line_ok = loaded[1].content == history[1].content
+
+            path = os.path.join(tmp, f"session_{turns}.jsonl")
+            build_log(path, history[:-20])
+
+            start = time.perf_counter()
+            log = SessionLog(path)
+            tail = log.tail(WINDOW)
+            startup = time.perf_counter() - start
+            start = time.perf_counter()
+            for message in history[-20:]:  # the last 10 turns, fsync'd one by one
+                log.append(message)
+            append = (time.perf_counter() - start) / 20
+            assert log.tail(WINDOW) == history[-WINDOW:]
+            log.close()
+
+            print(f"{turns:>6} turns: old startup {legacy_startup * 1000:8.2f}ms, save {legacy_write * 1000:8.2f}ms "
+                  f"(multi-line replies kept: {multi_line_ok}) | new startup {startup * 1000:6.2f}ms "
+                  f"({len(tail)} messages), append {append * 1000:6.2f}ms per message")
+
+
+if __name__ == "__main__":
+    main()
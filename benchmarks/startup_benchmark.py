@@ -0,0 +1,116 @@
+"""Startup cost of the examples: import time, build_graph() and time to first invoke.
+
+Every example runs in a fresh interpreter (python -X importtime), from the repo root like
+the examples expect. For each one we report how long importing its main.py takes, the
+packages that import spent most of its time in, how long build_graph() takes and, for the
+examples that run offline, the time from the first line of the process to the end of the
+first invoke. 06 and 08 call ChatOpenAI against a local stub of the OpenAI API, so their
+first invoke includes the deferred langchain_openai import. Finally all examples are
+imported into one process, the way 16_agent_server or a test would.
+
+run:
+    python benchmarks/startup_benchmark.py
+"""
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from common.examples import example_folders
+from fakes import StubOpenAI
+
+# Inputs for a first invoke that needs no network besides the stub OpenAI server
+FIRST_INPUTS = {
+    "01_hello_world": {"message": "Bob"},
+    "02_multiple_input_graph": {"values": [1, 2, 3, 4], "name": "Steve"},
+    "03_sequential_graph": {"name": "Charlie", "age": 20},
+    "04_conditional_graph": {"number1": 10, "operation": "-", "number2": 5},
+    "05_looping_graph": {"name": "Lakshya", "number": [], "counter": -100},
+    "06_simple_bot": {"messages": [["user", "Tell me about sports cars"]]},
+    "08_react_agent": {"messages": [["user", "Add 40 + 12"]]},
+}
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+from common.examples import load_example
+module = load_example({folder!r})
+result = {{"import": time.perf_counter() - start}}
+if hasattr(module, "build_graph"):
+    graph = module.build_graph()
+    result["build"] = time.perf_counter() - start
+    if {inputs!r} is not None:
+        graph.invoke(json.loads({inputs!r}))
+        result["first_invoke"] = time.perf_counter() - start
+print("RESULT " + json.dumps(result))
+"""
+
+ALL = """
+import sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+from common.examples import example_folders, load_example
+for folder in example_folders():
+    load_example(folder)
+print("RESULT %f" % (time.perf_counter() - start))
+"""
+
+
+def heaviest_imports(stderr: str, top: int = 3):
+    """Sums the self time of every `-X importtime` line per top level package"""
+    per_package = defaultdict(int)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        if self_us.strip().isdigit():
+            per_package[name.strip().split(".")[0]] += int(self_us)
+    return sorted(per_package.items(), key=lambda item: -item[1])[:top]
+
+
+def run_child(code: str, env):
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, env=env,
+                          capture_output=True, text=True, timeout=300)
+    results = [line[len("RESULT "):] for line in proc.stdout.splitlines() if line.startswith("RESULT ")]
+    if not results:
+        error = (proc.stderr.strip().splitlines() or ["no output"])[-1]
+        return None, error
+    return results[0], proc.stderr
+
+
+def main():
+    env = dict(os.environ, OPENAI_API_KEY="stub", TAVILY_API_KEY="stub", LLM_CACHE_MODE="off",
+               OPENAI_BASE_URL=StubOpenAI(first_token_latency=0.05, token_latency=0.0).start_in_thread(),
+               PYTHONWARNINGS="ignore")
+
+    print(f"{'example':<28} {'import':>8} {'build':>8} {'1st invoke':>11}   heaviest imports (self time)")
+    for folder in example_folders():
+        inputs = json.dumps(FIRST_INPUTS[folder]) if folder in FIRST_INPUTS else None
+        result, stderr = run_child(CHILD.format(root=ROOT, folder=folder, inputs=inputs), env)
+        if result is None:
+            print(f"{folder:<28} failed: {stderr}")
+            continue
+        times = json.loads(result)
+
+        def ms(key):
+            return f"{times[key] * 1000:6.0f}ms" if key in times else f"{'-':>8}"
+
+        heavy = ", ".join(f"{name} {us / 1000:.0f}ms" for name, us in heaviest_imports(stderr))
+        print(f"{folder:<28} {ms('import')} {ms('build')} {ms('first_invoke'):>11}   {heavy}")
+
+    result, stderr = run_child(ALL.format(root=ROOT), env)
+    if result is None:
+        print(f"importing every example failed: {stderr}")
+    else:
+        print(f"\nall {len(example_folders())} examples imported into one process in {float(result) * 1000:.0f}ms "
+              f"(heaviest: {', '.join(f'{n} {us / 1000:.0f}ms' for n, us in heaviest_imports(stderr))})")
+    print("(times measured under -X importtime, which adds some overhead of its own)")
+
+
+if __name__ == "__main__":
+    main()
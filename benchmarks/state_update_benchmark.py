@@ -0,0 +1,168 @@
+"""Per-step cost of returning the whole history vs only the new messages through the reducer.
+
+09_drafter_agent's agent node used to return list(state["messages"]) + [user_message, response]
+into an add_messages channel, so every turn re-merged (id lookups, message conversion) the
+whole history. Now it returns the two new messages, into an append_messages channel
+(common/reducers.py) that does not re-convert the history when the update only appends, and
+finds replaced ids through an index instead of scanning it; what is left is one copy of the
+list of references.
+add_messages itself still walks the whole history on every merge, and LangGraph merges once
+more for every conditional edge that reads the state. Measures:
+
+  1. one merge at a given history length: time and allocated memory (tracemalloc)
+  2. a whole drafting session through a StateGraph shaped like the drafter, no model latency
+  3. the 05_looping_graph random node, mutating and returning the whole state vs a delta
+
+Before that it checks that append_messages gives the same histories as add_messages on random
+updates: appends, replacements, removals, an update applied twice (like a conditional edge
+does) and forks, where two updates extend the same history with different messages.
+
+run:
+    python benchmarks/state_update_benchmark.py
+"""
+import os
+import random
+import sys
+import time
+import tracemalloc
+from typing import Annotated, List, Sequence, TypedDict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, RemoveMessage
+from langgraph.graph import END, StateGraph
+from langgraph.graph.message import add_messages
+
+from common.examples import load_example
+from common.reducers import append_messages
+
+
+def history(n: int) -> List[BaseMessage]:
+    messages = []
+    for i in range(n // 2):
+        messages += [HumanMessage(content=f"make paragraph {i} shorter"), AIMessage(content=f"Done, paragraph {i} " * 20)]
+    return add_messages([], messages)  # ids assigned, like the messages in a real state
+
+
+def same_as_add_messages(cases: int = 300, seed: int = 0) -> int:
+    """Random update sequences through both reducers, returns the number of updates compared"""
+    rng = random.Random(seed)
+    compared = 0
+    for _ in range(cases):
+        histories = [([], [])]  # (append_messages history, add_messages history), forks stay in the list
+        for step in range(12):
+            mine, theirs = rng.choice(histories)  # an older history too, so the same parent gets forked
+            ids = [m.id for m in theirs]
+            kind = rng.random()
+            if ids and kind < 0.2:
+                update = [HumanMessage(content=f"edited {step}", id=rng.choice(ids))]
+            elif ids and kind < 0.3:
+                update = [RemoveMessage(id=rng.choice(ids))]
+            else:  # new messages, some with an id that another fork already used
+                used = [m.id for _, h in histories for m in h]
+                update = [AIMessage(content=f"m{step}.{i}", id=rng.choice(used + [f"id{step}.{i}"] * 3))
+                          for i in range(rng.randint(1, 2))]
+            if rng.random() < 0.3:  # applied once more, the way a conditional edge reads the state
+                append_messages(mine, [m.model_copy() for m in update])
+            merged = append_messages(mine, [m.model_copy() for m in update]), add_messages(theirs, update)
+            assert [(m.id, m.content) for m in merged[0]] == [(m.id, m.content) for m in merged[1]], \
+                "append_messages differs from add_messages"
+            histories.append(merged)
+            compared += 1
+    return compared
+
+
+def merge_cost(reducer, existing, update, repeat: int = 20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        reducer(existing, update)
+    seconds = (time.perf_counter() - start) / repeat
+    tracemalloc.start()
+    reducer(existing, update)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+
+class DrafterState(TypedDict):
+    messages: Annotated[Sequence[BaseMessage], add_messages]
+
+
+class AppendDrafterState(TypedDict):
+    messages: Annotated[Sequence[BaseMessage], append_messages]
+
+
+def drafter_graph(state_type, delta: bool, turns: int):
+    def agent(state):
+        turn = len(state["messages"]) // 2
+        new = [HumanMessage(content=f"make paragraph {turn} shorter"), AIMessage(content=f"Done, paragraph {turn} " * 20)]
+        return {"messages": new if delta else list(state["messages"]) + new}
+
+    builder = StateGraph(state_type)
+    builder.add_node("agent", agent)
+    builder.set_entry_point("agent")
+    builder.add_conditional_edges("agent", lambda state: END if len(state["messages"]) >= 2 * turns else "agent")
+    return builder.compile()
+
+
+class LoopState(TypedDict):
+    name: str
+    number: List[int]
+    counter: int
+
+
+def old_random_node(state: LoopState) -> LoopState:
+    """05_looping_graph before: mutates the state and returns all of it"""
+    state["number"].append(random.randint(0, 10))
+    state["counter"] += 1
+    return state
+
+
+def loop_graph(state_type, random_node, steps: int):
+    builder = StateGraph(state_type)
+    builder.add_node("random", random_node)
+    builder.set_entry_point("random")
+    builder.add_conditional_edges("random", lambda state: END if state["counter"] >= steps else "random")
+    return builder.compile()
+
+
+def main():
+    print(f"0. append_messages == add_messages on {same_as_add_messages()} random updates, forks included\n")
+    modes = ["whole history", "delta, add_messages", "delta, append_messages"]
+    print("1. one merge of the drafter's agent node update")
+    print(f"{'history':>8} " + " ".join(f"{mode:>24}" for mode in modes))
+    for n in [100, 1_000, 5_000, 20_000]:
+        existing = history(n)
+        new = [HumanMessage(content="one more"), AIMessage(content="ok")]
+        indexed = append_messages([], existing)  # in a real state the history came out of the reducer
+        costs = [merge_cost(add_messages, existing, list(existing) + new), merge_cost(add_messages, existing, new),
+                 merge_cost(append_messages, indexed, new)]
+        print(f"{n:>8} " + " ".join(f"{seconds * 1000:>12.3f}ms {peak / 1024:>7.0f}KiB" for seconds, peak in costs))
+
+    print("\n2. a drafting session through the graph, per turn (no model latency, only the state updates)")
+    print(f"{'turns':>8} " + " ".join(f"{mode:>24}" for mode in modes))
+    for turns in [100, 250, 500, 1_000, 2_000]:
+        times = []
+        for state_type, delta in [(DrafterState, False), (DrafterState, True), (AppendDrafterState, True)]:
+            graph = drafter_graph(state_type, delta, turns)
+            start = time.perf_counter()
+            graph.invoke({"messages": []}, {"recursion_limit": turns + 10})
+            times.append(time.perf_counter() - start)
+        print(f"{turns:>8} " + " ".join(f"{t / turns * 1000:>22.2f}ms" for t in times))
+
+    print("\n3. 05_looping_graph random node")
+    looping = load_example("05_looping_graph")
+    print(f"{'loops':>8} {'whole state':>13} {'delta':>10}")
+    for steps in [5, 100, 1_000]:
+        times = []
+        for state_type, node in [(LoopState, old_random_node), (looping.AgentState, looping.random_node)]:
+            graph = loop_graph(state_type, node, steps)
+            start = time.perf_counter()
+            result = graph.invoke({"name": "Lakshya", "number": [], "counter": 0}, {"recursion_limit": steps + 10})
+            times.append(time.perf_counter() - start)
+            assert len(result["number"]) == steps
+        print(f"{steps:>8} {times[0] * 1000:>11.1f}ms {times[1] * 1000:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
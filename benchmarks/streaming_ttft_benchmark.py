@@ -0,0 +1,89 @@
+"""Time to first token vs total latency for the chat loops, blocking invoke vs streaming.
+
+With invoke the user sees nothing until the whole answer is done, so the time to first
+visible token is the total latency. Streaming the graph with stream_mode="messages" shows
+the first token after the model's first token latency. Runs a graph shaped like
+06_simple_bot on a fake streaming chat model (first token after 0.4s, then 20ms per word),
+directly and behind the LLM cache.
+
+run:
+    python benchmarks/streaming_ttft_benchmark.py
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import List, TypedDict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import BaseMessage, HumanMessage
+from langgraph.graph import END, START, StateGraph
+
+from common.llm_cache import CachedChatModel, LLMCache
+from common.streaming import astream_answer, stream_answer
+from fakes import FakeChatModel
+
+QUESTIONS = [f"Tell me about sports car number {i}" for i in range(5)]
+
+
+class AgentState(TypedDict):
+    messages: List[BaseMessage]
+
+
+def build_agent(llm):
+    def process(state):
+        llm.invoke(state["messages"])
+        return state
+
+    graph = StateGraph(AgentState)
+    graph.add_node("process", process)
+    graph.add_edge(START, "process")
+    graph.add_edge("process", END)
+    return graph.compile()
+
+
+def blocking(agent, question):
+    start = time.perf_counter()
+    agent.invoke({"messages": [HumanMessage(content=question)]})
+    total = time.perf_counter() - start
+    return total, total  # nothing is shown before the end
+
+
+def streaming(agent, question):
+    _, stats = stream_answer(agent, {"messages": [HumanMessage(content=question)]}, nodes=["process"],
+                             on_token=lambda token: None)
+    return stats.first_token_seconds, stats.total_seconds
+
+
+def astreaming(agent, question):
+    _, stats = asyncio.run(astream_answer(agent, {"messages": [HumanMessage(content=question)]}, nodes=["process"],
+                                          on_token=lambda token: None))
+    return stats.first_token_seconds, stats.total_seconds
+
+
+def report(name, agent, run):
+    results = [run(agent, q) for q in QUESTIONS]
+    ttft = statistics.median(r[0] for r in results)
+    total = statistics.median(r[1] for r in results)
+    print(f"{name:<28} time to first token {ttft * 1000:7.1f}ms, total {total * 1000:7.1f}ms")
+
+
+def main():
+    llm = FakeChatModel(latency=0.4, token_latency=0.02, reply_words=80, temperature=0.7)
+    agent = build_agent(llm)
+    report("invoke", agent, blocking)
+    report("stream (messages)", agent, streaming)
+    report("astream (messages)", agent, astreaming)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cached = build_agent(CachedChatModel(model=llm, store=LLMCache(os.path.join(tmp, "llm_cache.sqlite")),
+                                             mode="auto"))
+        report("astream, cache miss", cached, astreaming)
+        report("astream, cache hit", cached, astreaming)
+
+
+if __name__ == "__main__":
+    main()
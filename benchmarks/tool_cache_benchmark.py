@@ -0,0 +1,125 @@
+"""Tool executions skipped by the tool result cache on typical agent traces.
+
+ReAct traces (08_react_agent): a batch of calculator conversations replayed through a ToolNode
+inside a small graph. Users ask overlapping questions, and the model sometimes repeats a call
+in a later turn or asks for the same call twice in one turn. The tools sleep like a real one would.
+
+Every trace runs without a cache, with a fresh in-memory cache, and then once more with a new
+cache on the same SQLite file (the next run of the process). Reports tool calls, executions,
+skipped calls and wall time.
+
+run:
+    python benchmarks/tool_cache_benchmark.py
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+from langgraph.graph import StateGraph, MessagesState, START, END
+from langgraph.prebuilt import ToolNode
+from common.tool_cache import ToolCache, pure
+
+TOOL_LATENCY = 0.02  # a calculator behind an API
+
+executions = {"count": 0}
+
+
+@pure
+@tool
+def add(a: int, b: int):
+    """Adds 2 numbers"""
+    executions["count"] += 1
+    time.sleep(TOOL_LATENCY)
+    return a + b
+
+
+@pure
+@tool
+def multiply(a: int, b: int):
+    """Multiplies 2 numbers"""
+    executions["count"] += 1
+    time.sleep(TOOL_LATENCY)
+    return a * b
+
+
+
+def react_traces(conversations=40, seed=7):
+    """Tool call turns of calculator conversations, small numbers so users overlap"""
+    rng = random.Random(seed)
+    traces = []
+    for c in range(conversations):
+        a, b, factor = rng.randint(1, 12), rng.randint(1, 12), rng.choice([2, 3, 6])
+        turns = [
+            [{"name": "add", "args": {"a": a, "b": b}}],
+            [{"name": "multiply", "args": {"a": a + b, "b": factor}}],
+        ]
+        if rng.random() < 0.3:  # asks for the same call twice in one turn
+            turns[0].append({"name": "add", "args": {"b": b, "a": a}})
+        if rng.random() < 0.3:  # re-checks an earlier result in a later turn
+            turns.append([{"name": "add", "args": {"a": a, "b": b}}])
+        traces.append([[dict(call, id=f"c{c}_t{t}_{i}") for i, call in enumerate(turn)]
+                       for t, turn in enumerate(turns)])
+    return traces
+
+
+def tool_graph(tool_cache=None):
+    node = ToolNode([add, multiply], handle_tool_errors=True,
+                    wrap_tool_call=tool_cache.wrap_tool_call if tool_cache else None,
+                    awrap_tool_call=tool_cache.awrap_tool_call if tool_cache else None)
+    builder = StateGraph(MessagesState)
+    builder.add_node("tools", node)
+    builder.add_edge(START, "tools")
+    builder.add_edge("tools", END)
+    return builder.compile()
+
+
+def run_react(traces, tool_cache):
+    graph = tool_graph(tool_cache)
+    answers = []
+    for conversation in traces:
+        for turn in conversation:
+            out = graph.invoke({"messages": [AIMessage(content="", tool_calls=turn)]})
+            answers.append([(m.tool_call_id, m.content) for m in out["messages"][1:]])
+    return answers
+
+
+def measure(label, run, traces, tools, path):
+    calls = sum(len(turn) for trace in traces for turn in trace)
+    print(f"\n{label}: {len(traces)} conversations, {calls} tool calls")
+    expected = None
+    for name, make_cache in [
+        ("no cache", lambda: None),
+        ("memory cache", lambda: ToolCache(tools)),
+        ("disk cache, 1st run", lambda: ToolCache(tools, path=path)),
+        ("disk cache, next run", lambda: ToolCache(tools, path=path)),
+    ]:
+        tool_cache = make_cache()
+        executions["count"] = 0
+        start = time.perf_counter()
+        answers = run(traces, tool_cache)
+        seconds = time.perf_counter() - start
+        expected = expected or answers
+        assert answers == expected, "the cache changed a tool result"
+        skipped = calls - executions["count"]
+        print(f"  {name:<22} {executions['count']:>4} executed {skipped:>4} skipped ({skipped / calls:4.0%})  "
+              f"{seconds:6.2f}s")
+        if tool_cache is not None:
+            if name in ("memory cache", "disk cache, next run"):
+                print("  " + str(tool_cache.stats).replace("\n", "\n  "))
+            tool_cache.close()
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        measure("ReAct traces (ToolNode)", run_react, react_traces(), [add, multiply],
+                os.path.join(tmp, "react.sqlite"))
+
+
+if __name__ == "__main__":
+    main()
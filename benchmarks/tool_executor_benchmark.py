@@ -0,0 +1,73 @@
+"""Wall clock time of one agent turn with 1-5 parallel tool calls: sequential loop vs ToolExecutor.
+
+Uses stub tools that sleep like a Tavily search would. With the executor a turn should take
+about as long as the slowest tool instead of the sum of all of them.
+
+run:
+    python benchmarks/tool_executor_benchmark.py
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import ToolMessage
+from langchain_core.tools import tool
+from common.tool_executor import ToolExecutor
+
+
+@tool
+def slow_search(query: str, latency: float) -> str:
+    """Pretends to search the web"""
+    time.sleep(latency)
+    return f"results for {query}"
+
+
+tools = {"slow_search": slow_search}
+latencies = [0.4, 0.8, 0.3, 0.6, 0.5]
+
+
+def tool_calls_for(n):
+    return [{"name": "slow_search", "id": f"call_{i}", "args": {"query": f"q{i}", "latency": latencies[i]}}
+            for i in range(n)]
+
+
+def call_tool(t):
+    return tools[t['name']].invoke(t['args'])
+
+
+def sequential(tool_calls):
+    """What take_action used to do"""
+    return [ToolMessage(tool_call_id=t['id'], name=t['name'], content=str(call_tool(t))) for t in tool_calls]
+
+
+def main():
+    executor = ToolExecutor(max_concurrency=8, timeout=5)
+    for n in range(1, len(latencies) + 1):
+        tool_calls = tool_calls_for(n)
+
+        start = time.perf_counter()
+        expected = sequential(tool_calls)
+        sequential_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = executor.run(tool_calls, call_tool)
+        parallel_seconds = time.perf_counter() - start
+
+        assert [m.tool_call_id for m in results] == [m.tool_call_id for m in expected]
+        assert [m.content for m in results] == [m.content for m in expected]
+        print(f"{n} tool calls: sequential {sequential_seconds:.2f}s (sum {sum(latencies[:n]):.2f}s), "
+              f"parallel {parallel_seconds:.2f}s (max {max(latencies[:n]):.2f}s)")
+
+    # A concurrency cap of 2 and a tool that hangs past the timeout
+    capped = ToolExecutor(max_concurrency=2, timeout=1.0)
+    tool_calls = tool_calls_for(4) + [{"name": "slow_search", "id": "call_hang",
+                                       "args": {"query": "hang", "latency": 3.0}}]
+    start = time.perf_counter()
+    results = capped.run(tool_calls, call_tool)
+    print(f"cap 2, 1s timeout: {time.perf_counter() - start:.2f}s, last result: {results[-1].content!r}")
+
+
+if __name__ == "__main__":
+    main()
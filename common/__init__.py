@@ -0,0 +1,5 @@
+"""Helpers shared by the numbered examples.
+
+The examples are run as scripts (``python 10_RAG/main.py``), so each one that uses these
+helpers adds the repository root to ``sys.path`` before importing from ``common``.
+"""
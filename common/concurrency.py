@@ -0,0 +1,64 @@
+"""Small thread pool helper used by the tool executor and the parallel search.
+
+The blocking clients we call (LangChain tools, TavilyClient) have no cancellation, so a
+call that runs past its timeout is abandoned rather than killed: the caller gets a
+TimeoutError back and moves on while the thread finishes in the background. A call that
+is still waiting in the pool queue when it times out is cancelled, so it never runs.
+"""
+import heapq
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Callable, List, Sequence
+
+
+def run_all(pool, fn: Callable, items: Sequence, timeout: float, retries: int = 0,
+            backoff: float = 0.5) -> List:
+    """Runs fn(item) for every item on the pool and returns the results in item order.
+
+    Every attempt gets `timeout` seconds from the moment it is submitted, time spent queued
+    behind other calls included, so a pool full of hung calls cannot stall the caller.
+    Failed or timed out items are retried up to `retries` times with exponential backoff;
+    the backoff is waited out here in the caller, never by sleeping in a pool thread.
+    Items that still fail come back as the exception instance instead of a result.
+    """
+    results = [None] * len(items)
+    attempts = [0] * len(items)
+    futures = {}  # future -> (item index, deadline)
+    retry_at = []  # heap of (when, item index)
+
+    def submit(i):
+        futures[pool.submit(fn, items[i])] = (i, time.monotonic() + timeout)
+
+    def failed(i, error):
+        if attempts[i] < retries:
+            attempts[i] += 1
+            heapq.heappush(retry_at, (time.monotonic() + backoff * 2 ** (attempts[i] - 1), i))
+        else:
+            results[i] = error
+
+    for i in range(len(items)):
+        submit(i)
+
+    while futures or retry_at:
+        now = time.monotonic()
+        while retry_at and retry_at[0][0] <= now:
+            submit(heapq.heappop(retry_at)[1])
+
+        wake_at = [deadline for _, deadline in futures.values()] + [when for when, _ in retry_at[:1]]
+        done, _ = wait(list(futures), timeout=max(min(wake_at) - now, 0), return_when=FIRST_COMPLETED)
+
+        for future in done:
+            i, _ = futures.pop(future)
+            try:
+                results[i] = future.result()
+            except Exception as e:
+                failed(i, e)
+
+        now = time.monotonic()
+        for future, (i, deadline) in list(futures.items()):
+            if now >= deadline:
+                del futures[future]
+                future.cancel()  # only works while it is still queued, a running call is abandoned
+                failed(i, TimeoutError(f"timed out after {timeout}s"))
+
+    return results
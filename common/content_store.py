@@ -0,0 +1,122 @@
+"""Deduplicated, token bounded research content for the 13/14/15 research agents.
+
+Every revision adds search results to the `content` channel, and all of it is pasted into
+the writer prompt. Without a limit the prompt keeps growing with every revision and fills
+up with the same snippets over and over. ContentStore.merge is used as the reducer of that
+channel: it drops exact duplicates (normalized hash) and near duplicates (word shingles),
+keeps the source URL and relevance score of every snippet, and once the token budget is
+reached evicts the least relevant snippets first.
+"""
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+
+def normalize(text: str) -> str:
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token)"""
+    return len(text) // 4 + 1
+
+
+def shingles(text: str, size: int = 5) -> set:
+    words = normalize(text).split()
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+@dataclass
+class ContentStats:
+    added: int = 0
+    duplicates: int = 0
+    near_duplicates: int = 0
+    evicted: int = 0
+
+    def __str__(self):
+        return (f"content store: {self.added} snippets added, {self.duplicates} duplicates, "
+                f"{self.near_duplicates} near duplicates, {self.evicted} evicted for the token budget")
+
+
+class ContentStore:
+    """Reducer for the research `content` channel: content: Annotated[List[dict], store.merge]"""
+
+    def __init__(self, max_tokens: int = 6_000, near_duplicate: float = 0.7, shingle_size: int = 5):
+        self.max_tokens = max_tokens
+        self.near_duplicate = near_duplicate  # shingle overlap above which two snippets count as the same
+        self.shingle_size = shingle_size
+        self.stats = ContentStats()
+
+    def snippet(self, content: str, url: Optional[str] = None, score: float = 0.0) -> dict:
+        return {
+            "content": content,
+            "url": url,
+            "score": score,
+            "hash": hashlib.sha256(normalize(content).encode("utf-8")).hexdigest(),
+            "tokens": estimate_tokens(content),
+        }
+
+    def from_search(self, responses: Iterable[Optional[dict]]) -> List[dict]:
+        """Turns Tavily responses into snippets (failed searches come in as None)"""
+        return [self.snippet(r["content"], r.get("url"), r.get("score") or 0.0)
+                for response in responses for r in (response or {}).get("results", [])]
+
+    def merge(self, existing: Optional[List], new: Optional[List]) -> List[dict]:
+        """Adds the new snippets to the existing ones, keeping the result deduplicated and within budget"""
+        kept = [dict(s) if isinstance(s, dict) else self.snippet(s) for s in existing or []]
+        by_hash = {s["hash"]: i for i, s in enumerate(kept)}
+        kept_shingles = [shingles(s["content"], self.shingle_size) for s in kept]
+
+        for snippet in new or []:
+            if not isinstance(snippet, dict):
+                snippet = self.snippet(snippet)
+
+            if snippet["hash"] in by_hash:
+                self.stats.duplicates += 1
+                old = kept[by_hash[snippet["hash"]]]
+                old["score"] = max(old["score"], snippet["score"])
+                continue
+
+            snippet_shingles = shingles(snippet["content"], self.shingle_size)
+            similar = next((i for i, s in enumerate(kept_shingles)
+                            if jaccard(s, snippet_shingles) >= self.near_duplicate), None)
+            if similar is not None:
+                self.stats.near_duplicates += 1
+                if snippet["score"] > kept[similar]["score"]:  # keep the more relevant version
+                    del by_hash[kept[similar]["hash"]]
+                    kept[similar] = snippet
+                    kept_shingles[similar] = snippet_shingles
+                    by_hash[snippet["hash"]] = similar
+                continue
+
+            by_hash[snippet["hash"]] = len(kept)
+            kept.append(snippet)
+            kept_shingles.append(snippet_shingles)
+            self.stats.added += 1
+
+        # Over budget: drop the least relevant snippets, the oldest first on a tie
+        total = sum(s["tokens"] for s in kept)
+        if total > self.max_tokens:
+            order = sorted(range(len(kept)), key=lambda i: (kept[i]["score"], i))
+            dropped = set()
+            for i in order:
+                if total <= self.max_tokens:
+                    break
+                dropped.add(i)
+                total -= kept[i]["tokens"]
+            kept = [s for i, s in enumerate(kept) if i not in dropped]
+            self.stats.evicted += len(dropped)
+        return kept
+
+    @staticmethod
+    def text(snippets: Optional[List]) -> str:
+        """The snippets as they go into the writer prompt"""
+        return "\n\n".join(s["content"] if isinstance(s, dict) else s for s in snippets or [])
@@ -0,0 +1,37 @@
+"""Loads the numbered examples as modules, e.g. for the agent server or the benchmarks.
+
+The example folders are not packages (their names start with a digit), so they are
+imported from their main.py by path. Importing an example is cheap: the graphs, models
+and clients are only built when its build_graph() / build_model() / ... factories are
+first called.
+"""
+import importlib.util
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def example_folders():
+    """The numbered example folders in order, e.g. ["01_hello_world", ...]"""
+    return sorted(name for name in os.listdir(ROOT)
+                  if name[:2].isdigit() and os.path.isfile(os.path.join(ROOT, name, "main.py")))
+
+
+def load_example(folder: str, name: str = None):
+    """Imports <folder>/main.py as module `name` (default: example_<folder>), once per process"""
+    name = name or f"example_{folder}"
+    if name in sys.modules:
+        return sys.modules[name]
+    path = os.path.join(ROOT, folder)
+    if path not in sys.path:
+        sys.path.insert(0, path)  # for sibling imports like 10_RAG/ingestion.py
+    spec = importlib.util.spec_from_file_location(name, os.path.join(path, "main.py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[name]
+        raise
+    return module
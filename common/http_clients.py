@@ -0,0 +1,108 @@
+"""One pooled HTTP client per upstream, shared by everything in the process.
+
+Every ChatOpenAI / OpenAIEmbeddings instance and every TavilyClient otherwise opens its
+own connection pool. Passing these in means all graphs served by one process share a
+single set of keep-alive connections to OpenAI and one to Tavily, with a cap on how many
+connections we open.
+
+The openai client stops reading a streamed completion at `data: [DONE]` and closes the
+response before the end of the chunked body is read, which makes httpx drop the
+connection instead of putting it back in the pool, so every streamed call would open a
+new connection. The transports below read what is left (a few bytes) before closing.
+"""
+from functools import lru_cache
+
+import openai
+import requests
+from requests.adapters import HTTPAdapter
+
+# openai builds its clients on httpx (httpx2 from openai 3 on), ours have to come from the same package
+try:
+    import httpx2 as httpx
+except ImportError:
+    import httpx
+
+OPENAI_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=64, keepalive_expiry=60)
+OPENAI_TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+TAVILY_POOL_SIZE = 32
+DRAIN_BYTES = 4096  # a response abandoned with more than this left is closed, not drained
+
+
+class _DrainingStream(httpx.SyncByteStream):
+    def __init__(self, stream):
+        self._stream = stream
+        self._chunks = iter(stream)  # kept here so an abandoned read does not close the connection
+
+    def __iter__(self):
+        yield from self._chunks
+
+    def close(self):
+        drained = 0
+        try:
+            for chunk in self._chunks:
+                drained += len(chunk)
+                if drained > DRAIN_BYTES:
+                    break
+        except httpx.HTTPError:
+            pass
+        finally:
+            self._stream.close()
+
+
+class _AsyncDrainingStream(httpx.AsyncByteStream):
+    def __init__(self, stream):
+        self._stream = stream
+        self._chunks = stream.__aiter__()
+
+    async def __aiter__(self):
+        async for chunk in self._chunks:
+            yield chunk
+
+    async def aclose(self):
+        drained = 0
+        try:
+            async for chunk in self._chunks:
+                drained += len(chunk)
+                if drained > DRAIN_BYTES:
+                    break
+        except httpx.HTTPError:
+            pass
+        finally:
+            await self._stream.aclose()
+
+
+class DrainingTransport(httpx.HTTPTransport):
+    def handle_request(self, request):
+        response = super().handle_request(request)
+        response.stream = _DrainingStream(response.stream)
+        return response
+
+
+class AsyncDrainingTransport(httpx.AsyncHTTPTransport):
+    async def handle_async_request(self, request):
+        response = await super().handle_async_request(request)
+        response.stream = _AsyncDrainingStream(response.stream)
+        return response
+
+
+@lru_cache(maxsize=None)
+def openai_http_client() -> httpx.Client:
+    """For ChatOpenAI(http_client=...) / OpenAIEmbeddings(http_client=...)"""
+    return openai.DefaultHttpxClient(transport=DrainingTransport(limits=OPENAI_LIMITS), timeout=OPENAI_TIMEOUT)
+
+
+@lru_cache(maxsize=None)
+def openai_async_http_client() -> httpx.AsyncClient:
+    """For ChatOpenAI(http_async_client=...), used from a single event loop"""
+    return openai.DefaultAsyncHttpxClient(transport=AsyncDrainingTransport(limits=OPENAI_LIMITS),
+                                          timeout=OPENAI_TIMEOUT)
+
+
+@lru_cache(maxsize=None)
+def tavily_session() -> requests.Session:
+    """For TavilyClient(session=...)"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=TAVILY_POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
@@ -0,0 +1,305 @@
+"""Deterministic response cache and record/replay mode for the chat models.
+
+CachedChatModel wraps a ChatOpenAI (or any chat model) and stores every response in
+SQLite, keyed by the model parameters, the bound tools / call options and a canonical
+hash of the message list. Message ids, response metadata and token usage are left out
+of the hash, so the same conversation gives the same key on every run.
+
+Modes (LLM_CACHE_MODE environment variable, or mode=...):
+    auto    answer from the cache when possible, call the model otherwise
+    record  always call the model and store the response
+    replay  never call the model, a miss is an error (offline regression runs)
+    off     plain pass-through
+
+By default temperature 0 models use "auto" and everything else "off": a chat bot's
+conversations are only stored when a run is recorded on purpose (LLM_CACHE_MODE=record),
+to be replayed later. The store is trimmed to the newest `max_entries` responses every 100 writes.
+
+Streaming (stream / astream, or a graph streamed with stream_mode="messages") passes the
+wrapped model's tokens through as they arrive and stores the complete reply at the end.
+A cached reply comes back as a single chunk.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel, generate_from_stream
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, messages_from_dict, messages_to_dict
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            ".cache", "llm_cache.sqlite")
+MODES = ("auto", "record", "replay", "off")
+
+
+class ReplayMiss(LookupError):
+    """Raised in replay mode when a call was never recorded"""
+
+
+@dataclass
+class NodeStats:
+    hits: int = 0
+    misses: int = 0
+    saved_tokens: int = 0
+    saved_seconds: float = 0.0  # what the cached responses took when they were recorded
+    model_seconds: float = 0.0  # time spent waiting on the real model
+
+
+@dataclass
+class LLMCacheStats:
+    nodes: dict = field(default_factory=lambda: defaultdict(NodeStats))
+
+    @property
+    def hits(self) -> int:
+        return sum(n.hits for n in self.nodes.values())
+
+    @property
+    def misses(self) -> int:
+        return sum(n.misses for n in self.nodes.values())
+
+    def __str__(self):
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        lines = [f"llm cache: {self.hits} hits, {self.misses} model calls, hit rate {rate:.0%}"]
+        for name, n in sorted(self.nodes.items()):
+            lines.append(f"  {name:<20} {n.hits:>4} hits {n.misses:>4} calls  saved {n.saved_tokens:>7} tokens, "
+                         f"{n.saved_seconds:>7.2f}s  (model time {n.model_seconds:.2f}s)")
+        return "\n".join(lines)
+
+
+def canonical_message(message: BaseMessage) -> dict:
+    """The parts of a message that change the model's answer"""
+    canonical = {"type": message.type, "content": message.content}
+    if message.name:
+        canonical["name"] = message.name
+    if isinstance(message, AIMessage) and message.tool_calls:
+        canonical["tool_calls"] = [{"name": t["name"], "args": t["args"], "id": t.get("id")}
+                                   for t in message.tool_calls]
+    for attr in ("tool_call_id", "role"):  # ToolMessage / ChatMessage
+        if getattr(message, attr, None):
+            canonical[attr] = getattr(message, attr)
+    return canonical
+
+
+def current_node() -> str:
+    """Name of the graph node we are called from, if any"""
+    try:
+        from langgraph.config import get_config
+        return get_config().get("metadata", {}).get("langgraph_node", "-")
+    except (ImportError, RuntimeError):
+        return "-"
+
+
+class LLMCache:
+    """SQLite store shared by every CachedChatModel of an agent"""
+
+    def __init__(self, path: str = DEFAULT_PATH, max_entries: int = 10_000):
+        self.stats = LLMCacheStats()
+        self.max_entries = max_entries
+        self._stores = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, model TEXT, messages TEXT NOT NULL, "
+            "tokens INTEGER NOT NULL, seconds REAL NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def lookup(self, key: str) -> Optional[tuple]:
+        with self._lock:
+            row = self._db.execute("SELECT messages, tokens, seconds FROM responses WHERE key = ?",
+                                   (key,)).fetchone()
+        if row is None:
+            return None
+        messages, tokens, seconds = row
+        return messages_from_dict(json.loads(messages)), tokens, seconds
+
+    def store(self, key: str, model: str, messages: List[BaseMessage], tokens: int, seconds: float):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, model, messages, tokens, seconds, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, json.dumps(messages_to_dict(messages)), tokens, seconds, time.time()),
+            )
+            self._stores += 1
+            if self._stores % 100 == 0:  # trimming on every store would scan the table every call
+                self._db.execute("DELETE FROM responses WHERE key NOT IN "
+                                 "(SELECT key FROM responses ORDER BY created_at DESC LIMIT ?)", (self.max_entries,))
+            self._db.commit()
+
+    def record_hit(self, node: str, tokens: int, seconds: float):
+        with self._lock:
+            stats = self.stats.nodes[node]
+            stats.hits += 1
+            stats.saved_tokens += tokens
+            stats.saved_seconds += seconds
+
+    def record_miss(self, node: str, seconds: float):
+        with self._lock:
+            stats = self.stats.nodes[node]
+            stats.misses += 1
+            stats.model_seconds += seconds
+
+
+@lru_cache(maxsize=None)
+def default_llm_cache() -> LLMCache:
+    """The LLMCache at DEFAULT_PATH, opened on first use and shared by every model in the process"""
+    return LLMCache()
+
+
+class CachedChatModel(BaseChatModel):
+    """Drop-in for the wrapped chat model, bind_tools and with_structured_output included"""
+
+    model: BaseChatModel
+    store: LLMCache
+    mode: Optional[str] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return f"cached-{self.model._llm_type}"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return self.model._identifying_params
+
+    @property
+    def cache_mode(self) -> str:
+        mode = self.mode or os.environ.get("LLM_CACHE_MODE")
+        if mode is None:
+            mode = "auto" if getattr(self.model, "temperature", None) == 0 else "off"
+        if mode not in MODES:
+            raise ValueError(f"LLM cache mode must be one of {MODES}, got {mode!r}")
+        return mode
+
+    def bind_tools(self, tools, **kwargs):
+        # Let the wrapped model format the tools, then bind the same call options to us
+        bound = self.model.bind_tools(tools, **kwargs)
+        return self.bind(**bound.kwargs)
+
+    def key(self, messages: List[BaseMessage], stop: Optional[List[str]], **kwargs) -> str:
+        payload = json.dumps({
+            "model": self._identifying_params,
+            "stop": stop,
+            "options": kwargs,
+            "messages": [canonical_message(m) for m in messages],
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _from_cache(self, key: str, node: str) -> Optional[ChatResult]:
+        cached = self.store.lookup(key)
+        if cached is None:
+            if self.cache_mode == "replay":
+                raise ReplayMiss(f"No recorded response for this call in node {node!r} (key {key[:12]})")
+            return None
+        messages, tokens, seconds = cached
+        self.store.record_hit(node, tokens, seconds)
+        return ChatResult(generations=[ChatGeneration(message=m) for m in messages])
+
+    def _save(self, key: str, node: str, result: ChatResult, seconds: float):
+        self.store.record_miss(node, seconds)
+        messages = [g.message for g in result.generations]
+        tokens = sum((m.usage_metadata or {}).get("total_tokens", 0)
+                     for m in messages if isinstance(m, AIMessage))
+        model = str(self._identifying_params.get("model_name") or self.model._llm_type)
+        self.store.store(key, model, messages, tokens, seconds)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        mode = self.cache_mode
+        if mode == "off":
+            return self.model._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        key, node = self.key(messages, stop, **kwargs), current_node()
+        if mode != "record":
+            result = self._from_cache(key, node)
+            if result is not None:
+                return result
+        start = time.perf_counter()
+        result = self.model._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        self._save(key, node, result, time.perf_counter() - start)
+        return result
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, **kwargs: Any) -> ChatResult:
+        mode = self.cache_mode
+        if mode == "off":
+            return await self.model._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        key, node = self.key(messages, stop, **kwargs), current_node()
+        if mode != "record":
+            result = self._from_cache(key, node)
+            if result is not None:
+                return result
+        start = time.perf_counter()
+        result = await self.model._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        self._save(key, node, result, time.perf_counter() - start)
+        return result
+
+    def _as_chunks(self, result: ChatResult) -> List[ChatGenerationChunk]:
+        chunks = []
+        for generation in result.generations:
+            m = generation.message
+            chunks.append(ChatGenerationChunk(message=AIMessageChunk(
+                content=m.content, id=m.id, tool_calls=getattr(m, "tool_calls", []),
+                usage_metadata=getattr(m, "usage_metadata", None))))
+        return chunks
+
+    @property
+    def _model_streams(self) -> bool:
+        return type(self.model)._stream is not BaseChatModel._stream
+
+    # BaseChatModel reports every chunk we yield to the callbacks, so the wrapped model gets no run_manager
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        mode = self.cache_mode
+        if not self._model_streams or mode == "off":
+            if self._model_streams:
+                yield from self.model._stream(messages, stop=stop, **kwargs)
+            else:
+                yield from self._as_chunks(self._generate(messages, stop=stop, **kwargs))
+            return
+        key, node = self.key(messages, stop, **kwargs), current_node()
+        if mode != "record":
+            result = self._from_cache(key, node)
+            if result is not None:
+                yield from self._as_chunks(result)
+                return
+        start = time.perf_counter()
+        chunks = []
+        for chunk in self.model._stream(messages, stop=stop, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        self._save(key, node, generate_from_stream(iter(chunks)), time.perf_counter() - start)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        mode = self.cache_mode
+        if not self._model_streams or mode == "off":
+            if self._model_streams:
+                async for chunk in self.model._astream(messages, stop=stop, **kwargs):
+                    yield chunk
+            else:
+                for chunk in self._as_chunks(await self._agenerate(messages, stop=stop, **kwargs)):
+                    yield chunk
+            return
+        key, node = self.key(messages, stop, **kwargs), current_node()
+        if mode != "record":
+            result = self._from_cache(key, node)
+            if result is not None:
+                for chunk in self._as_chunks(result):
+                    yield chunk
+                return
+        start = time.perf_counter()
+        chunks = []
+        async for chunk in self.model._astream(messages, stop=stop, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        self._save(key, node, generate_from_stream(iter(chunks)), time.perf_counter() - start)
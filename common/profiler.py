@@ -0,0 +1,380 @@
+"""Per-node profiling of any compiled graph, from the callbacks LangGraph already fires.
+
+    profiler = GraphProfiler().attach(graph)  # or: with GraphProfiler().attach(graph) as profiler:
+    graph.invoke(...)
+    print(profiler.summary())
+    profiler.write_trace("run.trace.json")  # chrome://tracing, ui.perfetto.dev or speedscope
+    profiler.write_folded("run.folded")  # collapsed stacks for flamegraph.pl or speedscope
+
+Every node invocation records:
+    wall time
+    wait: from when its step could start (the last node of the previous step finished, or
+          the graph started) until the node started: LangGraph applying the writes and
+          checkpointing, or the node waiting for a free thread of the executor
+    the LLM calls in it: prompt and completion tokens (the usage the model reports, about
+          4 characters per token when it reports none) and their time
+    the tool calls in it and their latency
+    the size in bytes of the state it got and of the update it returned, serialized the
+          way a checkpointer stores them
+
+attach() only adds the profiler to the graph's callbacks, so no node code changes. Time a
+node spends outside of LLM and tool calls (the Tavily searches of the research agents) is
+its self time in the flame graph. GRAPH_PROFILE=<path> profiles the graph of an example
+(profile_from_env), and report() writes <path>.trace.json and <path>.folded.
+"""
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables.config import merge_configs
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from common.content_store import estimate_tokens
+
+_serde = JsonPlusSerializer()
+
+
+def state_bytes(value) -> int:
+    try:
+        return len(_serde.dumps_typed(value)[1])
+    except Exception:  # not serializable, a checkpointer would fail on it too
+        return len(repr(value).encode("utf-8"))
+
+
+@dataclass
+class Span:
+    run_id: UUID
+    name: str
+    kind: str  # graph, node, llm or tool
+    start: float
+    parent: Optional["Span"] = None
+    node: Optional["Span"] = None  # the innermost node it runs in
+    end: Optional[float] = None
+    lane: int = 0  # the row of the trace, spans running next to each other get their own
+    step: int = 0
+    graph_run: Optional[UUID] = None  # the run of the graph the node belongs to
+    wait: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    estimated: bool = False  # the model reported no usage
+    state_bytes: int = 0
+    update_bytes: int = 0
+    error: bool = False
+    children: List["Span"] = field(default_factory=list)
+
+    @property
+    def seconds(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+    @property
+    def path(self) -> str:
+        """outer/inner for the nodes of a subgraph"""
+        return f"{self.node.path}/{self.name}" if self.node else self.name
+
+
+@dataclass
+class NodeProfile:
+    calls: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+    max_seconds: float = 0.0
+    wait: float = 0.0
+    llm_calls: int = 0
+    llm_seconds: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    estimated: bool = False
+    tool_calls: int = 0
+    tool_seconds: float = 0.0
+    state_bytes: int = 0
+    update_bytes: int = 0
+
+
+class GraphProfiler(BaseCallbackHandler):
+    run_inline = True  # called in the node's own thread / event loop, so the timings stay right
+
+    def __init__(self, path: Optional[str] = None, measure_state: bool = True):
+        self.path = path  # where report() writes the traces
+        self.measure_state = measure_state  # serializing big states costs a little on every node
+        self.spans: List[Span] = []
+        self._runs: Dict[UUID, Span] = {}  # run id -> its span, or the span its children go to
+        self._chains: Dict[UUID, float] = {}  # start of the chains that are not spans (the subgraph runs)
+        self._step_ends: Dict[tuple, float] = {}  # (graph run, step) -> when its last node finished
+        self._lanes: Dict[int, List[Span]] = defaultdict(list)  # the open spans of every row, innermost last
+        self._lock = threading.Lock()
+        self._attached = []
+
+    # --- attaching ---
+
+    def attach(self, graph) -> "GraphProfiler":
+        """Profiles every run of the compiled graph from now on (callbacks passed to a run replace it)"""
+        self._attached.append((graph, graph.config))
+        graph.config = merge_configs(graph.config, {"callbacks": [self]})
+        return self
+
+    def detach(self):
+        for graph, config in reversed(self._attached):
+            graph.config = config
+        self._attached.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.detach()
+
+    def reset(self):
+        with self._lock:
+            self.spans.clear()
+            self._runs.clear()
+            self._chains.clear()
+            self._step_ends.clear()
+            self._lanes.clear()
+
+    # --- callbacks ---
+
+    def _open(self, run_id: UUID, parent_run_id: Optional[UUID], name: str, kind: str, **kwargs) -> Span:
+        parent = self._runs.get(parent_run_id)
+        span = Span(run_id, name, kind, time.perf_counter(), parent=parent,
+                    node=parent if parent and parent.kind == "node" else parent and parent.node, **kwargs)
+        if parent:
+            parent.children.append(span)
+        # under its parent, unless a sibling already runs there (parallel nodes and tool calls)
+        span.lane = parent.lane if parent and self._lanes[parent.lane][-1:] == [parent] else \
+            next(lane for lane in range(len(self._lanes) + 1) if not self._lanes[lane])
+        self._lanes[span.lane].append(span)
+        self.spans.append(span)
+        self._runs[run_id] = span
+        return span
+
+    def _close(self, span: Span, end: float, error: bool = False):
+        span.end, span.error = end, error
+        lane = self._lanes[span.lane]
+        if span in lane:
+            lane.remove(span)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        metadata = metadata or {}
+        step_tag = next((t for t in tags or [] if t.startswith("graph:step:")), None)
+        is_node = step_tag and parent_run_id in self._runs and kwargs.get("name") == metadata.get("langgraph_node")
+        # measured before the node's clock starts, serializing a big state is the profiler's time
+        size = state_bytes(inputs) if is_node and self.measure_state else 0
+        with self._lock:
+            if parent_run_id is None or parent_run_id not in self._runs:  # a graph run we were attached to
+                self._open(run_id, None, kwargs.get("name") or "graph", "graph")
+            elif is_node:
+                step = int(step_tag.rsplit(":", 1)[1])
+                graph_start = self._chains.get(parent_run_id) or self._runs[parent_run_id].start
+                ready = self._step_ends.get((parent_run_id, step - 1), graph_start)
+                span = self._open(run_id, parent_run_id, kwargs["name"], "node", step=step,
+                                  graph_run=parent_run_id, state_bytes=size)
+                span.wait = max(span.start - ready, 0.0)
+            else:  # edges, sequences inside a node, a subgraph: their children go to the enclosing span
+                self._runs[run_id] = self._runs[parent_run_id]
+                self._chains[run_id] = time.perf_counter()
+
+    def _close_chain(self, run_id, outputs=None, error: bool = False):
+        end = time.perf_counter()
+        with self._lock:
+            self._chains.pop(run_id, None)
+            span = self._runs.pop(run_id, None)
+            if span is None or span.run_id != run_id:  # not a span of its own
+                return
+            self._close(span, end, error)
+            if span.kind == "node":
+                key = (span.graph_run, span.step)
+                self._step_ends[key] = max(self._step_ends.get(key, 0.0), end)
+        if span.kind == "node" and self.measure_state and outputs is not None:
+            span.update_bytes = state_bytes(outputs)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._close_chain(run_id, outputs)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._close_chain(run_id, error=True)
+
+    def _llm_start(self, serialized, prompt: str, run_id, parent_run_id, metadata, **kwargs):
+        name = (metadata or {}).get("ls_model_name") or kwargs.get("name") or (serialized or {}).get("name") \
+            or ((serialized or {}).get("id") or ["llm"])[-1]
+        with self._lock:
+            span = self._open(run_id, parent_run_id, str(name), "llm")
+        span.prompt_tokens = estimate_tokens(prompt)  # replaced by the reported usage at the end
+        span.estimated = True
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        prompt = "".join(str(m.content) for batch in messages for m in batch)
+        self._llm_start(serialized, prompt, run_id, parent_run_id, metadata, **kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        self._llm_start(serialized, "".join(prompts), run_id, parent_run_id, metadata, **kwargs)
+
+    def _end(self, run_id: UUID, error: bool = False) -> Optional[Span]:
+        end = time.perf_counter()
+        with self._lock:
+            span = self._runs.pop(run_id, None)
+            if span is not None:
+                self._close(span, end, error)
+        return span
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        span = self._end(run_id)
+        if span is None:
+            return
+        usage = [getattr(g, "message", None) and g.message.usage_metadata for batch in response.generations for g in batch]
+        token_usage = (response.llm_output or {}).get("token_usage") or {}
+        if any(usage):
+            span.prompt_tokens = sum(u.get("input_tokens", 0) for u in usage if u)
+            span.completion_tokens = sum(u.get("output_tokens", 0) for u in usage if u)
+            span.estimated = False
+        elif token_usage:
+            span.prompt_tokens = token_usage.get("prompt_tokens", 0)
+            span.completion_tokens = token_usage.get("completion_tokens", 0)
+            span.estimated = False
+        else:
+            output = "".join(g.text + str(getattr(getattr(g, "message", None), "tool_calls", "") or "")
+                             for batch in response.generations for g in batch)
+            span.completion_tokens = estimate_tokens(output)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=True)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        with self._lock:
+            self._open(run_id, parent_run_id, kwargs.get("name") or (serialized or {}).get("name") or "tool", "tool")
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=True)
+
+    # --- reports ---
+
+    def nodes(self) -> Dict[str, NodeProfile]:
+        """Totals per node, the nodes of a subgraph as outer/inner"""
+        profiles = defaultdict(NodeProfile)
+        for span in list(self.spans):
+            if span.end is None or span.kind not in ("node", "llm", "tool") or (span.kind != "node" and not span.node):
+                continue
+            p = profiles[span.path if span.kind == "node" else span.node.path]
+            if span.kind == "node":
+                p.calls += 1
+                p.errors += span.error
+                p.seconds += span.seconds
+                p.max_seconds = max(p.max_seconds, span.seconds)
+                p.wait += span.wait
+                p.state_bytes += span.state_bytes
+                p.update_bytes += span.update_bytes
+            elif span.kind == "llm":
+                p.llm_calls += 1
+                p.llm_seconds += span.seconds
+                p.prompt_tokens += span.prompt_tokens
+                p.completion_tokens += span.completion_tokens
+                p.estimated |= span.estimated
+            else:
+                p.tool_calls += 1
+                p.tool_seconds += span.seconds
+        return dict(profiles)
+
+    def tools(self) -> Dict[str, List[float]]:
+        """Latencies of every tool call, per tool"""
+        latencies = defaultdict(list)
+        for span in list(self.spans):
+            if span.kind == "tool" and span.end is not None:
+                latencies[span.name].append(span.seconds)
+        return dict(latencies)
+
+    def summary(self) -> str:
+        """One row per node, slowest first; parallel branches can add up to more than 100% of the run"""
+        runs = [s for s in self.spans if s.kind == "graph" and s.end is not None]
+        total = sum(s.seconds for s in runs)
+        nodes = sorted(self.nodes().items(), key=lambda item: -item[1].seconds)
+        lines = [f"graph profile: {len(runs)} runs, {total:.2f}s"]
+        if not nodes:
+            return lines[0]
+        lines.append(f"  {'node':<22} {'calls':>5} {'total':>8} {'% run':>6} {'mean':>9} {'max':>9} {'wait':>8} "
+                     f"{'llm':>4} {'llm time':>8} {'prompt tok':>10} {'compl tok':>9} {'tools':>5} {'tool time':>9} "
+                     f"{'state':>9} {'update':>9}")
+        for name, p in nodes:
+            est = "~" if p.estimated else " "
+            lines.append(
+                f"  {name:<22} {p.calls:>5} {p.seconds:>7.2f}s {p.seconds / total if total else 0:>6.0%} "
+                f"{p.seconds / p.calls * 1000:>7.1f}ms {p.max_seconds * 1000:>7.1f}ms {p.wait / p.calls * 1000:>6.2f}ms "
+                f"{p.llm_calls:>4} {p.llm_seconds:>7.2f}s {est}{p.prompt_tokens:>9,} {est}{p.completion_tokens:>8,} "
+                f"{p.tool_calls:>5} {p.tool_seconds:>8.2f}s {p.state_bytes / p.calls / 1024:>6.1f}KiB "
+                f"{p.update_bytes / p.calls / 1024:>6.1f}KiB")
+        tools = self.tools()
+        for name, latencies in sorted(tools.items(), key=lambda item: -sum(item[1])):
+            latencies = sorted(latencies)
+            lines.append(f"  tool {name:<17} {len(latencies):>5} {sum(latencies):>7.2f}s  "
+                         f"p50 {latencies[len(latencies) // 2] * 1000:.1f}ms  max {latencies[-1] * 1000:.1f}ms")
+        slowest, p = nodes[0]
+        lines.append(f"  most time in '{slowest}': {p.seconds:.2f}s over {p.calls} calls"
+                     + (" (~ marks estimated tokens)" if any(p.estimated for _, p in nodes) else ""))
+        return "\n".join(lines)
+
+    def trace_events(self) -> List[dict]:
+        """Chrome trace events, one complete event per span and one row per lane"""
+        spans = [s for s in list(self.spans) if s.end is not None]
+        if not spans:
+            return []
+        t0 = min(s.start for s in spans)
+        events = [{"name": "thread_name", "ph": "M", "pid": 1, "tid": lane, "args": {"name": f"lane {lane}"}}
+                  for lane in sorted({s.lane for s in spans})]
+        for s in spans:
+            args: Dict[str, Any] = {}
+            if s.kind == "node":
+                args = {"step": s.step, "wait_ms": round(s.wait * 1000, 3), "state_bytes": s.state_bytes,
+                        "update_bytes": s.update_bytes}
+            elif s.kind == "llm":
+                args = {"prompt_tokens": s.prompt_tokens, "completion_tokens": s.completion_tokens,
+                        "estimated": s.estimated}
+            if s.error:
+                args["error"] = True
+            events.append({"name": s.name, "cat": s.kind, "ph": "X", "pid": 1, "tid": s.lane,
+                           "ts": round((s.start - t0) * 1e6, 1), "dur": round(s.seconds * 1e6, 1), "args": args})
+        return events
+
+    def write_trace(self, path: str):
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump({"traceEvents": self.trace_events(), "displayTimeUnit": "ms"}, file)
+
+    def folded(self) -> str:
+        """Collapsed stacks, graph;node;llm:model <self time in microseconds>"""
+        stacks = defaultdict(float)
+        for s in list(self.spans):
+            if s.end is None:
+                continue
+            frames, frame = [], s
+            while frame:
+                frames.append(frame.name if frame.kind in ("graph", "node") else f"{frame.kind}:{frame.name}")
+                frame = frame.parent
+            children = sum(c.seconds for c in s.children if c.end is not None)
+            stacks[";".join(reversed(frames))] += max(s.seconds - children, 0.0)
+        return "\n".join(f"{stack} {round(seconds * 1e6)}" for stack, seconds in stacks.items() if seconds > 0)
+
+    def write_folded(self, path: str):
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(self.folded() + "\n")
+
+    def report(self) -> str:
+        """The summary, and the traces written to <path>.trace.json and <path>.folded when a path is set"""
+        summary = self.summary()
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self.write_trace(f"{self.path}.trace.json")
+            self.write_folded(f"{self.path}.folded")
+            summary += f"\n  traces: {self.path}.trace.json (chrome://tracing, Perfetto), {self.path}.folded (flamegraph.pl)"
+        return summary
+
+
+def profile_from_env(graph) -> Optional[GraphProfiler]:
+    """A profiler attached to the graph when GRAPH_PROFILE is set, its value is the path of the traces"""
+    path = os.environ.get("GRAPH_PROFILE")
+    return GraphProfiler(path=path).attach(graph) if path else None
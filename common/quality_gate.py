@@ -0,0 +1,33 @@
+"""Early exit for the plan -> research -> write -> reflect loops of the 14/15 research agents.
+
+The reflector grades every draft with a structured Review (a 1-10 score plus the critique)
+instead of free text. The loop then stops as soon as a draft clears the score threshold, or
+when a revision did not improve on the best score so far, instead of always running
+max_revisions full cycles of 20 searches and 4 LLM calls. The best draft is kept, so a
+revision that made things worse does not end up as the final report.
+"""
+from dataclasses import dataclass
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class Review(BaseModel):
+    score: int = Field(description="Score from 1 to 10 for the draft", ge=1, le=10)
+    critique: str = Field(description="Detailed critique and recommendations, with the explanation of the score")
+
+
+@dataclass
+class QualityGate:
+    threshold: int = 8  # a draft scoring this or more is good enough
+    min_improvement: int = 1  # a revision has to beat the best score so far by this much
+
+    def stop_reason(self, scores: List[int], revision_number: int, max_revisions: int) -> Optional[str]:
+        """Why the loop should stop after the latest review, None to keep revising"""
+        if revision_number >= max_revisions:
+            return f"max revisions ({max_revisions}) reached"
+        if scores and scores[-1] >= self.threshold:
+            return f"score {scores[-1]}/10 clears the threshold of {self.threshold}"
+        if len(scores) > 1 and scores[-1] - max(scores[:-1]) < self.min_improvement:
+            return f"score stopped improving ({max(scores[:-1])} -> {scores[-1]})"
+        return None
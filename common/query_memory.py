@@ -0,0 +1,99 @@
+"""Delta-only research for the revision loops of the 14/15 research agents.
+
+Every revision asks the LLM for up to 20 queries, and most of them are rewordings of queries
+an earlier revision already searched ("plant subscription market size" vs "market size of
+plant subscriptions"). Their snippets are already in the research content, so searching them
+again only costs time (and Tavily credits on a cache miss).
+
+The queries a run already searched are kept in the graph state (`searched` channel), with
+the number of snippets each one returned. QueryMemory skips a new query when an earlier
+revision searched one whose content words overlap enough (normalized, plurals folded, word
+order and filler words ignored) and that names the same things: a number (a year, a
+quarter) or a capitalized word (a company, a country) that only one of the two queries has
+makes them different searches, "market size UK" is not "market size US". The queries of
+one step are never filtered against each other, so the first research step searches all
+of them. A query whose earlier search failed or found nothing is searched again.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from common.content_store import jaccard, normalize
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "by", "for", "from", "how", "in", "is", "of", "on", "or",
+    "the", "to", "vs", "what", "which", "who", "with", "about", "does", "do", "latest", "current",
+}
+
+
+def singular(word: str) -> str:
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def query_terms(query: str) -> frozenset:
+    """The content words of a query, order and plurals ignored"""
+    return frozenset(singular(w) for w in normalize(query).split() if w not in STOPWORDS)
+
+
+def key_terms(query: str) -> frozenset:
+    """The numbers and capitalized words (names, places, acronyms) of a query, as query_terms"""
+    words = (normalize(w) for w in re.findall(r"\w+", query) if w[0].isupper() or any(c.isdigit() for c in w))
+    return frozenset(singular(w) for w in words if w not in STOPWORDS)
+
+
+@dataclass
+class ResearchStats:
+    executed: int = 0
+    skipped: int = 0
+    steps: List[Tuple[int, int]] = field(default_factory=list)  # (asked, executed) of every research step
+
+    def __str__(self):
+        total = self.executed + self.skipped
+        rate = self.skipped / total if total else 0.0
+        per_step = ", ".join(f"{executed}/{asked}" for asked, executed in self.steps)
+        return (f"research memory: {total} queries asked, {self.executed} searched, {self.skipped} skipped "
+                f"({rate:.0%}), searched per step {per_step}")
+
+
+class QueryMemory:
+    """Filters the queries of a research step down to the ones earlier steps did not cover"""
+
+    def __init__(self, similar: float = 0.6):
+        self.similar = similar  # content word overlap above which two queries count as the same search
+        self.stats = ResearchStats()
+
+    def same_search(self, query: str, earlier: str) -> bool:
+        terms, earlier_terms = query_terms(query), query_terms(earlier)
+        if not key_terms(query) <= earlier_terms or not key_terms(earlier) <= terms:  # another year, company, country
+            return False
+        return jaccard(terms, earlier_terms) >= self.similar
+
+    def covering(self, query: str, searched: List[dict]) -> Optional[dict]:
+        """The earlier search that already answered this query, if any"""
+        for earlier in searched:
+            if earlier["snippets"] and self.same_search(query, earlier["query"]):
+                return earlier
+        return None
+
+    def new_queries(self, queries: List[str], searched: Optional[List[dict]]) -> Tuple[List[str], List[str]]:
+        """(queries to search, queries earlier revisions already searched)"""
+        searched = list(searched or [])
+        fresh, skipped = [], []
+        for query in queries:
+            if self.covering(query, searched):
+                skipped.append(query)
+            else:
+                fresh.append(query)
+        self.stats.executed += len(fresh)
+        self.stats.skipped += len(skipped)
+        self.stats.steps.append((len(queries), len(fresh)))
+        return fresh, skipped
+
+    @staticmethod
+    def record(queries: List[str], responses: List[Optional[dict]]) -> List[dict]:
+        """New entries for the `searched` channel"""
+        return [{"query": q, "snippets": len((r or {}).get("results", []))} for q, r in zip(queries, responses)]
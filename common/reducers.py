@@ -0,0 +1,76 @@
+"""A cheaper add_messages for message channels that the nodes only append to.
+
+add_messages converts and re-indexes the whole history on every update, and LangGraph runs
+the reducer again whenever a conditional edge reads the state a node just wrote. Even when
+a node only returns its new messages, every step then costs O(history) Python work a few
+times over, and a long session becomes quadratic.
+
+append_messages takes a fast path when the update only adds messages: the history already
+came out of this reducer, so only the new messages are converted, given ids and appended.
+An update that replaces a message (an id already in the history) or removes one
+(RemoveMessage) goes through add_messages unchanged, so the behaviour is the same.
+
+To tell the two apart without walking the history, the list it returns keeps an index of
+message id -> position. Histories built from each other share it, so an append only adds
+the new ids. A history that is appended to twice with different messages (a fork, e.g. a
+parallel branch) gives the second branch its own copy of the index, made from its prefix;
+appending the same messages again (LangGraph re-applies an update for every conditional
+edge) keeps sharing it. The Python work of an append is O(new messages); what is left in
+O(history) is copying the list of references into the new list, which LangGraph needs
+because the old value must not change under it. A history that did not come from this
+reducer (e.g. loaded from a checkpoint) is indexed once, on its first update.
+
+    messages: Annotated[Sequence[BaseMessage], append_messages]
+"""
+import uuid
+
+from langchain_core.messages import RemoveMessage, convert_to_messages, message_chunk_to_message
+from langgraph.graph.message import add_messages
+
+
+class _Positions:
+    """The ids of a chain of histories that extend each other, in order, and id -> position"""
+    __slots__ = ("ids", "of")
+
+    def __init__(self, ids):
+        self.ids = list(ids)
+        self.of = {message_id: position for position, message_id in enumerate(self.ids)}
+
+    def extend(self, ids):
+        for message_id in ids:
+            self.of[message_id] = len(self.ids)
+            self.ids.append(message_id)
+
+
+class _History(list):
+    """A message list made by append_messages, with the position of every message id"""
+    __slots__ = ("positions",)
+
+
+def append_messages(left, right):
+    """add_messages, without touching the existing history when nothing in it changes"""
+    if not isinstance(right, list):
+        right = [right]
+    if not isinstance(left, list):
+        return add_messages(left, right)
+    new = [message_chunk_to_message(m) for m in convert_to_messages(right)]
+    if any(isinstance(m, RemoveMessage) for m in new):
+        return add_messages(left, new)
+    positions = getattr(left, "positions", None) or _Positions(m.id for m in left)
+    # every list sharing the index is a prefix of positions.ids, so an id is in left iff it sits before its end
+    ids = [m.id for m in new if m.id is not None]
+    if len(set(ids)) < len(ids) or any(positions.of.get(i, len(left)) < len(left) for i in ids):  # replaces a message
+        return add_messages(left, new)
+    for m in new:
+        if m.id is None:
+            m.id = str(uuid.uuid4())
+    new_ids = [m.id for m in new]
+    tail = positions.ids[len(left):len(left) + len(new)]
+    if tail != new_ids[:len(tail)]:  # left was already extended with other messages: a fork
+        positions = _Positions(positions.ids[:len(left)])
+        tail = []
+    positions.extend(new_ids[len(tail):])
+    history = _History(left)
+    history.extend(new)
+    history.positions = positions
+    return history
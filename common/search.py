@@ -0,0 +1,32 @@
+"""Runs the Tavily searches of a research step at the same time.
+
+The research nodes generate up to 20 queries per revision. Searching them one by one makes
+a revision as slow as the sum of all the searches; here it is as slow as the slowest one.
+Results always come back in query order, so the research content stays deterministic.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from colorama import Fore
+
+from common.concurrency import run_all
+
+
+class ParallelSearch:
+    """Bounded thread pool around a TavilyClient, with per-query timeouts and retries"""
+
+    def __init__(self, client, max_concurrency: int = 8, timeout: float = 20.0, retries: int = 2):
+        self.client = client
+        self.timeout = timeout
+        self.retries = retries
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="search")
+
+    def search_all(self, queries: List[str], **kwargs) -> List[Optional[dict]]:
+        """Searches every query concurrently, returns the responses in query order (None if a query failed)"""
+        # the client gets the deadline too: Tavily stops the request, the search cache stops waiting for it
+        responses = run_all(self._pool, lambda q: self.client.search(query=q, timeout=self.timeout, **kwargs), queries,
+                            timeout=self.timeout, retries=self.retries)
+        for query, response in zip(queries, responses):
+            if isinstance(response, Exception):
+                print(Fore.RED + f"Search failed for {query!r}: {response!r}" + Fore.RESET)
+        return [None if isinstance(r, Exception) else r for r in responses]
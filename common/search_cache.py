@@ -0,0 +1,140 @@
+"""Persistent response cache for TavilyClient.search.
+
+The research agents re-run the same searches on every run and every revision. The cached
+client is a drop-in for TavilyClient: responses are stored in SQLite keyed by the
+normalized query and the search parameters, expire after a TTL, and concurrent identical
+searches (e.g. from ParallelSearch) share a single request.
+
+A search with a `timeout` (TavilyClient.search's own, not part of the key) only waits for
+an identical running request until its deadline. A request that is past its own deadline
+is treated as hung: nobody joins it any more, so a retry sends a new request.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from dataclasses import dataclass
+from typing import Optional
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            ".cache", "tavily_cache.sqlite")
+
+
+@dataclass
+class SearchCacheStats:
+    hits: int = 0
+    misses: int = 0     # real requests to Tavily
+    coalesced: int = 0  # waited for an identical request that was already running
+    expired: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses + self.coalesced
+        return (self.hits + self.coalesced) / total if total else 0.0
+
+    def __str__(self):
+        return (f"search cache: {self.hits} hits, {self.coalesced} coalesced, {self.misses} requests, "
+                f"{self.expired} expired, hit rate {self.hit_rate:.0%}")
+
+
+def normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", query.strip().lower())
+
+
+@dataclass
+class _Request:
+    future: Future
+    deadline: Optional[float]  # time.monotonic() after which it counts as hung
+
+
+class CachedTavilyClient:
+    """Wraps a TavilyClient, only calling it for searches it has not seen within the TTL"""
+
+    def __init__(self, client, path: str = DEFAULT_PATH, ttl: float = 24 * 3600):
+        self.client = client
+        self.ttl = ttl
+        self.stats = SearchCacheStats()
+        self._lock = threading.Lock()
+        self._in_flight = {}  # key -> _Request that is already running
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS searches ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def key(self, query: str, **kwargs) -> str:
+        params = json.dumps(kwargs, sort_keys=True, default=str)
+        return hashlib.sha256(f"{normalize_query(query)}|{params}".encode("utf-8")).hexdigest()
+
+    def _load(self, key: str):
+        row = self._db.execute("SELECT response, created_at FROM searches WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        response, created_at = row
+        if time.time() - created_at > self.ttl:
+            self.stats.expired += 1
+            return None
+        return json.loads(response)
+
+    def _release(self, key: str, request: _Request):
+        """Called with the lock held, a newer request for the key stays"""
+        if self._in_flight.get(key) is request:
+            del self._in_flight[key]
+
+    def search(self, query: str, timeout: Optional[float] = None, **kwargs):
+        """Same signature as TavilyClient.search"""
+        key = self.key(query, **kwargs)
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        now = time.monotonic()
+        with self._lock:
+            cached = self._load(key)
+            if cached is not None:
+                self.stats.hits += 1
+                return cached
+            running = self._in_flight.get(key)
+            if running is not None and running.deadline is not None and now >= running.deadline:
+                self._release(key, running)  # hung, do not join it
+                running = None
+            if running is None:
+                request = self._in_flight[key] = _Request(Future(), now + timeout if timeout is not None else None)
+                self.stats.misses += 1
+            else:
+                self.stats.coalesced += 1
+
+        if running is not None:
+            waits = [d - now for d in (running.deadline, now + timeout if timeout is not None else None) if d is not None]
+            try:
+                return running.future.result(timeout=min(waits) if waits else None)
+            except FutureTimeout:
+                with self._lock:
+                    self._release(key, running)  # the retry sends its own request
+                raise TimeoutError(f"search {query!r} timed out waiting for an identical request") from None
+
+        try:
+            response = self.client.search(query=query, **kwargs)
+        except BaseException as e:
+            with self._lock:
+                self._release(key, request)
+            request.future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO searches (key, response, created_at) VALUES (?, ?, ?)",
+                             (key, json.dumps(response), time.time()))
+            self._db.commit()
+            self._release(key, request)
+        request.future.set_result(response)
+        return response
+
+    def clear_expired(self):
+        with self._lock:
+            self._db.execute("DELETE FROM searches WHERE created_at < ?", (time.time() - self.ttl,))
+            self._db.commit()
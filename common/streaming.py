@@ -0,0 +1,96 @@
+"""Prints the LLM tokens of a graph run as they arrive and measures time to first token.
+
+The graph is streamed with stream_mode=["messages", "values"]: "messages" gives us the
+tokens of every chat model call inside a node, "values" the state after every step, so
+the caller still gets the final state once the last node completes.
+"""
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence
+
+from langchain_core.messages import AIMessageChunk
+
+
+@dataclass
+class StreamStats:
+    first_token_seconds: Optional[float]  # None when the model produced no text
+    total_seconds: float
+    chunks: int
+
+    def __str__(self):
+        first = f"{self.first_token_seconds:.2f}s" if self.first_token_seconds is not None else "-"
+        return f"first token after {first}, done after {self.total_seconds:.2f}s ({self.chunks} chunks)"
+
+
+def print_token(text: str):
+    print(text, end="", flush=True)
+
+
+class _Tracker:
+    def __init__(self, nodes: Sequence[str]):
+        self.nodes = nodes
+        self.start = time.perf_counter()
+        self.first = None
+        self.chunks = 0
+        self.state = None
+
+    def handle(self, mode, payload) -> Optional[str]:
+        """Returns the text of a token we should show, None for everything else"""
+        if mode == "values":
+            self.state = payload
+            return None
+        chunk, metadata = payload
+        if metadata.get("langgraph_node") not in self.nodes or not isinstance(chunk, AIMessageChunk):
+            return None
+        if not isinstance(chunk.content, str) or not chunk.content:  # tool call chunks have no text
+            return None
+        if self.first is None:
+            self.first = time.perf_counter() - self.start
+        self.chunks += 1
+        return chunk.content
+
+    @property
+    def stats(self) -> StreamStats:
+        return StreamStats(self.first, time.perf_counter() - self.start, self.chunks)
+
+
+class TokenStream:
+    """async for token in TokenStream(graph, inputs): ..., then .state and .stats hold the result"""
+
+    def __init__(self, graph, inputs, config=None, nodes: Sequence[str] = ("llm",)):
+        self.graph = graph
+        self.inputs = inputs
+        self.config = config
+        self._tracker = _Tracker(nodes)
+        self.stats = None
+
+    @property
+    def state(self):
+        return self._tracker.state
+
+    async def __aiter__(self):
+        async for mode, payload in self.graph.astream(self.inputs, self.config, stream_mode=["messages", "values"]):
+            token = self._tracker.handle(mode, payload)
+            if token is not None:
+                yield token
+        self.stats = self._tracker.stats
+
+
+def stream_answer(graph, inputs, config=None, nodes: Sequence[str] = ("llm",),
+                  on_token: Callable[[str], None] = print_token):
+    """Runs the graph, passing the text tokens of the given nodes to on_token. Returns (final state, StreamStats)"""
+    tracker = _Tracker(nodes)
+    for mode, payload in graph.stream(inputs, config, stream_mode=["messages", "values"]):
+        token = tracker.handle(mode, payload)
+        if token is not None:
+            on_token(token)
+    return tracker.state, tracker.stats
+
+
+async def astream_answer(graph, inputs, config=None, nodes: Sequence[str] = ("llm",),
+                         on_token: Callable[[str], None] = print_token):
+    """Async version of stream_answer"""
+    stream = TokenStream(graph, inputs, config, nodes)
+    async for token in stream:
+        on_token(token)
+    return stream.state, stream.stats
@@ -0,0 +1,283 @@
+"""Memoized results for pure and read-only tools.
+
+Tools marked with @pure (same arguments, same result) or @cacheable(ttl=...) (read-only,
+the result may go stale) are only executed once per (tool name, canonical arguments):
+
+    @pure
+    @tool
+    def add(a: int, b: int): ...
+
+    tool_cache = ToolCache(tools)                                  # this run only
+    tool_cache = ToolCache(tools, path=DEFAULT_PATH)               # also across runs
+    ToolNode(tools, wrap_tool_call=tool_cache.wrap_tool_call, awrap_tool_call=tool_cache.awrap_tool_call)
+    ToolExecutor(cache=tool_cache)                                 # custom take_action nodes
+
+Results are kept in a bounded LRU in memory and, with a path, in SQLite. Identical calls
+of one LLM turn run concurrently, so the second one waits for the first instead of
+running the tool again, up to `wait_timeout` seconds, then runs it itself. When the first
+call is cancelled the waiters run the tool themselves too. Errors are never cached. Other
+tools are not touched.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from langchain_core.messages import ToolMessage
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            ".cache", "tool_cache.sqlite")
+
+
+def cacheable(ttl: Optional[float] = None):
+    """Marks a tool whose result only depends on its arguments, for `ttl` seconds (forever if None)"""
+    def mark(tool):
+        tool.metadata = {**(tool.metadata or {}), "cacheable": True, "cache_ttl": ttl}
+        return tool
+    return mark
+
+
+pure = cacheable()  # @pure: same arguments, same result, forever
+
+
+@dataclass
+class ToolStats:
+    hits: int = 0
+    disk_hits: int = 0  # remembered from an earlier run
+    deduped: int = 0  # identical call of the same turn, waited for the one already running
+    executed: int = 0
+
+    @property
+    def skipped(self) -> int:
+        return self.hits + self.disk_hits + self.deduped
+
+
+@dataclass
+class ToolCacheStats:
+    tools: dict = field(default_factory=lambda: defaultdict(ToolStats))
+    expired: int = 0
+    evicted: int = 0
+
+    @property
+    def skipped(self) -> int:
+        return sum(t.skipped for t in self.tools.values())
+
+    @property
+    def executed(self) -> int:
+        return sum(t.executed for t in self.tools.values())
+
+    def __str__(self):
+        total = self.skipped + self.executed
+        lines = [f"tool cache: {total} cacheable calls, {self.skipped} skipped, {self.executed} executed"
+                 f" ({self.evicted} evicted, {self.expired} expired)"]
+        for name, t in sorted(self.tools.items()):
+            lines.append(f"  {name:<20} {t.hits:>4} hits {t.disk_hits:>4} from disk {t.deduped:>4} deduped "
+                         f"{t.executed:>4} executed")
+        return "\n".join(lines)
+
+
+class _NotCached(Exception):
+    """Carries a result we hand back but do not remember (a tool error)"""
+
+    def __init__(self, result):
+        self.result = result
+
+
+class _Abandoned(Exception):
+    """The call the waiters were waiting for was cancelled or interrupted"""
+
+
+def canonical_args(args) -> str:
+    return json.dumps(args, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class ToolCache:
+    """Remembers the results of the cacheable tools among `tools`"""
+
+    def __init__(self, tools, max_entries: int = 1024, path: Optional[str] = None, wait_timeout: float = 60.0):
+        self.ttls = {t.name: t.metadata["cache_ttl"] for t in tools if (t.metadata or {}).get("cacheable")}
+        self.max_entries = max_entries  # per tier: in memory and on disk
+        self.wait_timeout = wait_timeout  # how long a duplicate call waits for the one already running
+        self.stats = ToolCacheStats()
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> (result, created_at), least recently used first
+        self._in_flight = {}  # key -> Future of the call that is already running
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS tool_results ("
+                "key TEXT PRIMARY KEY, tool TEXT NOT NULL, result TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS tool_results_created ON tool_results (created_at)")
+            self._db.commit()
+
+    def cacheable(self, name: str) -> bool:
+        return name in self.ttls
+
+    def key(self, name: str, args) -> str:
+        return hashlib.sha256(f"{name}|{canonical_args(args)}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, entry: tuple):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats.evicted += 1
+
+    def _lookup(self, name: str, key: str):
+        """(where, result) or None, called with the lock held"""
+        where = "memory"
+        entry = self._memory.get(key)
+        if entry is None and self._db is not None:
+            row = self._db.execute("SELECT result, created_at FROM tool_results WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                where, entry = "disk", (json.loads(row[0]), row[1])
+        if entry is None:
+            return None
+        ttl = self.ttls[name]
+        if ttl is not None and time.time() - entry[1] > ttl:
+            self._memory.pop(key, None)
+            self.stats.expired += 1
+            return None
+        self._remember(key, entry)
+        return where, entry[0]
+
+    def _begin(self, name: str, key: str):
+        """("hit", result), ("wait", Future) or ("run", Future)"""
+        with self._lock:
+            stats = self.stats.tools[name]
+            found = self._lookup(name, key)
+            if found is not None:
+                where, result = found
+                if where == "disk":
+                    stats.disk_hits += 1
+                else:
+                    stats.hits += 1
+                return "hit", result
+            running = self._in_flight.get(key)
+            if running is not None:
+                stats.deduped += 1
+                return "wait", running
+            future = self._in_flight[key] = Future()
+            stats.executed += 1
+            return "run", future
+
+    def _store(self, name: str, key: str, result):
+        with self._lock:
+            now = time.time()
+            self._remember(key, (result, now))
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO tool_results (key, tool, result, created_at) "
+                                 "VALUES (?, ?, ?, ?)", (key, name, json.dumps(result, default=str), now))
+                # keep the newest max_entries results on disk
+                self._db.execute("DELETE FROM tool_results WHERE key IN (SELECT key FROM tool_results "
+                                 "ORDER BY created_at DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+                self._db.commit()
+
+    def _finish(self, name: str, key: str, future: Future, result=None, error: BaseException = None):
+        try:
+            if error is None:
+                self._store(name, key, result)
+        finally:  # whatever happens the key is released and the waiters get an answer
+            with self._lock:
+                self._in_flight.pop(key, None)
+            if error is None:
+                future.set_result(result)
+            else:  # a cancelled call is not the waiters' error, they run the tool themselves
+                future.set_exception(error if isinstance(error, Exception) else _Abandoned())
+
+    def run(self, name: str, args, execute: Callable[[], object]):
+        """execute()'s result, or the result of an identical earlier (or concurrent) call"""
+        if name not in self.ttls:
+            return execute()
+        key = self.key(name, args)
+        state, value = self._begin(name, key)
+        while state == "wait":
+            try:
+                return value.result(timeout=self.wait_timeout)
+            except FutureTimeout:  # stuck, do not wait any longer for it
+                return execute()
+            except _Abandoned:
+                state, value = self._begin(name, key)
+        if state == "hit":
+            return value
+        try:
+            result = execute()
+        except BaseException as e:
+            self._finish(name, key, value, error=e)
+            raise
+        self._finish(name, key, value, result=result)
+        return result
+
+    # ToolNode hooks, the cached value is the content of the ToolMessage
+
+    @staticmethod
+    def _content(message):
+        if not isinstance(message, ToolMessage) or message.status == "error":
+            raise _NotCached(message)
+        return message.content
+
+    @staticmethod
+    def _answer(call: dict, content) -> ToolMessage:
+        return ToolMessage(content=content, name=call["name"], tool_call_id=call["id"])
+
+    @staticmethod
+    def _not_cached(call: dict, e: _NotCached):
+        if isinstance(e.result, ToolMessage):  # a duplicate call gets the error under its own id
+            return e.result.model_copy(update={"tool_call_id": call["id"]})
+        return e.result
+
+    def wrap_tool_call(self, request, execute):
+        """For ToolNode(tools, wrap_tool_call=...)"""
+        call = request.tool_call
+        if call["name"] not in self.ttls:
+            return execute(request)
+        try:
+            return self._answer(call, self.run(call["name"], call["args"], lambda: self._content(execute(request))))
+        except _NotCached as e:
+            return self._not_cached(call, e)
+
+    async def awrap_tool_call(self, request, execute):
+        """For ToolNode(tools, awrap_tool_call=...), used when the graph runs with ainvoke / astream"""
+        call = request.tool_call
+        if call["name"] not in self.ttls:
+            return await execute(request)
+        key = self.key(call["name"], call["args"])
+        state, value = self._begin(call["name"], key)
+        try:
+            while state == "wait":
+                waited = asyncio.wrap_future(value)
+                try:
+                    # shielded: giving up on the wait must not cancel the call we waited for
+                    content = await asyncio.wait_for(asyncio.shield(waited), self.wait_timeout)
+                    return self._answer(call, content)
+                except asyncio.TimeoutError:
+                    waited.add_done_callback(lambda f: f.cancelled() or f.exception())  # nobody reads it any more
+                    return await execute(request)
+                except _Abandoned:
+                    state, value = self._begin(call["name"], key)
+            if state == "hit":
+                return self._answer(call, value)
+            try:
+                content = self._content(await execute(request))
+            except BaseException as e:
+                self._finish(call["name"], key, value, error=e)
+                raise
+            self._finish(call["name"], key, value, result=content)
+            return self._answer(call, content)
+        except _NotCached as e:
+            return self._not_cached(call, e)
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
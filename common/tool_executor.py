@@ -0,0 +1,44 @@
+"""Runs all the tool calls of one LLM turn at the same time.
+
+GPT-4o often asks for several tools in one message (e.g. three Tavily searches). Running
+them one after another makes a turn as slow as the sum of the tool latencies; with the
+executor it is as slow as the slowest tool. Results come back in the order of the tool
+calls, so every ToolMessage still lines up with its tool_call_id.
+
+With a ToolCache, calls of pure / cacheable tools that were already answered (or that
+are identical to another call of the same turn) are not executed again.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from langchain_core.messages import ToolMessage
+
+from common.concurrency import run_all
+from common.tool_cache import ToolCache
+
+
+class ToolExecutor:
+    """Bounded thread pool for tool calls, with a per-tool timeout"""
+
+    def __init__(self, max_concurrency: int = 8, timeout: float = 60.0, cache: Optional[ToolCache] = None):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout  # seconds, counted from when the call is submitted (queue time included)
+        self.cache = cache
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="tool")
+
+    def run(self, tool_calls: List[dict], invoke: Callable[[dict], object]) -> List[ToolMessage]:
+        """Calls invoke(tool_call) for every tool call concurrently and returns the ToolMessages in order"""
+        if self.cache is not None:
+            cache, uncached = self.cache, invoke
+            invoke = lambda t: cache.run(t['name'], t['args'], lambda: uncached(t))
+        contents = run_all(self._pool, invoke, tool_calls, timeout=self.timeout)
+
+        messages = []
+        for t, content in zip(tool_calls, contents):
+            if isinstance(content, TimeoutError):
+                # The thread cannot be killed, but the turn does not have to wait for it
+                content = f"Error: {t['name']} timed out after {self.timeout}s, please retry."
+            elif isinstance(content, Exception):
+                content = f"Error: {t['name']} failed with {content!r}, please retry or use another tool."
+            messages.append(ToolMessage(tool_call_id=t['id'], name=t['name'], content=str(content)))
+        return messages